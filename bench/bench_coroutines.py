@@ -0,0 +1,135 @@
+"""Measures the per-command overhead of the connection pipeline, comparing
+native coroutines against the generator-based coroutines that were used
+before (``@asyncio.coroutine`` and ``yield from``).
+
+Each command goes through the same chain of calls as in
+:meth:`pymap.main.IMAPServer.run_command`: the command dispatch in
+:class:`~pymap.state.ConnectionState`, the command handler, and writing the
+response to a stream that discards it.
+
+"""
+
+import argparse
+import asyncio
+import functools
+import inspect
+import time
+import types
+
+from pymap.parsing.command import Command
+from pymap.state import ConnectionState
+
+
+def legacy_coroutine(func):
+    # Equivalent of the removed asyncio.coroutine decorator.
+    if inspect.isgeneratorfunction(func):
+        return types.coroutine(func)
+
+    @functools.wraps(func)
+    @types.coroutine
+    def wrapper(*args, **kwargs):
+        res = func(*args, **kwargs)
+        if inspect.isawaitable(res):
+            res = yield from res
+        return res
+    return wrapper
+
+
+class NullWriter(object):
+
+    def write(self, data):
+        pass
+
+    async def drain(self):
+        pass
+
+
+class LegacyNullWriter(object):
+
+    def write(self, data):
+        pass
+
+    @legacy_coroutine
+    def drain(self):
+        pass
+
+
+def _run_sync(func, cmd):
+    # The handlers never suspend, so their result is available immediately.
+    try:
+        func(cmd).send(None)
+    except StopIteration as exc:
+        return exc.value
+
+
+class LegacyConnectionState(object):
+
+    def __init__(self, state):
+        super().__init__()
+        self.do_capability = legacy_coroutine(
+            functools.partial(_run_sync, state.do_capability))
+
+    @legacy_coroutine
+    def do_command(self, cmd):
+        func = getattr(self, 'do_' + str(cmd.command, 'ascii').lower())
+        return func(cmd)
+
+
+@legacy_coroutine
+def legacy_send_stream(response, writer):
+    writer.write(bytes(response))
+    yield from writer.drain()
+
+
+@legacy_coroutine
+def legacy_run_command(state, cmd, writer):
+    response = yield from state.do_command(cmd)
+    yield from legacy_send_stream(response, writer)
+
+
+async def native_run_command(state, cmd, writer):
+    response = await state.do_command(cmd)
+    await response.send_stream(writer)
+
+
+async def run_native(cmd, iterations):
+    state = ConnectionState(None, None)
+    writer = NullWriter()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await native_run_command(state, cmd, writer)
+    return time.perf_counter() - start
+
+
+async def run_legacy(cmd, iterations):
+    legacy_state = LegacyConnectionState(ConnectionState(None, None))
+    writer = LegacyNullWriter()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await legacy_run_command(legacy_state, cmd, writer)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--iterations', type=int, default=200000)
+    parser.add_argument('--loop', choices=['asyncio', 'uvloop'],
+                        default='asyncio')
+    args = parser.parse_args()
+
+    if args.loop == 'uvloop':
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    loop = asyncio.new_event_loop()
+
+    cmd, _ = Command.parse(b'a1 CAPABILITY\r\n')
+    for name, func in [('generator-based', run_legacy),
+                       ('native', run_native)]:
+        elapsed = loop.run_until_complete(func(cmd, args.iterations))
+        per_cmd = elapsed / args.iterations * 1000000.0
+        print('{0:>16}: {1:.3f} usec/command'.format(name, per_cmd))
+    loop.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Measures the number of commands per second that can be parsed with
+:meth:`pymap.parsing.command.Command.parse` and dispatched with
+:meth:`pymap.state.ConnectionState.do_command`, comparing the precomputed
+dispatch table against the lookups that were done on every command before
+(importing the command modules in ``Command.parse``, then building the
+handler name and calling ``getattr`` in ``do_command``).
+
+"""
+
+import argparse
+import asyncio
+import time
+
+from pymap.parsing import NotParseable, Space
+from pymap.parsing.command import (Command, CommandAuth, CommandNonAuth,
+                                   CommandSelect, CommandNotFound, BadCommand)
+from pymap.parsing.primitives import Atom
+from pymap.parsing.response import ResponseBad, ResponseNo
+from pymap.parsing.specials import Tag
+from pymap.state import ConnectionState
+
+#: The command lines parsed and dispatched in each iteration.
+command_lines = [b'a1 CAPABILITY\r\n',
+                 b'a2 NOOP\r\n',
+                 b'a3 CHECK\r\n',
+                 b'a4 CREATE "Sent Items"\r\n']
+
+
+def legacy_parse(buf, **kwargs):
+    from pymap.parsing.command import any, auth, nonauth, select
+    buf = memoryview(buf)
+    tag = Tag(b'*')
+    try:
+        tag, buf = Tag.parse(buf)
+        _, buf = Space.parse(buf)
+        atom, buf = Atom.parse(buf)
+        command = atom.value.upper()
+    except NotParseable:
+        raise CommandNotFound(buf, tag.value)
+    cmd_type = Command._commands.get(command)
+    if cmd_type:
+        try:
+            return cmd_type._parse(tag.value, buf, **kwargs)
+        except NotParseable as exc:
+            raise BadCommand(exc.buf, tag.value, cmd_type)
+    raise CommandNotFound(buf, tag.value, command)
+
+
+class LegacyConnectionState(ConnectionState):
+
+    async def do_command(self, cmd, **kwargs):
+        if self.user and isinstance(cmd, CommandNonAuth):
+            msg = cmd.command + b': Already authenticated.'
+            return ResponseBad(cmd.tag, msg)
+        elif not self.user and isinstance(cmd, CommandAuth):
+            msg = cmd.command + b': Must authenticate first.'
+            return ResponseBad(cmd.tag, msg)
+        elif not self.selected and isinstance(cmd, CommandSelect):
+            msg = cmd.command + b': Must select a mailbox first.'
+            return ResponseBad(cmd.tag, msg)
+        func_name = 'do_' + str(cmd.command, 'ascii').lower()
+        try:
+            func = getattr(self, func_name)
+        except AttributeError:
+            return ResponseNo(cmd.tag, cmd.command + b': Not Implemented')
+        return await func(cmd, **kwargs)
+
+
+async def run(state, parse, iterations):
+    state.user = object()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for line in command_lines:
+            cmd, _ = parse(line)
+            await state.do_command(cmd)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--iterations', type=int, default=50000)
+    args = parser.parse_args()
+
+    loop = asyncio.new_event_loop()
+    for name, state, parse in [
+            ('per-call lookup', LegacyConnectionState(None, None),
+             legacy_parse),
+            ('dispatch table', ConnectionState(None, None), Command.parse)]:
+        elapsed = loop.run_until_complete(run(state, parse, args.iterations))
+        total = args.iterations * len(command_lines)
+        print('{0:>16}: {1:,.0f} commands/sec'.format(name, total / elapsed))
+    loop.close()
+
+
+if __name__ == '__main__':
+    main()
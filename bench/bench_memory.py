@@ -0,0 +1,74 @@
+"""Measures the memory held by parsed commands and built responses, as the
+number of bytes allocated per object while a large number of them are kept
+alive, the way they are across many connections. Commands are parsed with
+:meth:`pymap.parsing.command.Command.parse` from a representative corpus of
+command lines, and responses are the untagged and tagged responses that
+typical commands send.
+
+"""
+
+import argparse
+import tracemalloc
+
+from pymap.parsing.command import Command
+from pymap.parsing.response import ResponseOk, ResponseNo
+from pymap.parsing.response.code import UidNext, UidValidity, PermanentFlags
+from pymap.parsing.response.specials import (FlagsResponse, ExistsResponse,
+                                             RecentResponse, FetchResponse)
+from pymap.parsing.specials import Flag
+
+#: The command lines parsed in each iteration.
+command_lines = [
+    b'a1 SEARCH NOT DELETED OR FROM "bob" (SUBJECT hello 1:5)'
+    b' SINCE 1-Jan-2014 UNSEEN 2,4:7,9:*\r\n',
+    b'a2 UID FETCH 1:* (FLAGS UID RFC822.SIZE'
+    b' BODY.PEEK[HEADER.FIELDS (From Subject Date)])\r\n',
+    b'a3 FETCH 1,3:5 FULL\r\n',
+    b'a4 UID STORE 1:10 +FLAGS.SILENT (\\Seen \\Flagged)\r\n',
+    b'a5 STATUS INBOX (MESSAGES RECENT UNSEEN)\r\n',
+    b'a6 SELECT "Sent Items"\r\n',
+    b'a7 NOOP\r\n']
+
+flags = [Flag(b'\\Seen'), Flag(b'\\Flagged'), Flag(b'\\Deleted')]
+
+
+def build_responses():
+    select = ResponseOk(b'a1', b'Selected.')
+    select.add_data(FlagsResponse(flags))
+    select.add_data(ExistsResponse(1024))
+    select.add_data(RecentResponse(3))
+    select.add_data(ResponseOk(b'*', b'Predicted next UID.', UidNext(1025)))
+    select.add_data(ResponseOk(b'*', b'UIDs valid.', UidValidity(12345)))
+    select.add_data(ResponseOk(b'*', b'Flags permitted.',
+                               PermanentFlags(flags)))
+    fetch = ResponseOk(b'a2', b'Fetch completed.')
+    for seq in range(1, 6):
+        fetch.add_data(FetchResponse(seq, [(b'FLAGS', bytes(flags[0])),
+                                           (b'UID', b'%d' % (seq + 100))]))
+    return [select, fetch, ResponseNo(b'a3', b'Mailbox does not exist.')]
+
+
+def measure(build, count):
+    tracemalloc.start()
+    start, _ = tracemalloc.get_traced_memory()
+    kept = [build() for _ in range(count)]
+    end, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return (end - start) / (count * len(kept[0]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--count', type=int, default=2000)
+    args = parser.parse_args()
+
+    per_command = measure(lambda: [Command.parse(line)[0]
+                                   for line in command_lines], args.count)
+    print('{0:>12}: {1:,.0f} bytes/command'.format('commands', per_command))
+    per_response = measure(build_responses, args.count)
+    print('{0:>12}: {1:,.0f} bytes/response'.format('responses',
+                                                    per_response))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""Measures the number of command lines per second that can be parsed with
+:meth:`pymap.parsing.command.Command.parse`, for commands whose arguments
+have several alternative forms such as ``SEARCH`` and ``UID FETCH``, and
+the number of lists of primitive values that can be parsed with
+:meth:`pymap.parsing.primitives.List.parse`.
+
+"""
+
+import argparse
+import timeit
+
+from pymap.parsing.command import Command
+from pymap.parsing.primitives import Nil, Number, Atom, String, List
+
+#: The command lines parsed in each iteration, by name.
+command_lines = [
+    ('SEARCH', b'a1 SEARCH NOT DELETED OR FROM "bob" (SUBJECT hello 1:5)'
+               b' SINCE 1-Jan-2014 UNSEEN 2,4:7,9:*\r\n'),
+    ('UID FETCH', b'a2 UID FETCH 1:* (FLAGS UID RFC822.SIZE'
+                  b' BODY.PEEK[HEADER.FIELDS (From Subject Date)])\r\n'),
+    ('FETCH', b'a3 FETCH 1,3:5 FULL\r\n'),
+    ('UID STORE', b'a4 UID STORE 1:10 +FLAGS.SILENT (\\Seen \\Flagged)\r\n'),
+    ('STATUS', b'a5 STATUS INBOX (MESSAGES RECENT UNSEEN)\r\n'),
+    ('LOGIN', b'a6 LOGIN "user@example.com" "correct horse battery"\r\n'),
+    ('SELECT', b'a7 SELECT "~peter/mail/&U,BTFw-/&ZeVnLIqe-"\r\n')]
+
+#: The lists of primitive values parsed in each iteration, by name.
+value_lines = [
+    ('atoms', b'(ONE Two three.four FIVE SIX Seven EIGHT)'),
+    ('numbers', b'(1 23 456 7890 12 345 6789 0)'),
+    ('mixed', b'(NIL 123 abc (nil 4567 "quoted" Def) NIL 89 ghi.jkl NIL)')]
+
+#: The types that the items of each list of values may be.
+value_types = [Nil, Number, Atom, String, List]
+
+
+def run(parse, iterations, repeat):
+    timer = timeit.Timer(parse)
+    return min(timer.repeat(repeat, iterations))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--iterations', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    for name, line in command_lines:
+        elapsed = run(lambda: Command.parse(line),
+                      args.iterations, args.repeat)
+        rate = args.iterations / elapsed
+        print('{0:>12}: {1:,.0f} commands/sec'.format(name, rate))
+    for name, line in value_lines:
+        elapsed = run(lambda: List.parse(line, list_expected=value_types),
+                      args.iterations, args.repeat)
+        rate = args.iterations / elapsed
+        print('{0:>12}: {1:,.0f} lists/sec'.format(name, rate))
+
+
+if __name__ == '__main__':
+    main()
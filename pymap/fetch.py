@@ -0,0 +1,255 @@
+# Copyright (c) 2014 Ian C. Good
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+
+"""Module containing :class:`FetchPlan`, which works out from the
+:class:`~pymap.parsing.specials.FetchAttribute` objects of a ``FETCH``
+command the least data that must be loaded for each message, so that a
+mailbox backend does not read message bodies it will not send.
+
+"""
+
+__all__ = ['FetchPart', 'FetchPlan', 'FetchRequest']
+
+
+class FetchPart(object):
+    """A section of a message whose content is fetched.
+
+    :param tuple path: The part numbers of the MIME part, or an empty tuple
+                       for the whole message.
+    :param bytes text: ``None`` for the entire part, or one of ``HEADER``,
+                       ``HEADER.FIELDS``, ``HEADER.FIELDS.NOT``, ``TEXT`` or
+                       ``MIME``.
+    :param fields: The header field names for ``HEADER.FIELDS`` and
+                   ``HEADER.FIELDS.NOT``.
+    :type fields: frozenset
+    :param tuple byte_range: The first byte, inclusive, and the last byte,
+                             exclusive, of the section that is fetched, or
+                             ``None`` for all of it.
+
+    """
+
+    def __init__(self, path=(), text=None, fields=None, byte_range=None):
+        super().__init__()
+        self.path = path
+        self.text = text
+        self.fields = fields
+        self.byte_range = byte_range
+
+    @property
+    def headers_only(self):
+        """True if only the headers of the part are needed."""
+        return self.text in (b'HEADER', b'HEADER.FIELDS',
+                             b'HEADER.FIELDS.NOT', b'MIME')
+
+    def __eq__(self, other):
+        if isinstance(other, FetchPart):
+            return (self.path, self.text, self.fields, self.byte_range) == \
+                (other.path, other.text, other.fields, other.byte_range)
+        return NotImplemented
+
+    def __hash__(self):
+        return hash((self.path, self.text, self.fields, self.byte_range))
+
+    def __repr__(self):
+        return '<FetchPart path={0!r} text={1!r} byte_range={2!r}>'.format(
+            self.path, self.text, self.byte_range)
+
+
+class FetchRequest(object):
+    """The data to load for a contiguous range of messages, which a mailbox
+    backend may load with a single batched request.
+
+    :param int first: The first message in the range.
+    :param int last: The last message in the range.
+    :param plan: The fetch plan for each message.
+    :type plan: :class:`FetchPlan`
+
+    """
+
+    def __init__(self, first, last, plan):
+        super().__init__()
+        self.first = first
+        self.last = last
+        self.plan = plan
+
+    def __iter__(self):
+        return iter(range(self.first, self.last + 1))
+
+
+class FetchPlan(object):
+    """Analyses the attributes of a ``FETCH`` command to decide what must be
+    loaded for each message:
+
+    * ``FLAGS``, ``UID``, ``INTERNALDATE`` and ``RFC822.SIZE`` only need the
+      message metadata, in :attr:`metadata`.
+    * ``ENVELOPE``, ``RFC822.HEADER`` and ``BODY[HEADER...]`` only need
+      headers, in :attr:`headers`, which is a set of field names when only
+      some are needed.
+    * ``BODY`` and ``BODYSTRUCTURE`` need the MIME structure, in
+      :attr:`structure`.
+    * Other body sections need their content, in :attr:`parts`. A section of
+      a MIME part, e.g. ``BODY[1.2]``, only needs that part, and a partial
+      fetch only needs its byte range.
+
+    :param list attributes: The
+                            :class:`~pymap.parsing.specials.FetchAttribute`
+                            objects.
+
+    """
+
+    #: The header fields used to build an ``ENVELOPE``.
+    envelope_fields = frozenset([b'DATE', b'SUBJECT', b'FROM', b'SENDER',
+                                 b'REPLY-TO', b'TO', b'CC', b'BCC',
+                                 b'IN-REPLY-TO', b'MESSAGE-ID'])
+
+    _metadata = frozenset([b'FLAGS', b'UID', b'INTERNALDATE', b'RFC822.SIZE'])
+
+    def __init__(self, attributes):
+        super().__init__()
+        self.attributes = attributes
+
+        #: The metadata attribute names that are fetched.
+        self.metadata = set()
+
+        #: ``True`` if all headers are needed, otherwise the set of header
+        #: field names that are needed, which may be empty.
+        self.headers = frozenset()
+
+        #: True if the MIME structure of the message is needed.
+        self.structure = False
+
+        #: The :class:`FetchPart` objects whose content is needed.
+        self.parts = []
+
+        #: True if fetching the attributes sets the ``\Seen`` flag.
+        self.sets_seen = False
+
+        for attr in attributes:
+            self._add(attr)
+        self._merge_parts()
+
+    def _add_headers(self, fields):
+        if self.headers is not True:
+            self.headers = True if fields is True else self.headers | fields
+
+    def _add_part(self, part):
+        if not part.path and part.headers_only and part.byte_range is None:
+            if part.text == b'HEADER.FIELDS':
+                self._add_headers(part.fields)
+            else:
+                self._add_headers(True)
+        else:
+            self.parts.append(part)
+
+    def _add(self, attr):
+        name = attr.attribute
+        if name in self._metadata:
+            self.metadata.add(name)
+        elif name == b'ENVELOPE':
+            self._add_headers(self.envelope_fields)
+        elif name == b'RFC822.HEADER':
+            self._add_headers(True)
+        elif name == b'RFC822':
+            self.sets_seen = True
+            self._add_part(FetchPart())
+        elif name == b'RFC822.TEXT':
+            self.sets_seen = True
+            self._add_part(FetchPart(text=b'TEXT'))
+        elif name == b'BODYSTRUCTURE' or attr.section is None:
+            self.structure = True
+        else:
+            self.sets_seen = self.sets_seen or name == b'BODY'
+            self._add_part(self.get_part(attr))
+
+    @classmethod
+    def get_part(cls, attr):
+        """Returns the section of the message whose content is sent for the
+        attribute.
+
+        :param attr: The fetch attribute.
+        :type attr: :class:`~pymap.parsing.specials.FetchAttribute`
+        :returns: The section, or ``None`` if the attribute does not send
+                  message content.
+        :rtype: :class:`FetchPart`
+
+        """
+        name = attr.attribute
+        if name == b'RFC822':
+            return FetchPart()
+        elif name == b'RFC822.HEADER':
+            return FetchPart(text=b'HEADER')
+        elif name == b'RFC822.TEXT':
+            return FetchPart(text=b'TEXT')
+        elif attr.section is None:
+            return None
+        path, text, fields = attr.section
+        path = tuple(path) if path else ()
+        if fields is not None:
+            fields = frozenset(bytes(field).upper() for field in fields)
+        byte_range = None
+        if attr.partial is not None:
+            start, length = attr.partial
+            byte_range = (start, start + length)
+        return FetchPart(path, text, fields, byte_range)
+
+    def _merge_parts(self):
+        # When the whole of a part is loaded anyway, the sections and ranges
+        # within it do not need to be loaded separately. The MIME header of
+        # a part comes before its body, so it is only covered by a parent.
+        whole = {part.path for part in self.parts
+                 if part.text is None and part.byte_range is None}
+        merged = []
+        for part in self.parts:
+            is_whole = part.text is None and part.byte_range is None
+            is_mime = part.text == b'MIME'
+            covered = any(part.path[0:len(path)] == path and
+                          (len(path) < len(part.path) or
+                           not (is_whole or is_mime))
+                          for path in whole)
+            if not covered and part not in merged:
+                merged.append(part)
+        self.parts = merged
+
+    @property
+    def metadata_only(self):
+        """True if nothing but the message metadata is needed."""
+        return not (self.headers or self.structure or self.parts)
+
+    @property
+    def headers_only(self):
+        """True if no message content beyond the headers is needed."""
+        return not (self.structure or self.parts)
+
+    def get_requests(self, seq_set, max_value):
+        """Splits the messages of the sequence set into contiguous ranges,
+        each of which a backend may load with one batched request.
+
+        :param seq_set: The sequence set of the command.
+        :type seq_set: :class:`~pymap.parsing.specials.SequenceSet`
+        :param int max_value: The number of messages in the mailbox, or the
+                              highest UID.
+        :rtype: list
+
+        """
+        resolved = seq_set.resolve(max_value)
+        return [FetchRequest(first, last, self)
+                for first, last in resolved.intervals]
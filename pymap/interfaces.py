@@ -0,0 +1,262 @@
+# Copyright (c) 2014 Ian C. Good
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+
+"""Module defining the interface between the IMAP connection state and the
+storage backend that holds the users, mailboxes and messages. The
+:class:`~pymap.state.ConnectionState` of each connection only calls the
+methods defined here, so any store that implements them may be served.
+
+Methods that work on messages take and return lists, so that a backend
+may answer a command for many messages with one query rather than one per
+message.
+
+"""
+
+__all__ = ['BackendInterface', 'SessionInterface', 'MailboxInterface',
+           'MessageInterface']
+
+
+class BackendInterface(object):
+    """Looks up the users of a storage backend."""
+
+    async def login(self, result):
+        """Checks the credentials of an authentication attempt and starts a
+        session for the user.
+
+        :param result: The credentials received from the client.
+        :type result: :class:`~pysasl.creds.server.ServerCredentials`
+        :returns: The session, or ``None`` if the credentials are invalid.
+        :rtype: :class:`SessionInterface`
+
+        """
+        raise NotImplementedError()
+
+
+class SessionInterface(object):
+    """The mailboxes of an authenticated user."""
+
+    async def list_mailboxes(self, ref_name, filter, subscribed=False):
+        """Lists the names of the mailboxes matching a ``LIST`` or ``LSUB``
+        pattern.
+
+        :param str ref_name: The reference name.
+        :param str filter: The mailbox name with possible wildcards.
+        :param bool subscribed: Only list the subscribed mailboxes.
+        :returns: A two-tuple of the hierarchy delimiter and the list of
+                  mailbox names.
+        :rtype: tuple
+
+        """
+        raise NotImplementedError()
+
+    async def get_mailbox(self, name):
+        """Returns the mailbox with the given name.
+
+        :param str name: The name of the mailbox.
+        :returns: The mailbox, or ``None`` if it does not exist.
+        :rtype: :class:`MailboxInterface`
+
+        """
+        raise NotImplementedError()
+
+
+class MailboxInterface(object):
+    """A mailbox of a user, and the messages in it. Messages are addressed
+    by sequence number when they are looked up, and by UID everywhere else,
+    since sequence numbers change as messages are expunged.
+
+    """
+
+    #: The name of the mailbox.
+    name = None
+
+    #: True if the messages in the mailbox may not be changed.
+    readonly = False
+
+    #: The flags defined in the mailbox, as bytestrings.
+    flags = []
+
+    #: The flags that may be changed permanently, as bytestrings.
+    permanent_flags = []
+
+    async def get_status(self):
+        """Returns the current counters of the mailbox, by the name of the
+        ``STATUS`` attribute: ``MESSAGES``, ``RECENT``, ``UIDNEXT``,
+        ``UIDVALIDITY`` and ``UNSEEN``.
+
+        :rtype: dict
+
+        """
+        raise NotImplementedError()
+
+    def get_search_index(self):
+        """Returns the indexes the backend provides to answer search keys
+        without examining each message, or ``None``.
+
+        :rtype: :class:`~pymap.search.SearchIndex`
+
+        """
+        return None
+
+    def listen(self):
+        """Registers a new listener for changes to the mailbox. The untagged
+        response for each change is put on the returned queue.
+
+        :rtype: :class:`~asyncio.Queue`
+
+        """
+        raise NotImplementedError()
+
+    def unlisten(self, queue):
+        """Unregisters a listener returned by :meth:`listen`.
+
+        :param queue: The listener queue.
+        :type queue: :class:`~asyncio.Queue`
+
+        """
+        raise NotImplementedError()
+
+    async def get_messages(self, seq_set, uid=False):
+        """Loads the metadata of the messages in the sequence set.
+
+        :param seq_set: The message sequence numbers, or UIDs.
+        :type seq_set: :class:`~pymap.parsing.specials.SequenceSet`
+        :param bool uid: The sequence set contains UIDs.
+        :returns: List of two-tuples of the sequence number and the
+                  :class:`MessageInterface`, in sequence number order.
+        :rtype: list
+
+        """
+        raise NotImplementedError()
+
+    async def get_content(self, uids, part):
+        """Loads a section of the content of each message.
+
+        :param list uids: The UIDs of the messages.
+        :param part: The section of the messages to load, narrowed to a byte
+                     range if the part has one.
+        :type part: :class:`~pymap.fetch.FetchPart`
+        :returns: The section of each message as bytes, in the same order
+                  as ``uids``.
+        :rtype: list
+
+        """
+        raise NotImplementedError()
+
+    async def update_flags(self, uids, flags, mode='replace'):
+        """Changes the flags of each message.
+
+        :param list uids: The UIDs of the messages.
+        :param list flags: The flags to set, add or remove.
+        :param str mode: One of ``replace``, ``add`` or ``subtract``.
+        :returns: The new set of flags of each message, in the same order as
+                  ``uids``.
+        :rtype: list
+
+        """
+        raise NotImplementedError()
+
+    async def append_messages(self, messages):
+        """Adds new messages to the mailbox.
+
+        :param list messages: Three-tuples of the message content, the list
+                              of flags and the internal date
+                              :class:`~datetime.datetime` of each message.
+        :returns: The UIDs of the new messages.
+        :rtype: list
+
+        """
+        raise NotImplementedError()
+
+    async def copy_messages(self, uids, mailbox):
+        """Copies messages, with their flags and internal dates, to the end
+        of another mailbox.
+
+        :param list uids: The UIDs of the messages.
+        :param mailbox: The destination mailbox.
+        :type mailbox: :class:`MailboxInterface`
+        :returns: The UIDs of the new messages in the destination mailbox.
+        :rtype: list
+
+        """
+        raise NotImplementedError()
+
+    async def expunge(self):
+        """Removes the messages with the ``\\Deleted`` flag.
+
+        :returns: The sequence number of each removed message, in the order
+                  they must be reported to the client, which is the number
+                  the message had after the ones before it were removed.
+        :rtype: list
+
+        """
+        raise NotImplementedError()
+
+
+class MessageInterface(object):
+    """The metadata of a message, as loaded by
+    :meth:`MailboxInterface.get_messages`. These are the attributes and
+    methods a :class:`~pymap.search.SearchPlan` uses.
+
+    """
+
+    #: The UID of the message.
+    uid = None
+
+    #: The set of flags on the message, as bytestrings, including the
+    #: ``\Recent`` flag if the message is recent.
+    flags = frozenset()
+
+    def get_size(self):
+        """Returns the size of the message in bytes.
+
+        :rtype: int
+
+        """
+        raise NotImplementedError()
+
+    def get_internal_date(self):
+        """Returns the internal date of the message.
+
+        :rtype: :class:`~datetime.datetime`
+
+        """
+        raise NotImplementedError()
+
+    def get_header(self, name):
+        """Returns the values of the header with the given name.
+
+        :param str name: The header name.
+        :returns: List of strings.
+        :rtype: list
+
+        """
+        raise NotImplementedError()
+
+    def get_text(self, include_headers=False):
+        """Returns the text of the message body.
+
+        :param bool include_headers: Include the headers before the body.
+        :rtype: str
+
+        """
+        raise NotImplementedError()
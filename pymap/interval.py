@@ -0,0 +1,133 @@
+# Copyright (c) 2014 Ian C. Good
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+
+"""Module containing :class:`IntervalSet`, a sorted set of integers stored as
+ranges, such as the message sequence numbers or UIDs matched by a
+:class:`~pymap.parsing.specials.SequenceSet`.
+
+"""
+
+from bisect import bisect_right
+from itertools import chain
+
+__all__ = ['IntervalSet']
+
+
+class IntervalSet(object):
+    """A set of integers, stored as sorted, non-overlapping and non-adjacent
+    inclusive ranges. Membership is checked with a binary search over the
+    ranges, and the numbers are iterated in ascending order without being
+    expanded into a list.
+
+    :param intervals: Iterable of two-tuples of the lowest and highest number
+                      of each range, which may overlap and be in any order.
+                      Ranges where the lowest number is greater than the
+                      highest are ignored.
+
+    """
+
+    def __init__(self, intervals=()):
+        super().__init__()
+        merged = []
+        for low, high in sorted(intervals):
+            if low > high:
+                continue
+            elif merged and low <= merged[-1][1] + 1:
+                if high > merged[-1][1]:
+                    merged[-1][1] = high
+            else:
+                merged.append([low, high])
+        self._lows = [low for low, _ in merged]
+        self._highs = [high for _, high in merged]
+        self._len = sum(high - low + 1 for low, high in merged)
+
+    @classmethod
+    def _from_sorted(cls, lows, highs):
+        ret = cls.__new__(cls)
+        ret._lows = lows
+        ret._highs = highs
+        ret._len = sum(high - low + 1 for low, high in zip(lows, highs))
+        return ret
+
+    @property
+    def intervals(self):
+        """The normalized list of inclusive ranges, as two-tuples."""
+        return list(zip(self._lows, self._highs))
+
+    def __contains__(self, num):
+        i = bisect_right(self._lows, num) - 1
+        return i >= 0 and num <= self._highs[i]
+
+    def __iter__(self):
+        return chain.from_iterable(range(low, high + 1) for low, high
+                                   in zip(self._lows, self._highs))
+
+    def __len__(self):
+        return self._len
+
+    def __and__(self, other):
+        return self.intersection(other)
+
+    def __or__(self, other):
+        return self.union(other)
+
+    def union(self, other):
+        """Returns the numbers that are in either interval set.
+
+        :param other: The other interval set.
+        :type other: :class:`IntervalSet`
+        :rtype: :class:`IntervalSet`
+
+        """
+        return IntervalSet(self.intervals + other.intervals)
+
+    def intersection(self, other):
+        """Returns the numbers that are in both interval sets, found by
+        walking the ranges of each once.
+
+        :param other: The other interval set.
+        :type other: :class:`IntervalSet`
+        :rtype: :class:`IntervalSet`
+
+        """
+        lows, highs = [], []
+        i = j = 0
+        while i < len(self._lows) and j < len(other._lows):
+            low = max(self._lows[i], other._lows[j])
+            high = min(self._highs[i], other._highs[j])
+            if low <= high:
+                lows.append(low)
+                highs.append(high)
+            if self._highs[i] < other._highs[j]:
+                i += 1
+            else:
+                j += 1
+        return self._from_sorted(lows, highs)
+
+    def __eq__(self, other):
+        if isinstance(other, IntervalSet):
+            return (self._lows == other._lows and
+                    self._highs == other._highs)
+        return NotImplemented
+
+    def __repr__(self):
+        return '<IntervalSet {0!r}>'.format(self.intervals)
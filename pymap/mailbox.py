@@ -19,13 +19,55 @@
 # THE SOFTWARE.
 #
 
+
+"""Module containing :class:`DemoBackend`, an in-memory implementation of
+the :mod:`pymap.interfaces` with a single user and randomly generated
+messages, for trying out the server.
+
+"""
+
 import asyncio
 import random
+import re
+from datetime import datetime, timezone
+from email.parser import BytesHeaderParser
+
+from pysasl.identity import ClearIdentity
+
+from pymap.interfaces import (BackendInterface, SessionInterface,
+                              MailboxInterface, MessageInterface)
+from pymap.parsing.primitives import List
+from pymap.parsing.response.specials import (ExistsResponse, ExpungeResponse,
+                                             FetchResponse)
 
-__all__ = ['UserState', 'MailboxState']
+__all__ = ['DemoBackend', 'UserState', 'MailboxState', 'MessageState']
 
 
-class UserState(object):
+class DemoBackend(BackendInterface):
+    """Backend with the single user ``testuser``, whose password is
+    ``testpass``. The mailboxes are randomly filled on the first login and
+    shared by every later session, so that changes made in one session are
+    seen by the others.
+
+    """
+
+    #: The identity of the single user.
+    identity = ClearIdentity('testuser', 'testpass')
+
+    def __init__(self):
+        super().__init__()
+        self.users = {}
+
+    async def login(self, result):
+        if not result.verify(self.identity):
+            return None
+        user = self.users.get(result.authcid)
+        if user is None:
+            user = self.users[result.authcid] = UserState(result.authcid)
+        return user
+
+
+class UserState(SessionInterface):
 
     _delimiter = '.'
     _folders = ['INBOX', '.Testing', '.Testing.Secrets', '.Stuff']
@@ -36,44 +78,192 @@ class UserState(object):
         self.mailboxes = {name: MailboxState(authed, name)
                           for name in self._folders}
 
-    @asyncio.coroutine
-    def list(self, ref_name, mbx_name):
-        return self._delimiter, self.mailboxes
+    @classmethod
+    def _get_pattern(cls, pattern):
+        # '*' matches any characters, '%' any except the delimiter.
+        parts = []
+        for char in pattern:
+            if char == '*':
+                parts.append('.*')
+            elif char == '%':
+                parts.append('[^' + re.escape(cls._delimiter) + ']*')
+            else:
+                parts.append(re.escape(char))
+        return re.compile(''.join(parts) + r'\Z')
 
-    @asyncio.coroutine
-    def list_subscribed(self, ref_name, mbx_name):
-        return self._delimiter, [mbx for mbx, state in self.mailboxes
-                                 if state.subscribed]
+    async def list_mailboxes(self, ref_name, filter, subscribed=False):
+        pattern = self._get_pattern(ref_name + filter)
+        return self._delimiter, [name for name, mbx in self.mailboxes.items()
+                                 if pattern.match(name) and
+                                 (mbx.subscribed or not subscribed)]
 
-    @asyncio.coroutine
-    def get_mailbox(self, mbx_name):
-        return self.mailboxes.get(mbx_name)
+    async def get_mailbox(self, name):
+        return self.mailboxes.get(name)
 
 
-class MailboxState(object):
+class MailboxState(MailboxInterface):
 
-    def __init__(self, authed, mailbox):
+    flags = [br'\Answered', br'\Flagged', br'\Deleted', br'\Seen',
+             br'\Draft']
+    permanent_flags = flags
+
+    def __init__(self, authed, name):
         super().__init__()
         self.authed = authed
-        self.mailbox = mailbox
+        self.name = name
         self.subscribed = True
         self.uid_validity = random.randint(0, 1000000)
-        self.next_uid = 101
+        self.listeners = set()
+        count = random.randint(0, 100)
+        self.messages = [MessageState.random(uid)
+                         for uid in range(1, count + 1)]
+        self.next_uid = count + 1
 
-        self.messages = [MessageState() for i in range(random.randint(0, 100))]
+    def listen(self):
+        queue = asyncio.Queue()
+        self.listeners.add(queue)
+        return queue
 
-    @asyncio.coroutine
-    def get_info(self):
-        return {'message_count': len(self.messages),
-                'recent_count': 0,
-                'unseen': next(filter(lambda msg: msg.unseen,
-                                      self.messages), False),
-                'uid_validity': self.uid_validity,
-                'next_uid': self.next_uid}
+    def unlisten(self, queue):
+        self.listeners.discard(queue)
 
+    def notify(self, response):
+        """Passes the untagged response for a change to every listener.
 
-class MessageState(object):
+        :param response: The untagged response.
+        :type response: :class:`~pymap.parsing.response.Response`
 
-    def __init__(self):
+        """
+        for queue in self.listeners:
+            queue.put_nowait(response)
+
+    def _get_by_uid(self, uids):
+        by_uid = {msg.uid: (seq, msg)
+                  for seq, msg in enumerate(self.messages, 1)}
+        return [by_uid[uid] for uid in uids if uid in by_uid]
+
+    async def get_status(self):
+        unseen = sum(1 for msg in self.messages if br'\Seen' not in msg.flags)
+        return {b'MESSAGES': len(self.messages),
+                b'RECENT': 0,
+                b'UIDNEXT': self.next_uid,
+                b'UIDVALIDITY': self.uid_validity,
+                b'UNSEEN': unseen}
+
+    async def get_messages(self, seq_set, uid=False):
+        if uid:
+            max_uid = self.messages[-1].uid if self.messages else 0
+            return [(seq, msg) for seq, msg in enumerate(self.messages, 1)
+                    if seq_set.contains(msg.uid, max_uid)]
+        return [(seq, self.messages[seq - 1])
+                for seq in seq_set.iter(len(self.messages))]
+
+    async def get_content(self, uids, part):
+        return [msg.get_section(part) for _, msg in self._get_by_uid(uids)]
+
+    async def update_flags(self, uids, flags, mode='replace'):
+        flags = {bytes(flag) for flag in flags}
+        ret = []
+        for seq, msg in self._get_by_uid(uids):
+            if mode == 'add':
+                msg.flags |= flags
+            elif mode == 'subtract':
+                msg.flags -= flags
+            else:
+                msg.flags = set(flags)
+            ret.append(frozenset(msg.flags))
+            flag_list = List(sorted(msg.flags))
+            self.notify(FetchResponse(seq, [(b'FLAGS', flag_list)]))
+        return ret
+
+    async def append_messages(self, messages):
+        uids = []
+        for content, flags, when in messages:
+            msg = MessageState(self.next_uid, bytes(content),
+                               {bytes(flag) for flag in flags}, when)
+            self.messages.append(msg)
+            self.next_uid += 1
+            uids.append(msg.uid)
+        self.notify(ExistsResponse(len(self.messages)))
+        return uids
+
+    async def copy_messages(self, uids, mailbox):
+        messages = [(msg.content, msg.flags, msg.internal_date)
+                    for _, msg in self._get_by_uid(uids)]
+        return await mailbox.append_messages(messages)
+
+    async def expunge(self):
+        expunged = []
+        for seq in range(len(self.messages), 0, -1):
+            if br'\Deleted' in self.messages[seq - 1].flags:
+                del self.messages[seq - 1]
+                expunged.append(seq)
+                self.notify(ExpungeResponse(seq))
+        return expunged
+
+
+class MessageState(MessageInterface):
+
+    def __init__(self, uid, content, flags=None, when=None):
         super().__init__()
-        self.unseen = (random.randint(0, 9) >= 8)
+        self.uid = uid
+        self.content = content
+        self.flags = set(flags or [])
+        self.internal_date = when or datetime.now(timezone.utc)
+        self._headers = None
+
+    @classmethod
+    def random(cls, uid):
+        content = (b'From: sender@example.com\r\n'
+                   b'To: testuser@example.com\r\n'
+                   b'Subject: Test message %d\r\n'
+                   b'\r\n'
+                   b'This is test message %d.\r\n') % (uid, uid)
+        flags = set() if random.randint(0, 9) >= 8 else {br'\Seen'}
+        return cls(uid, content, flags)
+
+    def get_size(self):
+        return len(self.content)
+
+    def get_internal_date(self):
+        return self.internal_date
+
+    def get_header(self, name):
+        if self._headers is None:
+            self._headers = BytesHeaderParser().parsebytes(self.content)
+        return self._headers.get_all(name, [])
+
+    def get_text(self, include_headers=False):
+        if include_headers:
+            text = self.content
+        else:
+            _, _, text = self.content.partition(b'\r\n\r\n')
+        return str(text, 'utf-8', 'replace')
+
+    def get_section(self, part):
+        """Returns a section of the message content. The messages have a
+        single part, so the first MIME part is the body.
+
+        :param part: The section.
+        :type part: :class:`~pymap.fetch.FetchPart`
+        :rtype: bytes
+
+        """
+        header, _, body = self.content.partition(b'\r\n\r\n')
+        if part.headers_only:
+            lines = header.split(b'\r\n')
+            if part.text == b'HEADER.FIELDS':
+                lines = [line for line in lines
+                         if line.split(b':', 1)[0].upper() in part.fields]
+            elif part.text == b'HEADER.FIELDS.NOT':
+                lines = [line for line in lines
+                         if line.split(b':', 1)[0].upper() not in part.fields]
+            data = b'\r\n'.join(lines) + b'\r\n\r\n'
+        elif part.text is None and not part.path:
+            data = self.content
+        else:
+            data = body
+        if part.byte_range is not None:
+            start, end = part.byte_range
+            data = data[start:end]
+        return data
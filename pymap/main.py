@@ -20,112 +20,381 @@
 #
 
 from base64 import b64encode, b64decode
+from functools import partial
+import argparse
 import asyncio
+import binascii
+import importlib
+import logging
+import mmap
+import signal
+import socket
+import tempfile
 
-from pysasl import IssueChallenge, AuthenticationError, AuthenticationResult
+from pysasl.creds.plain import PlainCredentials
+from pysasl.exception import AuthenticationError
+from pysasl.mechanism import ServerChallenge, ChallengeResponse
 
+from .mailbox import DemoBackend
 from .state import CloseConnection, ConnectionState
+from .workers import WorkerSupervisor
+from pymap.parsing import NotParseable
 from pymap.parsing.command import BadCommand, Command
-from pymap.parsing.response import ResponseContinuation, ResponseBadCommand
+from pymap.parsing.response import (ResponseWriter, ResponseContinuation,
+                                    ResponseBad, ResponseBadCommand,
+                                    ResponseNo, ResponseBye)
+from pymap.parsing.response.code import TooBig
+from pymap.parsing.command.auth import IdleCommand
 from pymap.parsing.command.nonauth import AuthenticateCommand, LoginCommand
-from pymap.parsing import RequiresContinuation
+from pymap.parsing.primitives import LiteralString
+from pymap.parsing.specials import Tag
+
+
+log = logging.getLogger(__name__)
+
+#: The event loop implementations that may be chosen with ``--loop``.
+event_loops = ['asyncio', 'auto', 'uvloop']
 
 
 class Disconnected(Exception):
     pass
 
 
+class CommandRejected(Exception):
+    """Raised when a command is rejected before it has been completely read
+    from the client.
+
+    :param response: The response to send to the client.
+    :type response: :class:`~pymap.parsing.response.Response`
+
+    """
+
+    def __init__(self, response):
+        super().__init__()
+        self.response = response
+
+
 class IMAPServer(object):
+    """Handles a single IMAP client connection.
+
+    :param reader: The stream reader for the connection.
+    :type reader: :class:`~asyncio.StreamReader`
+    :param writer: The stream writer for the connection.
+    :type writer: :class:`~asyncio.StreamWriter`
+    :param backend: The storage backend.
+    :type backend: :class:`~pymap.interfaces.BackendInterface`
+    :param bool pipeline: If True, commands that are
+                          :attr:`~pymap.parsing.command.Command.concurrent`
+                          are started in the background and the next command
+                          is read without waiting for their responses.
+    :param int spool_threshold: Literals larger than this many bytes are
+                                written to a temporary file as they are read,
+                                instead of being held in memory.
+    :param int max_line_length: The connection is closed if a line longer than
+                                this many bytes is received. The stream reader
+                                should be created with the same ``limit``.
+    :param int max_literal_size: Commands with a literal string larger than
+                                 this many bytes are rejected.
+    :param int max_literal_total: Commands whose literal strings add up to
+                                  more than this many bytes are rejected.
+
+    """
+
+    #: The size of the chunks read from the stream when spooling a literal.
+    spool_chunk_size = 65536
 
-    def __init__(self, reader, writer):
+    def __init__(self, reader, writer, backend, pipeline=False,
+                 spool_threshold=1048576, max_line_length=65536,
+                 max_literal_size=67108864, max_literal_total=67108864):
         super().__init__()
         self.reader = reader
         self.writer = writer
+        self.backend = backend
+        self.pipeline = pipeline
+        self.spool_threshold = spool_threshold
+        self.max_line_length = max_line_length
+        self.max_literal_size = max_literal_size
+        self.max_literal_total = max_literal_total
+        self.output = ResponseWriter(writer)
+        self.pending = set()
+        self._send_lock = asyncio.Lock()
 
     @classmethod
-    @asyncio.coroutine
-    def callback(cls, reader, writer):
-        yield from cls(reader, writer).run()
+    async def callback(cls, reader, writer, **kwargs):
+        await cls(reader, writer, **kwargs).run()
 
-    @asyncio.coroutine
-    def read_continuation(self, literal_length):
+    async def send_response(self, response):
+        # A streamed response may wait to drain between its pieces, and the
+        # responses of pipelined commands must not be written in between.
+        async with self._send_lock:
+            await response.send_stream(self.output)
+
+    async def read_line(self):
         try:
-            extra_literal = yield from self.reader.readexactly(literal_length)
-        except asyncio.IncompleteReadError:
-            raise Disconnected
-        extra_line = yield from self.reader.readline()
+            line = await self.reader.readline()
+        except ValueError:
+            line = None
+        if line is None or len(line) > self.max_line_length:
+            bye = ResponseBye(b'Line too long.', TooBig())
+            raise CloseConnection(bye)
         if self.reader.at_eof():
             raise Disconnected
-        return extra_literal + extra_line
+        return line
 
-    @asyncio.coroutine
-    def authenticate(self, state, mech):
+    async def spool_continuation(self, literal_length):
+        # File operations may block on the disk, so they are run in the
+        # default executor instead of on the event loop.
+        loop = asyncio.get_event_loop()
+        spool = await loop.run_in_executor(None, tempfile.TemporaryFile)
+        with spool:
+            remaining = literal_length
+            try:
+                while remaining:
+                    chunk_size = min(remaining, self.spool_chunk_size)
+                    chunk = await self.reader.readexactly(chunk_size)
+                    await loop.run_in_executor(None, spool.write, chunk)
+                    remaining -= chunk_size
+            except asyncio.IncompleteReadError:
+                raise Disconnected
+            await loop.run_in_executor(None, spool.flush)
+            extra_literal = mmap.mmap(spool.fileno(), 0,
+                                      access=mmap.ACCESS_READ)
+        extra_line = await self.read_line()
+        return extra_literal, extra_line
+
+    async def read_continuation(self, literal_length):
+        """Reads a literal string and the rest of the line that follows it.
+        The literal is kept as it was read from the stream, or spooled to a
+        temporary file and mapped into memory if it is large, so that it is
+        not copied again when the command is parsed.
+
+        :param int literal_length: The length of the literal string.
+        :returns: A two-tuple of the literal data and the rest of the line.
+        :rtype: tuple
+
+        """
+        if literal_length > self.spool_threshold:
+            return await self.spool_continuation(literal_length)
+        try:
+            extra_literal = await self.reader.readexactly(literal_length)
+        except asyncio.IncompleteReadError:
+            raise Disconnected
+        extra_line = await self.read_line()
+        return extra_literal, extra_line
+
+    async def authenticate(self, state, mech):
         responses = []
         while True:
             try:
-                result = mech.server_attempt(responses)
-            except IssueChallenge as exc:
-                chal_bytes = b64encode(exc.challenge.challenge.encode('utf-8'))
-                cont = ResponseContinuation(chal_bytes)
-                yield from cont.send_stream(self.writer)
-                resp_bytes = yield from self.read_continuation(0)
-                exc.challenge.response = b64decode(resp_bytes).decode('utf-8')
-                responses.append(exc.challenge)
+                creds, _ = mech.server_attempt(responses)
+            except ServerChallenge as chal:
+                cont = ResponseContinuation(b64encode(chal.data))
+                await self.send_response(cont)
+                resp_bytes = await self.read_line()
+                responses.append(ChallengeResponse(chal.data,
+                                                   b64decode(resp_bytes)))
             else:
-                break
-        return result
+                return creds
 
-    @asyncio.coroutine
-    def read_command(self):
-        line = yield from self.reader.readline()
-        if self.reader.at_eof():
-            raise Disconnected
+    async def idle(self, updates):
+        """Sends the untagged responses put on the queue until the client
+        ends the ``IDLE`` command.
+
+        :param updates: Queue of untagged responses from the selected mailbox.
+        :type updates: :class:`~asyncio.Queue`
+        :returns: The line the client sent to end the command.
+
+        """
+        await self.send_response(ResponseContinuation(b'Idling.'))
+        done = asyncio.ensure_future(self.read_line())
+        try:
+            while True:
+                update = asyncio.ensure_future(updates.get())
+                await asyncio.wait([done, update],
+                                   return_when=asyncio.FIRST_COMPLETED)
+                if not update.done():
+                    update.cancel()
+                    break
+                await self.send_response(update.result())
+                if done.done():
+                    break
+        finally:
+            done.cancel()
+        return done.result()
+
+    def _check_literal(self, line, literal_length, literal_total, non_sync):
+        if literal_length > self.max_literal_size:
+            text = b'Literal string too large.'
+        elif literal_total > self.max_literal_total:
+            text = b'Literal strings in command too large.'
+        else:
+            return
+        if non_sync:
+            # The client is already sending the literal, the only way to
+            # avoid reading it is to close the connection.
+            raise CloseConnection(ResponseBye(text, TooBig()))
+        try:
+            tag, _ = Tag.parse(line)
+        except NotParseable:
+            tag = Tag(b'*')
+        raise CommandRejected(ResponseNo(tag.value, text, TooBig()))
+
+    async def read_command(self):
+        line = await self.read_line()
         conts = []
-        while True:
+        literal_total = 0
+        literal = LiteralString.get_literal_header(line)
+        while literal is not None:
+            literal_length, non_sync = literal
+            literal_total += literal_length
+            self._check_literal(line, literal_length, literal_total, non_sync)
+            if not non_sync:
+                cont = ResponseContinuation(b'Literal string')
+                await self.send_response(cont)
+            cont = await self.read_continuation(literal_length)
+            conts.append(cont)
+            literal = LiteralString.get_literal_header(cont[1])
+        cmd, _ = Command.parse(line, continuations=conts)
+        return cmd
+
+    async def _login(self, state, cmd):
+        # Authentication is handled here rather than by the connection state,
+        # since it reads from the client, but the state checks still apply.
+        response = state.check_state(cmd)
+        if response is not None:
+            return response
+        if isinstance(cmd, AuthenticateCommand):
             try:
-                cmd, _ = Command.parse(line, continuations=conts.copy())
-            except RequiresContinuation as req:
-                cont = ResponseContinuation(req.message)
-                yield from cont.send_stream(self.writer)
-                ret = yield from self.read_continuation(req.literal_length)
-                conts.append(ret)
+                creds = await self.authenticate(state, cmd.mech)
+            except (AuthenticationError, binascii.Error):
+                return ResponseNo(cmd.tag, b'Invalid authentication response.')
+        else:
+            creds = PlainCredentials(str(cmd.userid, 'utf-8', 'replace'),
+                                     str(cmd.password, 'utf-8', 'replace'))
+        return await state.do_authenticate(cmd, creds)
+
+    async def run_command(self, state, cmd):
+        try:
+            if isinstance(cmd, (AuthenticateCommand, LoginCommand)):
+                response = await self._login(state, cmd)
+            elif isinstance(cmd, IdleCommand):
+                response = await state.do_command(cmd, idle=self.idle)
             else:
-                return cmd
+                response = await state.do_command(cmd)
+        except CloseConnection as close:
+            await self.send_response(close.response)
+            raise
+        except Disconnected:
+            raise
+        except Exception:
+            log.exception('Error handling command: %r', cmd.command)
+            response = ResponseBad(cmd.tag, b'Server error.')
+        await self.send_response(response)
+
+    def start_command(self, state, cmd):
+        task = asyncio.ensure_future(self.run_command(state, cmd))
+        self.pending.add(task)
+        task.add_done_callback(self._command_done)
+
+    def _command_done(self, task):
+        self.pending.discard(task)
+        if task.cancelled() or task.exception() is None:
+            return
+        # As in the serial path, CloseConnection and Disconnected end the
+        # connection. Closing the writer makes the next read see EOF.
+        self.output.close()
+
+    async def wait_pending(self):
+        if self.pending:
+            await asyncio.wait(self.pending)
 
-    @asyncio.coroutine
-    def run(self):
-        state = ConnectionState(self.writer.transport)
-        greeting = yield from state.do_greeting()
-        yield from greeting.send_stream(self.writer)
+    async def run(self):
+        try:
+            await self._run_loop()
+        finally:
+            # Even if an error escapes the loop, the responses already
+            # written are flushed and the connection is closed.
+            self.output.close()
+
+    async def _run_loop(self):
+        state = ConnectionState(self.writer.transport, self.backend)
+        greeting = await state.do_greeting()
+        await self.send_response(greeting)
         while True:
             try:
-                cmd = yield from self.read_command()
+                cmd = await self.read_command()
             except BadCommand as bad:
-                yield from ResponseBadCommand(bad).send_stream(self.writer)
+                await self.send_response(ResponseBadCommand(bad))
+            except CommandRejected as exc:
+                await self.send_response(exc.response)
+            except CloseConnection as close:
+                await self.send_response(close.response)
+                break
             except Disconnected:
                 break
             else:
+                if self.pipeline and cmd.concurrent:
+                    self.start_command(state, cmd)
+                    continue
+                await self.wait_pending()
                 try:
-                    if isinstance(cmd, AuthenticateCommand):
-                        auth = yield from self.authenticate(state, cmd.mech)
-                        response = yield from state.do_authenticate(cmd, auth)
-                    elif isinstance(cmd, LoginCommand):
-                        auth = AuthenticationResult(cmd.userid, cmd.password)
-                        response = yield from state.do_authenticate(cmd, auth)
-                    else:
-                        response = yield from state.do_command(cmd)
-                except CloseConnection as close:
-                    yield from close.response.send_stream(self.writer)
+                    await self.run_command(state, cmd)
+                except (CloseConnection, Disconnected):
                     break
-                else:
-                    yield from response.send_stream(self.writer)
-        self.writer.close()
+        await self.wait_pending()
 
 
-def main():
-    loop = asyncio.get_event_loop()
-    coro = asyncio.start_server(IMAPServer.callback, port=1143, loop=loop)
+def get_event_loop_policy(name):
+    """Returns the event loop policy for the named event loop implementation.
+    Alternative implementations such as ``uvloop`` are only available if they
+    are installed, and ``auto`` will use the fastest one installed.
+
+    :param str name: One of :data:`event_loops`.
+    :raises ImportError: The named implementation is not installed.
+
+    """
+    if name == 'auto':
+        for name in event_loops:
+            if name in ('asyncio', 'auto'):
+                continue
+            try:
+                return get_event_loop_policy(name)
+            except ImportError:
+                pass
+        name = 'asyncio'
+    if name == 'asyncio':
+        return asyncio.DefaultEventLoopPolicy()
+    module = importlib.import_module(name)
+    return module.EventLoopPolicy()
+
+
+def listen_socket(port, backlog=100):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(('', port))
+    sock.listen(backlog)
+    sock.setblocking(False)
+    return sock
+
+
+def run_server(args, sock=None):
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    callback = partial(IMAPServer.callback, backend=DemoBackend(),
+                       pipeline=args.pipeline,
+                       spool_threshold=args.spool_threshold,
+                       max_line_length=args.max_line_length,
+                       max_literal_size=args.max_literal_size,
+                       max_literal_total=args.max_literal_total)
+    if sock is not None:
+        coro = asyncio.start_server(callback, sock=sock,
+                                    limit=args.max_line_length)
+    else:
+        coro = asyncio.start_server(callback, port=args.port,
+                                    limit=args.max_line_length,
+                                    reuse_port=args.reuse_port or None)
     server = loop.run_until_complete(coro)
+    loop.add_signal_handler(signal.SIGTERM, loop.stop)
 
     try:
         loop.run_forever()
@@ -135,3 +404,53 @@ def main():
     server.close()
     loop.run_until_complete(server.wait_closed())
     loop.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Lightweight, asynchronous IMAP serving in Python.')
+    parser.add_argument('--port', type=int, default=1143,
+                        help='The port to listen on.')
+    parser.add_argument('--loop', choices=event_loops, default='asyncio',
+                        help='The event loop implementation to use.')
+    parser.add_argument('--pipeline', action='store_true',
+                        help='Run pipelined commands concurrently when they '
+                             'are safe to do so.')
+    parser.add_argument('--spool-threshold', type=int, default=1048576,
+                        metavar='BYTES',
+                        help='Literals larger than this are spooled to a '
+                             'temporary file instead of held in memory.')
+    parser.add_argument('--max-line-length', type=int, default=65536,
+                        metavar='BYTES',
+                        help='Close connections that send a longer line.')
+    parser.add_argument('--max-literal-size', type=int, default=67108864,
+                        metavar='BYTES',
+                        help='Reject commands with a larger literal string.')
+    parser.add_argument('--max-literal-total', type=int, default=67108864,
+                        metavar='BYTES',
+                        help='Reject commands whose literal strings add up to '
+                             'more than this.')
+    parser.add_argument('--workers', type=int, default=0, metavar='NUM',
+                        help='Serve from this many pre-forked worker '
+                             'processes.')
+    parser.add_argument('--reuse-port', action='store_true',
+                        help='Each worker listens on its own socket with '
+                             'SO_REUSEPORT, instead of sharing one socket '
+                             'opened before forking.')
+    args = parser.parse_args()
+
+    try:
+        policy = get_event_loop_policy(args.loop)
+    except ImportError:
+        parser.error('event loop not installed: ' + args.loop)
+    asyncio.set_event_loop_policy(policy)
+
+    if args.workers > 0:
+        sock = None
+        if not args.reuse_port:
+            sock = listen_socket(args.port)
+        supervisor = WorkerSupervisor(partial(run_server, args, sock),
+                                      args.workers)
+        supervisor.run()
+    else:
+        run_server(args)
@@ -48,20 +48,23 @@ class NotParseable(PymapError):
     data formats.
 
     :param bytes buf: The buffer with the parsing error.
-    :param int where: The index where the parsing error started.
+    :param int where: The index in ``buf`` where the parsing error started,
+                      if not the start of the buffer.
 
     """
 
     error_indicator = b'[:ERROR:]'
 
-    def __init__(self, buf):
+    def __init__(self, buf, where=None):
         super().__init__()
         self.buf = buf
+        self.where = where
         if isinstance(buf, memoryview):
-            self.offset = offset = len(buf.obj) - buf.nbytes
+            self.offset = len(buf.obj) - buf.nbytes
         else:
             self.offset = 0
-
+        if where:
+            self.offset += where
 
     @property
     def before(self):
@@ -77,10 +80,13 @@ class NotParseable(PymapError):
     def after(self):
         if hasattr(self, '_after'):
             return self._after
-        if isinstance(self.buf, memoryview):
-            self._after = after = self.buf.tobytes()
+        buf = self.buf
+        if self.where:
+            buf = buf[self.where:]
+        if isinstance(buf, memoryview):
+            self._after = after = buf.tobytes()
         else:
-            self._after = after = self.buf
+            self._after = after = buf
         return after
 
     def __bytes__(self):
@@ -110,10 +116,23 @@ class Parseable(object):
     This base class will be inherited by all necessary entries in the IMAP
     formal syntax section.
 
+    Sub-classes implement :meth:`parse_at`, which parses from a position in
+    the buffer and returns the position where parsing ended, so that a
+    command is parsed without slicing the buffer for every token.
+    :meth:`parse` wraps it for callers that want the remaining buffer.
+
     """
 
+    __slots__ = []
+
     _whitespace_pattern = re.compile(br' +')
 
+    #: The byte values that this type may start with, after any leading
+    #: spaces. When given, alternatives that cannot match are skipped by
+    #: looking at a single byte, rather than attempting to parse them and
+    #: catching :exc:`NotParseable`. ``None`` means any byte is possible.
+    lookahead = None
+
     @classmethod
     def _whitespace_length(cls, buf, start=0):
         match = cls._whitespace_pattern.match(buf, start)
@@ -122,14 +141,68 @@ class Parseable(object):
         return 0
 
     @classmethod
-    def parse(cls, buf, expected, **kwargs):
+    def peek(cls, buf, pos=0):
+        """Returns the value of the first byte in the buffer that is not a
+        space, without parsing anything.
+
+        :param bytes buf: The buffer to look at.
+        :param int pos: The position in the buffer to start looking.
+        :returns: The byte value, or ``None`` if the buffer is only spaces.
+        :rtype: int
+
+        """
+        pos += cls._whitespace_length(buf, pos)
+        if pos < len(buf):
+            return buf[pos]
+        return None
+
+    @classmethod
+    def parse(cls, buf, *args, continuations=None, **kwargs):
+        """Parses the object from the start of the buffer, returning it with
+        the remainder of the buffer. Any other arguments are passed to
+        :meth:`parse_at`.
+
+        :param bytes buf: The buffer to parse.
+        :param list continuations: Each continuation is a two-tuple of the
+                                   data of a literal string and the rest of
+                                   the line that follows it, or the two
+                                   joined together.
+        :returns: A two-tuple of the parsed object and the remaining buffer.
+        :rtype: tuple
+
+        """
+        if continuations is not None:
+            buf, kwargs['literals'] = LiteralString.split_continuations(
+                buf, continuations)
         buf = memoryview(buf)
+        ret, pos = cls.parse_at(buf, 0, *args, **kwargs)
+        return ret, buf[pos:]
+
+    @classmethod
+    def parse_at(cls, buf, pos, expected, **kwargs):
+        """Parses the object from the given position in the buffer. On the
+        base class, the object is parsed as the first of the ``expected``
+        types that succeeds.
+
+        :param bytes buf: The buffer to parse.
+        :param int pos: The position in ``buf`` to start parsing.
+        :param list expected: The types to try parsing.
+        :returns: A two-tuple of the parsed object and the position where
+                  parsing ended.
+        :rtype: tuple
+        :raises NotParseable: The object could not be parsed.
+
+        """
+        first = cls.peek(buf, pos)
         for data_type in expected:
+            lookahead = data_type.lookahead
+            if lookahead is not None and first not in lookahead:
+                continue
             try:
-                return data_type.parse(buf, **kwargs)
+                return data_type.parse_at(buf, pos, **kwargs)
             except NotParseable:
                 pass
-        raise UnexpectedType(buf)
+        raise UnexpectedType(buf, pos)
 
 
 class Space(Parseable):
@@ -139,17 +212,18 @@ class Space(Parseable):
 
     """
 
+    __slots__ = ['length']
+
     def __init__(self, length):
         super().__init__()
         self.length = length
 
     @classmethod
-    def parse(cls, buf, **kwargs):
-        buf = memoryview(buf)
-        ret = cls._whitespace_length(buf)
+    def parse_at(cls, buf, pos, **kwargs):
+        ret = cls._whitespace_length(buf, pos)
         if not ret:
-            raise NotParseable(buf)
-        return cls(ret), buf[ret:]
+            raise NotParseable(buf, pos)
+        return cls(ret), pos + ret
 
     def __bytes__(self):
         return b' ' * self.length
@@ -161,6 +235,8 @@ class EndLine(Parseable):
 
     """
 
+    __slots__ = ['preceding_spaces', 'carriage_return']
+
     _pattern = re.compile(br' *(\r?)\n')
 
     def __init__(self, preceding_spaces=0, carriage_return=True):
@@ -169,15 +245,19 @@ class EndLine(Parseable):
         self.carriage_return = carriage_return
 
     @classmethod
-    def parse(cls, buf):
-        buf = memoryview(buf)
-        match = cls._pattern.match(buf)
+    def parse_at(cls, buf, pos, **kwargs):
+        match = cls._pattern.match(buf, pos)
         if not match:
-            raise NotParseable(buf)
-        preceding_spaces = match.start(1)
+            raise NotParseable(buf, pos)
+        preceding_spaces = match.start(1) - pos
         carriage_return = bool(match.group(1))
-        return cls(preceding_spaces, carriage_return), buf[match.end(0):]
+        return cls(preceding_spaces, carriage_return), match.end(0)
 
     def __bytes__(self):
         endl = b'\r\n' if self.carriage_return else b'\n'
         return b' ' * self.preceding_spaces + endl
+
+
+# LiteralString is needed by Parseable.parse to split continuations, and must
+# be imported after the base classes above are defined.
+from .primitives import LiteralString  # NOPEP8
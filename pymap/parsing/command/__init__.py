@@ -22,7 +22,7 @@
 import re
 
 from .. import Parseable, NotParseable, Space, EndLine
-from ..primitives import Atom
+from ..primitives import Atom, LiteralString
 from ..specials import Tag
 
 __all__ = ['CommandNotFound', 'BadCommand', 'Command', 'CommandNoArgs',
@@ -35,8 +35,8 @@ class BadCommand(NotParseable):
 
     """
 
-    def __init__(self, buf, tag, command):
-        super().__init__(buf)
+    def __init__(self, buf, tag, command, where=None):
+        super().__init__(buf, where)
         self.tag = tag
         self.command = command
 
@@ -74,8 +74,15 @@ class Command(Parseable):
 
     """
 
+    __slots__ = ['tag']
+
     _commands = {}
 
+    #: True if the command has no side-effects on the session or mailbox
+    #: state, so that it may run concurrently with other such commands when
+    #: they are pipelined by the client.
+    concurrent = False
+
     def __init__(self, tag):
         super().__init__()
         self.tag = tag
@@ -85,25 +92,53 @@ class Command(Parseable):
         cls._commands[command.command] = command
 
     @classmethod
-    def parse(cls, buf, **kwargs):
-        from . import any, auth, nonauth, select
+    def parse(cls, buf, continuations=None, **kwargs):
+        if continuations is not None:
+            buf, kwargs['literals'] = LiteralString.split_continuations(
+                buf, continuations)
         buf = memoryview(buf)
         tag = Tag(b'*')
+        pos = 0
         try:
-            tag, buf = Tag.parse(buf)
-            _, buf = Space.parse(buf)
-            atom, buf = Atom.parse(buf)
+            tag, pos = Tag.parse_at(buf, pos)
+            _, pos = Space.parse_at(buf, pos)
+            atom, pos = Atom.parse_at(buf, pos)
             command = atom.value.upper()
         except NotParseable:
-            raise CommandNotFound(buf, tag.value)
+            raise CommandNotFound(buf[pos:], tag.value)
+        buf = buf[pos:]
         cmd_type = cls._commands.get(command)
         if cmd_type:
             try:
                 return cmd_type._parse(tag.value, buf, **kwargs)
             except NotParseable as exc:
-                raise BadCommand(exc.buf, tag.value, cmd_type)
+                raise BadCommand(exc.buf, tag.value, cmd_type, exc.where)
         raise CommandNotFound(buf, tag.value, command)
 
+    @classmethod
+    def _parse(cls, tag, buf, **kwargs):
+        buf = memoryview(buf)
+        ret, pos = cls._parse_at(tag, buf, 0, **kwargs)
+        return ret, buf[pos:]
+
+    @classmethod
+    def _parse_at(cls, tag, buf, pos, **kwargs):
+        """Parses the arguments of the command, which follow the command
+        name at the given position in the buffer. Every command class must
+        implement this method.
+
+        :param bytes tag: The tag parsed from the beginning of the command
+                          line.
+        :param bytes buf: The buffer to parse.
+        :param int pos: The position in ``buf`` after the command name.
+        :returns: A two-tuple of the command object and the position where
+                  parsing ended.
+        :rtype: tuple
+        :raises NotParseable: The arguments could not be parsed.
+
+        """
+        raise NotImplementedError()
+
 
 class CommandNoArgs(Command):
     """Convenience class used to fail parsing when args are given to a command
@@ -111,17 +146,19 @@ class CommandNoArgs(Command):
 
     """
 
+    __slots__ = []
+
     @classmethod
-    def _parse(cls, tag, buf, **kwargs):
-        _, buf = EndLine.parse(buf)
-        return cls(tag), buf
+    def _parse_at(cls, tag, buf, pos, **kwargs):
+        _, pos = EndLine.parse_at(buf, pos)
+        return cls(tag), pos
 
 
 class CommandAny(Command):
     """Represents a command available at any stage of the IMAP session.
 
     """
-    pass
+    __slots__ = []
 
 
 class CommandAuth(Command):
@@ -129,7 +166,7 @@ class CommandAuth(Command):
     authenticated.
 
     """
-    pass
+    __slots__ = []
 
 
 class CommandNonAuth(Command):
@@ -137,7 +174,7 @@ class CommandNonAuth(Command):
     authenticated.
 
     """
-    pass
+    __slots__ = []
 
 
 class CommandSelect(CommandAuth):
@@ -145,4 +182,9 @@ class CommandSelect(CommandAuth):
     authenticated and a mailbox has been selected.
 
     """
-    pass
+    __slots__ = []
+
+
+# Importing these modules registers their commands. This must happen after
+# the base classes above are defined, since the modules depend on them.
+from . import any, auth, nonauth, select  # NOPEP8
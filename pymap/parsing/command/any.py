@@ -25,18 +25,25 @@ __all__ = ['CapabilityCommand', 'LogoutCommand', 'NoOpCommand']
 
 
 class CapabilityCommand(CommandAny, CommandNoArgs):
+    __slots__ = []
+
     command = b'CAPABILITY'
+    concurrent = True
 
 CommandAny.register_command(CapabilityCommand)
 
 
 class LogoutCommand(CommandAny, CommandNoArgs):
+    __slots__ = []
+
     command = b'LOGOUT'
 
 CommandAny.register_command(LogoutCommand)
 
 
 class NoOpCommand(CommandAny, CommandNoArgs):
+    __slots__ = []
+
     command = b'NOOP'
 
 CommandAny.register_command(NoOpCommand)
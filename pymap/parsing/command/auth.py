@@ -21,31 +21,36 @@
 
 from datetime import datetime
 
-from .. import NotParseable, UnexpectedType, Space, EndLine
+from .. import NotParseable, Space, EndLine
 from ..primitives import Atom, List, LiteralString
-from ..specials import InvalidContent, Mailbox, DateTime, Flag, StatusAttribute
-from . import CommandAuth
+from ..specials import (Mailbox, ListMailbox, DateTime, Flag,
+                        StatusAttribute)
+from . import CommandAuth, CommandNoArgs
 
 __all__ = ['AppendCommand', 'CreateCommand', 'DeleteCommand', 'ExamineCommand',
-           'ListCommand', 'LSubCommand', 'RenameCommand', 'SelectCommand',
-           'StatusCommand', 'SubscribeCommand', 'UnsubscribeCommand']
+           'IdleCommand', 'ListCommand', 'LSubCommand', 'RenameCommand',
+           'SelectCommand', 'StatusCommand', 'SubscribeCommand',
+           'UnsubscribeCommand']
 
 
 class CommandMailboxArg(CommandAuth):
+    __slots__ = ['mailbox']
 
     def __init__(self, tag, mailbox):
         super().__init__(tag)
         self.mailbox = mailbox
 
     @classmethod
-    def _parse(cls, tag, buf, **kwargs):
-        _, buf = Space.parse(buf)
-        mailbox, buf = Mailbox.parse(buf)
-        _, buf = EndLine.parse(buf)
-        return cls(tag, mailbox.value), buf
+    def _parse_at(cls, tag, buf, pos, **kwargs):
+        _, pos = Space.parse_at(buf, pos)
+        mailbox, pos = Mailbox.parse_at(buf, pos, **kwargs)
+        _, pos = EndLine.parse_at(buf, pos)
+        return cls(tag, mailbox.value), pos
 
 
 class AppendCommand(CommandAuth):
+    __slots__ = ['mailbox', 'message', 'flag_list', 'when']
+
     command = b'APPEND'
 
     def __init__(self, tag, mailbox, message, flag_list=None, when=None):
@@ -56,56 +61,65 @@ class AppendCommand(CommandAuth):
         self.when = when or datetime.now()
 
     @classmethod
-    def _parse(cls, tag, buf, **kwargs):
-        _, buf = Space.parse(buf)
-        mailbox, buf = Mailbox.parse(buf)
-        _, buf = Space.parse(buf)
-        try:
-            flag_list, buf = List.parse(buf, list_expected=[Flag])
-        except UnexpectedType:
-            raise
-        except NotParseable:
-            flag_list = None
-        else:
+    def _parse_at(cls, tag, buf, pos, **kwargs):
+        _, pos = Space.parse_at(buf, pos)
+        mailbox, pos = Mailbox.parse_at(buf, pos, **kwargs)
+        _, pos = Space.parse_at(buf, pos)
+        flag_list = None
+        if cls.peek(buf, pos) in List.lookahead:
+            flag_list, pos = List.parse_at(buf, pos, list_expected=[Flag])
             flag_list = flag_list.value
-            _, buf = Space.parse(buf)
-        try:
-            date_time, buf = DateTime.parse(buf)
-        except InvalidContent:
-            raise
-        except NotParseable:
-            date_time = None
-        else:
+            _, pos = Space.parse_at(buf, pos)
+        date_time = None
+        if cls.peek(buf, pos) in DateTime.lookahead:
+            date_time, pos = DateTime.parse_at(buf, pos)
             date_time = date_time.when
-            _, buf = Space.parse(buf)
-        message, buf = LiteralString.parse(buf, **kwargs)
-        _, buf = EndLine.parse(buf)
+            _, pos = Space.parse_at(buf, pos)
+        message, pos = LiteralString.parse_at(buf, pos, **kwargs)
+        _, pos = EndLine.parse_at(buf, pos)
         return cls(tag, mailbox.value, message.value,
-                   flag_list, date_time), buf
+                   flag_list, date_time), pos
 
 CommandAuth.register_command(AppendCommand)
 
 
 class CreateCommand(CommandMailboxArg):
+    __slots__ = []
+
     command = b'CREATE'
 
 CommandAuth.register_command(CreateCommand)
 
 
 class DeleteCommand(CommandMailboxArg):
+    __slots__ = []
+
     command = b'DELETE'
 
 CommandAuth.register_command(DeleteCommand)
 
 
 class ExamineCommand(CommandMailboxArg):
+    __slots__ = []
+
     command = b'EXAMINE'
 
 CommandAuth.register_command(ExamineCommand)
 
 
+class IdleCommand(CommandAuth, CommandNoArgs):
+    __slots__ = []
+
+    command = b'IDLE'
+
+CommandAuth.register_command(IdleCommand)
+
+
 class ListCommand(CommandAuth):
+    __slots__ = ['mailbox', 'list_mailbox']
+
     command = b'LIST'
+    concurrent = True
 
     def __init__(self, tag, mailbox, list_mailbox):
         super().__init__(tag)
@@ -113,19 +127,22 @@ class ListCommand(CommandAuth):
         self.list_mailbox = list_mailbox
 
     @classmethod
-    def _parse(cls, tag, buf, **kwargs):
-        _, buf = Space.parse(buf)
-        mailbox, buf = Mailbox.parse(buf)
-        _, buf = Space.parse(buf)
-        list_mailbox, buf = Mailbox.parse(buf)
-        _, buf = EndLine.parse(buf)
-        return cls(tag, mailbox.value, list_mailbox.value), buf
+    def _parse_at(cls, tag, buf, pos, **kwargs):
+        _, pos = Space.parse_at(buf, pos)
+        mailbox, pos = Mailbox.parse_at(buf, pos, **kwargs)
+        _, pos = Space.parse_at(buf, pos)
+        list_mailbox, pos = ListMailbox.parse_at(buf, pos, **kwargs)
+        _, pos = EndLine.parse_at(buf, pos)
+        return cls(tag, mailbox.value, list_mailbox.value), pos
 
 CommandAuth.register_command(ListCommand)
 
 
 class LSubCommand(CommandAuth):
+    __slots__ = ['mailbox', 'list_mailbox']
+
     command = b'LSUB'
+    concurrent = True
 
     def __init__(self, tag, mailbox, list_mailbox):
         super().__init__(tag)
@@ -133,45 +150,52 @@ class LSubCommand(CommandAuth):
         self.list_mailbox = list_mailbox
 
     @classmethod
-    def _parse(cls, tag, buf, **kwargs):
-        _, buf = Space.parse(buf)
-        mailbox, buf = Mailbox.parse(buf)
-        _, buf = Space.parse(buf)
-        list_mailbox, buf = Mailbox.parse(buf)
-        _, buf = EndLine.parse(buf)
-        return cls(tag, mailbox.value, list_mailbox.value), buf
+    def _parse_at(cls, tag, buf, pos, **kwargs):
+        _, pos = Space.parse_at(buf, pos)
+        mailbox, pos = Mailbox.parse_at(buf, pos, **kwargs)
+        _, pos = Space.parse_at(buf, pos)
+        list_mailbox, pos = ListMailbox.parse_at(buf, pos, **kwargs)
+        _, pos = EndLine.parse_at(buf, pos)
+        return cls(tag, mailbox.value, list_mailbox.value), pos
 
 CommandAuth.register_command(LSubCommand)
 
 
 class RenameCommand(CommandAuth):
+    __slots__ = ['from_mailbox', 'to_mailbox']
+
     command = b'RENAME'
 
     def __init__(self, tag, from_mailbox, to_mailbox):
         super().__init__(tag)
-        self.mailbox = mailbox
-        self.list_mailbox = list_mailbox
+        self.from_mailbox = from_mailbox
+        self.to_mailbox = to_mailbox
 
     @classmethod
-    def _parse(cls, tag, buf, **kwargs):
-        _, buf = Space.parse(buf)
-        from_mailbox, buf = Mailbox.parse(buf)
-        _, buf = Space.parse(buf)
-        to_mailbox, buf = Mailbox.parse(buf)
-        _, buf = EndLine.parse(buf)
-        return cls(tag, from_mailbox.value, to_mailbox.value), buf
+    def _parse_at(cls, tag, buf, pos, **kwargs):
+        _, pos = Space.parse_at(buf, pos)
+        from_mailbox, pos = Mailbox.parse_at(buf, pos, **kwargs)
+        _, pos = Space.parse_at(buf, pos)
+        to_mailbox, pos = Mailbox.parse_at(buf, pos, **kwargs)
+        _, pos = EndLine.parse_at(buf, pos)
+        return cls(tag, from_mailbox.value, to_mailbox.value), pos
 
 CommandAuth.register_command(RenameCommand)
 
 
 class SelectCommand(CommandMailboxArg):
+    __slots__ = []
+
     command = b'SELECT'
 
 CommandAuth.register_command(SelectCommand)
 
 
 class StatusCommand(CommandAuth):
+    __slots__ = ['mailbox', 'status_list']
+
     command = b'STATUS'
+    concurrent = True
 
     def __init__(self, tag, mailbox, status_list):
         super().__init__(tag)
@@ -179,26 +203,31 @@ class StatusCommand(CommandAuth):
         self.status_list = status_list
 
     @classmethod
-    def _parse(cls, tag, buf, **kwargs):
-        _, buf = Space.parse(buf)
-        mailbox, buf = Mailbox.parse(buf)
-        _, buf = Space.parse(buf)
-        status_list, after = List.parse(buf, list_expected=[StatusAttribute])
+    def _parse_at(cls, tag, buf, pos, **kwargs):
+        _, pos = Space.parse_at(buf, pos)
+        mailbox, pos = Mailbox.parse_at(buf, pos, **kwargs)
+        _, pos = Space.parse_at(buf, pos)
+        status_list, after = List.parse_at(buf, pos,
+                                           list_expected=[StatusAttribute])
         if not status_list.value:
-            raise NotParseable(buf)
-        _, buf = EndLine.parse(after)
-        return cls(tag, mailbox.value, status_list.value), buf
+            raise NotParseable(buf, pos)
+        _, pos = EndLine.parse_at(buf, after)
+        return cls(tag, mailbox.value, status_list.value), pos
 
 CommandAuth.register_command(StatusCommand)
 
 
 class SubscribeCommand(CommandMailboxArg):
+    __slots__ = []
+
     command = b'SUBSCRIBE'
 
 CommandAuth.register_command(SubscribeCommand)
 
 
 class UnsubscribeCommand(CommandMailboxArg):
+    __slots__ = []
+
     command = b'UNSUBSCRIBE'
 
 CommandAuth.register_command(UnsubscribeCommand)
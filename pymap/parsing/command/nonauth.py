@@ -19,7 +19,7 @@
 # THE SOFTWARE.
 #
 
-from pysasl import ServerMechanism
+from pysasl import SASLAuth
 
 from .. import NotParseable, Parseable, Space, EndLine
 from ..primitives import Atom
@@ -30,28 +30,33 @@ __all__ = ['AuthenticateCommand', 'LoginCommand', 'StartTLSCommand']
 
 
 class AuthenticateCommand(CommandNonAuth):
+    __slots__ = ['mech']
+
     command = b'AUTHENTICATE'
 
+    #: The SASL mechanisms that may be given to the command.
+    auth = SASLAuth.defaults()
+
     def __init__(self, tag, mech):
         super().__init__(tag)
-        self.mech = mech()
+        self.mech = mech
 
     @classmethod
-    def _parse(cls, tag, buf, **kwargs):
-        _, buf = Space.parse(buf)
-        atom, after = Atom.parse(buf)
-        _, after = EndLine.parse(after)
-        available = ServerMechanism.get_available(True)
-        mech_name = str(atom.value.upper(), 'ascii')
-        mech = available.get(mech_name)
+    def _parse_at(cls, tag, buf, pos, **kwargs):
+        _, pos = Space.parse_at(buf, pos)
+        atom, after = Atom.parse_at(buf, pos)
+        _, after = EndLine.parse_at(buf, after)
+        mech = cls.auth.get_server(atom.value)
         if not mech:
-            raise NotParseable(buf)
+            raise NotParseable(buf, pos)
         return cls(tag, mech), after
 
 CommandNonAuth.register_command(AuthenticateCommand)
 
 
 class LoginCommand(CommandNonAuth):
+    __slots__ = ['userid', 'password']
+
     command = b'LOGIN'
 
     def __init__(self, tag, userid, password):
@@ -60,18 +65,20 @@ class LoginCommand(CommandNonAuth):
         self.password = password
 
     @classmethod
-    def _parse(cls, tag, buf, **kwargs):
-        _, buf = Space.parse(buf)
-        userid, buf = AString.parse(buf, **kwargs)
-        _, buf = Space.parse(buf)
-        password, buf = AString.parse(buf, **kwargs)
-        _, buf = EndLine.parse(buf)
-        return cls(tag, userid.value, password.value), buf
+    def _parse_at(cls, tag, buf, pos, **kwargs):
+        _, pos = Space.parse_at(buf, pos)
+        userid, pos = AString.parse_at(buf, pos, **kwargs)
+        _, pos = Space.parse_at(buf, pos)
+        password, pos = AString.parse_at(buf, pos, **kwargs)
+        _, pos = EndLine.parse_at(buf, pos)
+        return cls(tag, userid.value, password.value), pos
 
 CommandNonAuth.register_command(LoginCommand)
 
 
 class StartTLSCommand(CommandNonAuth, CommandNoArgs):
+    __slots__ = []
+
     command = b'STARTTLS'
 
 CommandNonAuth.register_command(StartTLSCommand)
@@ -23,8 +23,8 @@ import re
 
 from .. import NotParseable, Space, EndLine
 from ..primitives import Atom, List
-from ..specials import (AString, Mailbox, SequenceSet, Flag, FetchAttribute,
-    SearchKey)
+from ..specials import (InvalidContent, AString, Mailbox, SequenceSet, Flag,
+                        FetchAttribute, SearchKey)
 from . import CommandSelect, CommandNoArgs
 
 __all__ = ['CheckCommand', 'CloseCommand', 'ExpungeCommand', 'CopyCommand',
@@ -32,24 +32,32 @@ __all__ = ['CheckCommand', 'CloseCommand', 'ExpungeCommand', 'CopyCommand',
 
 
 class CheckCommand(CommandSelect, CommandNoArgs):
+    __slots__ = []
+
     command = b'CHECK'
 
 CommandSelect.register_command(CheckCommand)
 
 
 class CloseCommand(CommandSelect, CommandNoArgs):
+    __slots__ = []
+
     command = b'CLOSE'
 
 CommandSelect.register_command(CloseCommand)
 
 
 class ExpungeCommand(CommandSelect, CommandNoArgs):
+    __slots__ = []
+
     command = b'EXPUNGE'
 
 CommandSelect.register_command(ExpungeCommand)
 
 
 class CopyCommand(CommandSelect):
+    __slots__ = ['sequence_set', 'mailbox', 'uid']
+
     command = b'COPY'
 
     def __init__(self, tag, seq_set, mailbox, uid=False):
@@ -59,74 +67,76 @@ class CopyCommand(CommandSelect):
         self.uid = uid
 
     @classmethod
-    def _parse(cls, tag, buf, uid=False, **kwargs):
-        _, buf = Space.parse(buf)
-        seq_set, buf = SequenceSet.parse(buf)
-        _, buf = Space.parse(buf)
-        mailbox, buf = Mailbox.parse(buf)
-        _, buf = EndLine.parse(buf)
-        return cls(tag, seq_set.sequences, mailbox.value, uid=uid), buf
+    def _parse_at(cls, tag, buf, pos, uid=False, **kwargs):
+        _, pos = Space.parse_at(buf, pos)
+        seq_set, pos = SequenceSet.parse_at(buf, pos)
+        _, pos = Space.parse_at(buf, pos)
+        mailbox, pos = Mailbox.parse_at(buf, pos, **kwargs)
+        _, pos = EndLine.parse_at(buf, pos)
+        return cls(tag, seq_set.sequences, mailbox.value, uid=uid), pos
 
 CommandSelect.register_command(CopyCommand)
 
 
 class FetchCommand(CommandSelect):
+    __slots__ = ['sequence_set', 'attributes', 'uid']
+
     command = b'FETCH'
 
+    _macros = {b'ALL': [b'FLAGS', b'INTERNALDATE', b'RFC822.SIZE',
+                        b'ENVELOPE'],
+               b'FAST': [b'FLAGS', b'INTERNALDATE', b'RFC822.SIZE'],
+               b'FULL': [b'FLAGS', b'INTERNALDATE', b'RFC822.SIZE',
+                         b'ENVELOPE', b'BODY']}
+
     def __init__(self, tag, seq_set, attr_list, uid=False):
         super().__init__(tag)
         self.sequence_set = seq_set
         self.attributes = attr_list
         self.uid = uid
 
+    @property
+    def concurrent(self):
+        for attr in self.attributes:
+            if attr.attribute in (b'RFC822', b'RFC822.TEXT'):
+                return False
+            elif attr.attribute == b'BODY' and attr.section is not None:
+                return False
+        return True
+
     @classmethod
-    def _check_macros(cls, buf):
-        atom, after = Atom.parse(buf)
-        macro = atom.value.upper()
-        if macro == b'ALL':
-            attrs = [FetchAttribute(b'FLAGS'),
-                     FetchAttribute(b'INTERNALDATE'),
-                     FetchAttribute(b'RFC822.SIZE'),
-                     FetchAttribute(b'Envelope')]
-            return attrs, after
-        elif macro == b'FULL':
-            attrs = [FetchAttribute(b'FLAGS'),
-                     FetchAttribute(b'INTERNALDATE'),
-                     FetchAttribute(b'RFC822.SIZE')]
-            return attrs, after
-        elif macro == b'FAST':
-            attrs = [FetchAttribute(b'FLAGS'),
-                     FetchAttribute(b'INTERNALDATE'),
-                     FetchAttribute(b'RFC822.SIZE'),
-                     FetchAttribute(b'Envelope'),
-                     FetchAttribute(b'BODY')]
-            return attrs, after
-        raise NotParseable(buf)
+    def _check_macros(cls, buf, pos):
+        if cls.peek(buf, pos) not in Atom.lookahead:
+            return None, pos
+        atom, after = Atom.parse_at(buf, pos)
+        names = cls._macros.get(atom.value.upper())
+        if names is None:
+            return None, pos
+        return [FetchAttribute.intern(name) for name in names], after
 
     @classmethod
-    def _parse(cls, tag, buf, uid=False, **kwargs):
-        _, buf = Space.parse(buf)
-        seq_set, buf = SequenceSet.parse(buf)
-        _, buf = Space.parse(buf)
-        try:
-            attrs, buf = cls._check_macros(buf)
-        except NotParseable:
-            pass
-        else:
-            return cls(tag, seq_set.sequences, attrs), buf
-        try:
-            attr, buf = FetchAttribute.parse(buf)
-        except NotParseable:
-            pass
+    def _parse_at(cls, tag, buf, pos, uid=False, **kwargs):
+        _, pos = Space.parse_at(buf, pos)
+        seq_set, pos = SequenceSet.parse_at(buf, pos)
+        _, pos = Space.parse_at(buf, pos)
+        if cls.peek(buf, pos) in List.lookahead:
+            attr_list, pos = List.parse_at(buf, pos,
+                                           list_expected=[FetchAttribute])
+            attrs = attr_list.value
         else:
-            return cls(tag, seq_set.sequences, [attr]), buf
-        attr_list, buf = List.parse(buf, list_expected=[FetchAttribute])
-        return cls(tag, seq_set.sequences, attr_list.value, uid=uid), buf
+            attrs, pos = cls._check_macros(buf, pos)
+            if attrs is None:
+                attr, pos = FetchAttribute.parse_at(buf, pos)
+                attrs = [attr]
+        _, pos = EndLine.parse_at(buf, pos)
+        return cls(tag, seq_set.sequences, attrs, uid=uid), pos
 
 CommandSelect.register_command(FetchCommand)
 
 
 class StoreCommand(CommandSelect):
+    __slots__ = ['sequence_set', 'flag_list', 'uid', 'mode', 'silent']
+
     command = b'STORE'
 
     _info_pattern = re.compile(br'^([+-]?)FLAGS(\.SILENT)?$', re.I)
@@ -142,63 +152,76 @@ class StoreCommand(CommandSelect):
         self.silent = silent
 
     @classmethod
-    def _parse_store_info(cls, buf):
-        info, after = Atom.parse(buf)
+    def _parse_store_info(cls, buf, pos):
+        info, after = Atom.parse_at(buf, pos)
         match = cls._info_pattern.match(info.value)
         if not match:
-            raise NotParseable(buf)
+            raise NotParseable(buf, pos)
         mode = cls._modes[match.group(1)]
         silent = bool(match.group(2))
         return {'mode': mode, 'silent': silent}, after
 
     @classmethod
-    def _parse_flag_list(cls, buf):
-        try:
-            flag_list, buf = List.parse(buf, list_expected=[Flag])
-        except NotParseable:
-            pass
-        else:
-            return flag_list.value, buf
+    def _parse_flag_list(cls, buf, pos):
+        if cls.peek(buf, pos) in List.lookahead:
+            flag_list, pos = List.parse_at(buf, pos, list_expected=[Flag])
+            return flag_list.value, pos
         flag_list = []
-        while True:
-            try:
-                flag, buf = Flag.parse(buf)
-                flag_list.append(flag)
-                _, buf = Space.parse(buf)
-            except NotParseable:
-                return flag_list, buf
+        while cls.peek(buf, pos) in Flag.lookahead:
+            flag, pos = Flag.parse_at(buf, pos)
+            flag_list.append(flag)
+        return flag_list, pos
 
     @classmethod
-    def _parse(cls, tag, buf, uid=False, **kwargs):
-        _, buf = Space.parse(buf)
-        seq_set, buf = SequenceSet.parse(buf)
-        _, buf = Space.parse(buf)
-        info, buf = cls._parse_store_info(buf)
-        _, buf = Space.parse(buf)
-        flag_list, buf = cls._parse_flag_list(buf)
-        _, buf = EndLine.parse(buf)
-        return cls(tag, seq_set.sequences, flag_list, uid=uid, **info), buf
+    def _parse_at(cls, tag, buf, pos, uid=False, **kwargs):
+        _, pos = Space.parse_at(buf, pos)
+        seq_set, pos = SequenceSet.parse_at(buf, pos)
+        _, pos = Space.parse_at(buf, pos)
+        info, pos = cls._parse_store_info(buf, pos)
+        _, pos = Space.parse_at(buf, pos)
+        flag_list, pos = cls._parse_flag_list(buf, pos)
+        _, pos = EndLine.parse_at(buf, pos)
+        return cls(tag, seq_set.sequences, flag_list, uid=uid, **info), pos
 
 CommandSelect.register_command(StoreCommand)
 
 
 class UidCommand(CommandSelect):
+    __slots__ = []
+
     command = b'UID'
+    _subcommands = {}
+
+    @classmethod
+    def register_subcommand(cls, command):
+        """Registers a command type that may follow ``UID``, dispatched by
+        its command name. Its ``_parse_at`` is given ``uid=True``.
+
+        :param command: The command type, e.g. :class:`FetchCommand`.
+
+        """
+        cls._subcommands[command.command] = command
 
     @classmethod
-    def _parse(cls, tag, buf, **kwargs):
-        for cmd in [CopyCommand, FetchCommand, SearchCommand, StoreCommand]:
-            try:
-                return cmd._parse(tag, buf, uid=True, **kwargs)
-            except NotParseable:
-                pass
-        raise NotParseable(buf)
+    def _parse_at(cls, tag, buf, pos, **kwargs):
+        _, pos = Space.parse_at(buf, pos)
+        atom, after = Atom.parse_at(buf, pos)
+        cmd_type = cls._subcommands.get(atom.value.upper())
+        if cmd_type is None:
+            raise NotParseable(buf, pos)
+        return cmd_type._parse_at(tag, buf, after, uid=True, **kwargs)
 
 CommandSelect.register_command(UidCommand)
 
 
 class SearchCommand(CommandSelect):
+    __slots__ = ['keys', 'charset', 'uid']
+
     command = b'SEARCH'
+    concurrent = True
+
+    _charset_pattern = re.compile(br' +CHARSET +', re.I)
+    _end_bytes = frozenset(b'\r\n')
 
     def __init__(self, tag, keys, charset=None, uid=None):
         super().__init__(tag)
@@ -207,39 +230,34 @@ class SearchCommand(CommandSelect):
         self.uid = uid
 
     @classmethod
-    def _parse_charset(cls, buf, **kwargs):
+    def _parse_charset(cls, buf, pos, **kwargs):
+        match = cls._charset_pattern.match(buf, pos)
+        if not match:
+            return 'US-ASCII', pos
+        string, after = AString.parse_at(buf, match.end(0), **kwargs)
         try:
-            _, after = Space.parse(buf)
-            atom, after = Atom.parse(after)
-        except NotParseable:
-            pass
-        else:
-            if atom.value.upper() == b'CHARSET':
-                _, after = Space.parse(after)
-                string, after = AString.parse(after, **kwargs)
-                charset = str(string.value, 'ascii')
-                try:
-                    b' '.decode(charset)
-                except LookupError:
-                    raise BadCharset(buf)
-                return charset, after
-        return 'US-ASCII', buf
+            charset = str(string.value, 'ascii')
+            b' '.decode(charset)
+        except (UnicodeDecodeError, LookupError):
+            raise InvalidContent(buf, pos)
+        return charset, after
 
     @classmethod
-    def _parse(cls, tag, buf, uid=False, **kwargs):
-        charset, buf = cls._parse_charset(buf, **kwargs)
+    def _parse_at(cls, tag, buf, pos, uid=False, **kwargs):
+        charset, pos = cls._parse_charset(buf, pos, **kwargs)
         search_keys = []
         while True:
-            try:
-                _, buf = Space.parse(buf)
-                key, buf = SearchKey.parse(buf, charset=charset, **kwargs)
-                search_keys.append(key)
-            except NotParseable:
-                if not search_keys:
-                    raise
+            _, pos = Space.parse_at(buf, pos)
+            key, pos = SearchKey.parse_at(buf, pos, charset=charset, **kwargs)
+            search_keys.append(key)
+            if cls.peek(buf, pos) in cls._end_bytes:
                 break
-            else:
-                continue
-        return cls(tag, search_keys, charset=charset, uid=uid), buf
+        _, pos = EndLine.parse_at(buf, pos)
+        return cls(tag, search_keys, charset=charset, uid=uid), pos
 
 CommandSelect.register_command(SearchCommand)
+
+UidCommand.register_subcommand(CopyCommand)
+UidCommand.register_subcommand(FetchCommand)
+UidCommand.register_subcommand(SearchCommand)
+UidCommand.register_subcommand(StoreCommand)
@@ -0,0 +1,89 @@
+# Copyright (c) 2014 Ian C. Good
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+
+"""Scanners for the tokens of the IMAP grammar that are runs of bytes from a
+character class, such as atoms, numbers, tags and unquoted astrings.
+
+Each character class is defined once, and the scanners are compiled from
+them so that skipping the spaces before a token and consuming the token is
+a single match, with the class of each byte decided by the lookup table the
+regular expression engine compiles for the character class. A scanner
+matches at the position where parsing continues, and the token is its first
+group.
+
+"""
+
+import re
+
+__all__ = ['atom_chars', 'astring_chars', 'list_chars', 'tag_chars',
+           'byte_set', 'atom_scanner', 'number_scanner', 'nil_scanner',
+           'astring_scanner', 'list_mailbox_scanner', 'tag_scanner',
+           'list_end_scanner']
+
+#: The bytes allowed in an atom, as a character class.
+atom_chars = br'\x21\x23\x24\x26\x27\x2B-\x5B\x5E-\x7A\x7C\x7E'
+
+#: The bytes allowed in an unquoted astring, which are the atom bytes and the
+#: closing square bracket.
+astring_chars = atom_chars + br'\x5D'
+
+#: The bytes allowed in an unquoted list-mailbox, which are the astring bytes
+#: and the ``%`` and ``*`` wildcards.
+list_chars = astring_chars + br'\x25\x2A'
+
+#: The bytes allowed in a command tag, which are the astring bytes except for
+#: the plus sign.
+tag_chars = br'\x21\x23\x24\x26\x27\x2C-\x5B\x5D\x5E-\x7A\x7C\x7E'
+
+
+def byte_set(chars):
+    """Returns the set of byte values in the character class, e.g. to be used
+    as a :attr:`~pymap.parsing.Parseable.lookahead`.
+
+    :param bytes chars: The character class.
+    :rtype: frozenset
+
+    """
+    pattern = re.compile(b'[' + chars + b']')
+    return frozenset(i for i in range(256) if pattern.match(bytes((i, ))))
+
+
+#: Scans an atom.
+atom_scanner = re.compile(b' *([' + atom_chars + b']+)')
+
+#: Scans an atom that is a number, without scanning the atom again.
+number_scanner = re.compile(b' *(\\d+)(?![' + atom_chars + b'])')
+
+#: Scans an atom that is ``NIL``, in any case.
+nil_scanner = re.compile(b' *(NIL)(?![' + atom_chars + b'])', re.I)
+
+#: Scans an unquoted astring.
+astring_scanner = re.compile(b' *([' + astring_chars + b']+)')
+
+#: Scans an unquoted list-mailbox.
+list_mailbox_scanner = re.compile(b' *([' + list_chars + b']+)')
+
+#: Scans a command tag.
+tag_scanner = re.compile(b' *([' + tag_chars + b']+)')
+
+#: Scans the closing parenthesis of a list.
+list_end_scanner = re.compile(br' *(\))')
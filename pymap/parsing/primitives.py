@@ -20,8 +20,11 @@
 #
 
 import re
+from mmap import mmap
 
 from . import Parseable, NotParseable, RequiresContinuation
+from .lexer import atom_chars, byte_set, atom_scanner, number_scanner, \
+    nil_scanner, list_end_scanner
 
 __all__ = ['Primitive', 'Nil', 'Number', 'Atom', 'List',
            'String', 'QuotedString', 'LiteralString']
@@ -33,8 +36,9 @@ class Primitive(Parseable):
 
     """
 
-    _atom_pattern = re.compile(br'[\x21\x23\x24\x26\x27\x2B'
-                               br'-\x5B\x5E-\x7A\x7C\x7E]+')
+    __slots__ = []
+
+    _atom_chars = byte_set(atom_chars)
 
 
 class Nil(Primitive):
@@ -42,23 +46,20 @@ class Nil(Primitive):
 
     """
 
-    _nil_pattern = re.compile(b'^NIL$', re.I)
+    __slots__ = ['value']
+
+    lookahead = frozenset(b'Nn')
 
     def __init__(self):
         super().__init__()
         self.value = None
 
     @classmethod
-    def parse(cls, buf, **kwargs):
-        buf = memoryview(buf)
-        start = cls._whitespace_length(buf)
-        match = cls._atom_pattern.match(buf, start)
+    def parse_at(cls, buf, pos, **kwargs):
+        match = nil_scanner.match(buf, pos)
         if not match:
-            raise NotParseable(buf)
-        atom = match.group(0)
-        if not cls._nil_pattern.match(atom):
-            raise NotParseable(buf)
-        return cls(), buf[match.end(0):]
+            raise NotParseable(buf, pos)
+        return cls(), match.end(0)
 
     def __bytes__(self):
         return b'NIL'
@@ -71,7 +72,9 @@ class Number(Primitive):
 
     """
 
-    _num_pattern = re.compile(b'^\d+$')
+    __slots__ = ['value', '_raw']
+
+    lookahead = frozenset(b'0123456789')
 
     def __init__(self, num):
         super().__init__()
@@ -79,16 +82,11 @@ class Number(Primitive):
         self._raw = bytes(str(self.value), 'ascii')
 
     @classmethod
-    def parse(cls, buf, **kwargs):
-        buf = memoryview(buf)
-        start = cls._whitespace_length(buf)
-        match = cls._atom_pattern.match(buf, start)
+    def parse_at(cls, buf, pos, **kwargs):
+        match = number_scanner.match(buf, pos)
         if not match:
-            raise NotParseable(buf)
-        atom = match.group(0)
-        if not cls._num_pattern.match(atom):
-            raise NotParseable(buf)
-        return cls(int(match.group(0))), buf[match.end(0):]
+            raise NotParseable(buf, pos)
+        return cls(int(match.group(1))), match.end(0)
 
     def __bytes__(self):
         return self._raw
@@ -99,19 +97,20 @@ class Atom(Primitive):
 
     """
 
+    __slots__ = ['value']
+
+    lookahead = Primitive._atom_chars
+
     def __init__(self, value):
         super().__init__()
         self.value = value
 
     @classmethod
-    def parse(cls, buf, **kwargs):
-        buf = memoryview(buf)
-        start = cls._whitespace_length(buf)
-        match = cls._atom_pattern.match(buf, start)
+    def parse_at(cls, buf, pos, **kwargs):
+        match = atom_scanner.match(buf, pos)
         if not match:
-            raise NotParseable(buf[start:])
-        atom = match.group(0)
-        return cls(atom), buf[match.end(0):]
+            raise NotParseable(buf, pos + cls._whitespace_length(buf, pos))
+        return cls(match.group(1)), match.end(0)
 
     def __bytes__(self):
         return bytes(self.value)
@@ -123,20 +122,21 @@ class String(Primitive):
 
     """
 
+    __slots__ = []
+
+    lookahead = frozenset(b'"{')
+
     def __init__(self):
         raise NotImplementedError()
 
     @classmethod
-    def parse(cls, buf, **kwargs):
-        try:
-            return QuotedString.parse(buf, **kwargs)
-        except NotParseable:
-            pass
-        try:
-            return LiteralString.parse(buf, **kwargs)
-        except NotParseable:
-            pass
-        raise NotParseable(buf)
+    def parse_at(cls, buf, pos, **kwargs):
+        first = cls.peek(buf, pos)
+        if first == 0x22:
+            return QuotedString.parse_at(buf, pos, **kwargs)
+        elif first == 0x7b:
+            return LiteralString.parse_at(buf, pos, **kwargs)
+        raise NotParseable(buf, pos)
 
 
 class QuotedString(String):
@@ -150,7 +150,11 @@ class QuotedString(String):
 
     """
 
+    __slots__ = ['value', '_raw']
+
     _quoted_pattern = re.compile(br'(\r|\n|\\.|\")')
+    _unescaped_pattern = re.compile(br' *("([^\"\\\r\n]*)")')
+    lookahead = frozenset(b'"')
     _quoted_specials_pattern = re.compile(br'[\"\\]')
 
     def __init__(self, string, raw=None):
@@ -158,29 +162,34 @@ class QuotedString(String):
         self._raw = raw
 
     @classmethod
-    def parse(cls, buf, **kwargs):
-        start = cls._whitespace_length(buf)
-        if buf[start:start+1] != b'"':
-            raise NotParseable(buf)
+    def parse_at(cls, buf, pos, **kwargs):
+        # Most quoted strings have no escapes, and their contents can be
+        # taken directly from the buffer once the closing quote is found.
+        match = cls._unescaped_pattern.match(buf, pos)
+        if match:
+            return cls(match.group(2), match.group(1)), match.end(0)
+        start = pos + cls._whitespace_length(buf, pos)
+        if start >= len(buf) or buf[start] != 0x22:
+            raise NotParseable(buf, pos)
         marker = start + 1
         unquoted = bytearray()
         for match in cls._quoted_pattern.finditer(buf, marker):
             unquoted += buf[marker:match.start(0)]
             match_group = match.group(0)
             if match_group in (b'\r', b'\n'):
-                raise NotParseable(buf)
+                raise NotParseable(buf, pos)
             elif match_group.startswith(b'\\'):
                 escape_char = match_group[-1:]
                 if escape_char in (b'\\', b'"'):
                     unquoted += escape_char
                 else:
-                    raise NotParseable(buf)
+                    raise NotParseable(buf, pos)
                 marker = match.end(0)
             else:
                 end = match.end(0)
-                quoted = buf[start:end+1]
-                return cls(bytes(unquoted), quoted), buf[end:]
-        raise NotParseable(buf)
+                quoted = bytes(buf[start:end])
+                return cls(bytes(unquoted), quoted), end
+        raise NotParseable(buf, pos)
 
     def __bytes__(self):
         if self._raw is not None:
@@ -198,6 +207,13 @@ class LiteralString(String):
     """Represents a string object from an IMAP stream that used the literal
     syntax.
 
+    The data of each literal string is passed to :meth:`~Parseable.parse_at`
+    in the ``literals`` list, separately from the buffer being parsed, which
+    continues with the rest of the line after the literal. The server passes
+    each literal as it was received, so the string value is not a copy: it is
+    the :class:`bytes` read from the stream, or a :class:`memoryview` of the
+    :class:`~mmap.mmap` of a large literal that was spooled to disk.
+
     :param bytes string: The raw string for the datum.
     :param bytes raw: When parsed from an IMAP stream, this contains a copy of
                       the double-quoted and escaped version of the string for
@@ -205,26 +221,95 @@ class LiteralString(String):
 
     """
 
-    _literal_pattern = re.compile(br'{(\d+)}\r?\n$')
+    __slots__ = ['value', '_raw']
+
+    _literal_pattern = re.compile(br'{(\d+)(\+)?}\r?\n$')
+    _header_pattern = re.compile(br'{(\d+)\+?}\r?\n')
+    lookahead = frozenset(b'{')
 
     def __init__(self, string):
         self.value = string
         self._raw = None
 
     @classmethod
-    def parse(cls, buf, continuations=None, **kwargs):
-        start = cls._whitespace_length(buf)
-        match = cls._literal_pattern.match(buf, start)
+    def get_literal_header(cls, line, start=0):
+        """Checks if the given line ends with a literal string header, which
+        means the line must be followed by a continuation of the given length
+        before the command is complete. Because a literal header may only
+        occur at the end of a line, only the tail of the line is examined.
+
+        Non-synchronizing literals (``{123+}``) from the ``LITERAL+``
+        extension, :rfc:`7888`, are followed by their data immediately,
+        without waiting for a continuation response from the server.
+
+        :param bytes line: The line read from the IMAP stream.
+        :param int start: Ignore any data in ``line`` before this index, e.g.
+                          the contents of a preceding literal.
+        :returns: A two-tuple of the literal length and whether the literal is
+                  non-synchronizing, or ``None``.
+        :rtype: tuple
+
+        """
+        start = line.rfind(b'{', start)
+        if start < 0:
+            return None
+        match = cls._literal_pattern.match(line, start)
         if not match:
-            raise NotParseable(buf)
+            return None
+        return int(match.group(1)), bool(match.group(2))
+
+    @classmethod
+    def split_continuations(cls, line, continuations):
+        """Splits each continuation into the data of its literal string and
+        the rest of the line that follows it, unless it is already split. The
+        length of each joined literal is read from the literal header at the
+        end of the line or the previous continuation.
+
+        :param bytes line: The first line of the command.
+        :param list continuations: Each continuation is a two-tuple of the
+                                   data of a literal string and the rest of
+                                   the line that follows it, or the two
+                                   joined together.
+        :returns: A two-tuple of the line joined with the rest of each
+                  continuation, and the list of literal string data.
+        :rtype: tuple
+
+        """
+        parts = [line]
+        literals = []
+        header = cls.get_literal_header(line)
+        for cont in continuations:
+            if header is None:
+                break
+            if isinstance(cont, tuple):
+                literal, rest = cont
+                header = cls.get_literal_header(rest)
+            else:
+                literal_length = header[0]
+                header = cls.get_literal_header(cont, literal_length)
+                if isinstance(cont, mmap):
+                    cont = memoryview(cont)
+                literal = cont[0:literal_length]
+                rest = cont[literal_length:]
+            if isinstance(literal, mmap):
+                literal = memoryview(literal)
+            literals.append(literal)
+            parts.append(rest)
+        return b''.join(parts), literals
+
+    @classmethod
+    def parse_at(cls, buf, pos, literals=None, **kwargs):
+        start = pos + cls._whitespace_length(buf, pos)
+        match = cls._header_pattern.match(buf, start)
+        if not match:
+            raise NotParseable(buf, pos)
         literal_length = int(match.group(1))
-        if not continuations:
+        if not literals:
             raise RequiresContinuation(b'Literal string', literal_length)
-        buf = continuations.pop(0)
-        literal = buf[0:literal_length]
+        literal = literals.pop(0)
         if len(literal) != literal_length:
-            raise NotParseable(buf)
-        return cls(literal), buf[literal_length:]
+            raise NotParseable(buf, pos)
+        return cls(literal), match.end(0)
 
     def __bytes__(self):
         if self._raw is not None:
@@ -244,30 +329,34 @@ class List(Primitive):
 
     """
 
-    _end_pattern = re.compile(br' *\)')
+    __slots__ = ['value']
+
+    lookahead = frozenset(b'(')
 
     def __init__(self, items):
         super().__init__()
         self.value = items
-        self.__iter__ = lambda: iter(items)
 
     @classmethod
-    def parse(cls, buf, list_expected=None, **kwargs):
-        buf = memoryview(buf)
-        start = cls._whitespace_length(buf)
-        if buf[start:start+1] != b'(':
-            raise NotParseable(buf)
+    def parse_at(cls, buf, pos, list_expected=None, **kwargs):
+        start = pos + cls._whitespace_length(buf, pos)
+        if start >= len(buf) or buf[start] != 0x28:
+            raise NotParseable(buf, pos)
         items = []
-        buf = buf[start+1:]
+        pos = start + 1
         while True:
-            match = cls._end_pattern.match(buf)
+            match = list_end_scanner.match(buf, pos)
             if match:
-                return cls(items), buf[match.end(0):]
-            elif items and not cls._whitespace_length(buf):
-                raise NotParseable(buf)
-            item, buf = Parseable.parse(buf, expected=list_expected,
-                                        list_expected=list_expected, **kwargs)
+                return cls(items), match.end(0)
+            elif items and not cls._whitespace_length(buf, pos):
+                raise NotParseable(buf, pos)
+            item, pos = Parseable.parse_at(buf, pos, expected=list_expected,
+                                           list_expected=list_expected,
+                                           **kwargs)
             items.append(item)
 
+    def __iter__(self):
+        return iter(self.value)
+
     def __bytes__(self):
         return b'(' + b' '.join([bytes(item) for item in self.value]) + b')'
@@ -21,8 +21,81 @@
 
 import asyncio
 
-__all__ = ['Response', 'ResponseContinuation', 'ResponseBad',
-           'ResponseBadCommand', 'ResponseNo', 'ResponseOk', 'ResponseBye']
+__all__ = ['ResponseWriter', 'Response', 'StreamingResponse',
+           'ResponseContinuation', 'ResponseBad', 'ResponseBadCommand',
+           'ResponseNo', 'ResponseOk', 'ResponseBye']
+
+
+class ResponseWriter(object):
+    """Wraps a stream writer to coalesce the responses written to it. Data
+    written in the same iteration of the event loop, such as the untagged and
+    tagged responses of a command or the responses of pipelined commands, is
+    buffered and passed to the transport in a single vectored write. Waiting
+    for the transport to drain only happens once its write buffer has grown
+    past the high-water mark.
+
+    This object provides the :meth:`write` and :meth:`drain` methods of
+    :class:`~asyncio.StreamWriter`, so it may be given to
+    :meth:`Response.send_stream`.
+
+    :param writer: The stream writer to wrap.
+    :type writer: :class:`~asyncio.StreamWriter`
+    :param int high_water: The number of buffered bytes that will cause
+                           :meth:`drain` to wait.
+
+    """
+
+    def __init__(self, writer, high_water=65536):
+        super().__init__()
+        self.writer = writer
+        self.high_water = high_water
+        self._buffer = []
+        self._buffer_size = 0
+        self._flush_handle = None
+        self._drain_lock = asyncio.Lock()
+
+    def write(self, data):
+        """Buffers the data to be written by the next :meth:`flush`, which is
+        scheduled to happen on the next iteration of the event loop.
+
+        :param bytes data: The data to write.
+
+        """
+        self._buffer.append(data)
+        self._buffer_size += len(data)
+        if self._flush_handle is None:
+            loop = asyncio.get_event_loop()
+            self._flush_handle = loop.call_soon(self.flush)
+
+    def flush(self):
+        """Immediately passes all buffered data to the transport."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if self._buffer:
+            self.writer.writelines(self._buffer)
+            self._buffer = []
+            self._buffer_size = 0
+
+    async def drain(self):
+        """Waits for the transport's write buffer to drain, but only if it has
+        grown past the high-water mark. If the transport is closing, the
+        buffered data is flushed and the stream writer is always drained, so
+        that the error of a lost connection is raised.
+
+        """
+        transport = self.writer.transport
+        closing = transport.is_closing()
+        if closing or self._buffer_size >= self.high_water:
+            self.flush()
+        if closing or transport.get_write_buffer_size() >= self.high_water:
+            async with self._drain_lock:
+                await self.writer.drain()
+
+    def close(self):
+        """Flushes any buffered data and closes the stream writer."""
+        self.flush()
+        self.writer.close()
 
 
 class Response(object):
@@ -37,6 +110,8 @@ class Response(object):
 
     """
 
+    __slots__ = ['tag', 'text', 'data', '_raw']
+
     def __init__(self, tag, text):
         super().__init__()
         self.tag = bytes(tag)
@@ -44,10 +119,9 @@ class Response(object):
         self.data = []
         self._raw = None
 
-    @asyncio.coroutine
-    def send_stream(self, writer):
+    async def send_stream(self, writer):
         writer.write(bytes(self))
-        yield from writer.drain()
+        await writer.drain()
 
     def add_data(self, response):
         self.data.append(response)
@@ -61,6 +135,40 @@ class Response(object):
         return self._raw
 
 
+class StreamingResponse(Response):
+    """Response whose untagged data is produced by an asynchronous iterator as
+    the response is sent, rather than collected up front with
+    :meth:`~Response.add_data`. Each untagged response is written as soon as
+    it is produced, waiting for the writer to drain whenever it applies
+    backpressure, so the memory used does not grow with the number of
+    untagged responses.
+
+    :param response: The tagged response to send after the untagged data.
+    :type response: :class:`Response`
+    :param data: Asynchronous iterable of untagged responses, or any objects
+                 that may be converted to bytes.
+
+    """
+
+    __slots__ = ['response', 'data_iter']
+
+    def __init__(self, response, data):
+        super().__init__(response.tag, response.text)
+        self.response = response
+        self.data_iter = data
+
+    async def send_stream(self, writer):
+        for data in self.data:
+            writer.write(bytes(data))
+        async for data in self.data_iter:
+            writer.write(bytes(data))
+            await writer.drain()
+        await self.response.send_stream(writer)
+
+    def __bytes__(self):
+        raise TypeError('Streaming responses must be sent with send_stream().')
+
+
 class ResponseContinuation(Response):
     """Class used for server responses that indicate a continuation
     requirement. This is when the server needs more data from the client to
@@ -71,11 +179,14 @@ class ResponseContinuation(Response):
 
     """
 
+    __slots__ = []
+
     def __init__(self, text):
         super().__init__(b'+', text)
 
 
 class ConditionResponse(Response):
+    __slots__ = []
 
     def __init__(self, tag, text, code):
         if code:
@@ -98,6 +209,8 @@ class ResponseBad(ConditionResponse):
 
     """
 
+    __slots__ = []
+
     condition = b'BAD'
 
     def __init__(self, tag, text, code=None):
@@ -116,6 +229,8 @@ class ResponseBadCommand(ResponseBad):
 
     """
 
+    __slots__ = []
+
     condition = b'BAD'
 
     def __init__(self, exc, code=None):
@@ -134,6 +249,8 @@ class ResponseNo(ConditionResponse):
 
     """
 
+    __slots__ = []
+
     condition = b'NO'
 
     def __init__(self, tag, text, code=None):
@@ -152,6 +269,8 @@ class ResponseOk(ConditionResponse):
 
     """
 
+    __slots__ = []
+
     condition = b'OK'
 
     def __init__(self, tag, text, code=None):
@@ -164,10 +283,14 @@ class ResponseBye(ConditionResponse):
     response to a command (e.g. ``LOGOUT``) or unsolicited.
 
     :param bytes text: The reason for disconnection.
+    :param code: Optional response code.
+    :type code: :class:`~pymap.parsing.response.codes.ResponseCode`
 
     """
 
+    __slots__ = []
+
     condition = b'BYE'
 
-    def __init__(self, text):
-        super().__init__(b'*', text, None)
+    def __init__(self, text, code=None):
+        super().__init__(b'*', text, code)
@@ -22,8 +22,8 @@
 from ..primitives import Number, List
 
 __all__ = ['ResponseCode', 'Alert', 'BadCharset', 'Capability', 'Parse',
-           'PermanentFlags', 'ReadOnly', 'ReadWrite', 'TryCreate', 'UidNext',
-           'UidValidity', 'Unseen']
+           'PermanentFlags', 'ReadOnly', 'ReadWrite', 'TooBig', 'TryCreate',
+           'UidNext', 'UidValidity', 'Unseen']
 
 
 class ResponseCode(object):
@@ -31,7 +31,7 @@ class ResponseCode(object):
     server responses.
 
     """
-    pass
+    __slots__ = []
 
 
 class Alert(ResponseCode):
@@ -40,6 +40,8 @@ class Alert(ResponseCode):
 
     """
 
+    __slots__ = []
+
     def __bytes__(self):
         return b'[ALERT]'
 
@@ -47,6 +49,8 @@ class Alert(ResponseCode):
 class BadCharset(ResponseCode):
     """A ``SEARCH`` command requested an invalid charset."""
 
+    __slots__ = []
+
     def __bytes__(self):
         return b'[BADCHARSET]'
 
@@ -54,6 +58,8 @@ class BadCharset(ResponseCode):
 class Capability(ResponseCode):
     """Lists the capabilities the server advertises to the client."""
 
+    __slots__ = ['capabilities', '_raw']
+
     def __init__(self, server_capabilities):
         super().__init__()
         self.capabilities = server_capabilities
@@ -92,11 +98,14 @@ class Capability(ResponseCode):
 class Parse(ResponseCode):
     """Indicates the server failed to parse the headers in a message."""
 
+    __slots__ = []
+
     def __bytes__(self):
         return b'[PARSE]'
 
 
 class PermanentFlags(ResponseCode):
+    __slots__ = ['flags']
 
     def __init__(self, flags):
         super().__init__()
@@ -109,6 +118,8 @@ class PermanentFlags(ResponseCode):
 class ReadOnly(ResponseCode):
     """Indicates the currently selected mailbox is opened read-only."""
 
+    __slots__ = []
+
     def __bytes__(self):
         return b'[READ-ONLY]'
 
@@ -116,16 +127,32 @@ class ReadOnly(ResponseCode):
 class ReadWrite(ResponseCode):
     """Indicates the currently selected mailbox is opened read-write."""
 
+    __slots__ = []
+
     def __bytes__(self):
         return b'[READ-WRITE]'
 
 
+class TooBig(ResponseCode):
+    """Indicates the command, or a literal string in the command, was larger
+    than the server is willing to accept. See :rfc:`5530`.
+
+    """
+
+    __slots__ = []
+
+    def __bytes__(self):
+        return b'[TOOBIG]'
+
+
 class TryCreate(ResponseCode):
     """Indicates that a failing ``APPEND`` or ``COPY`` command may succeed if
     the client first creates the destination mailbox.
 
     """
 
+    __slots__ = []
+
     def __bytes__(self):
         return b'[TRYCREATE]'
 
@@ -133,6 +160,8 @@ class TryCreate(ResponseCode):
 class UidNext(ResponseCode):
     """Indicates the next unique identifier value of the mailbox."""
 
+    __slots__ = ['next']
+
     def __init__(self, next):
         super().__init__()
         self.next = Number(next)
@@ -144,6 +173,8 @@ class UidNext(ResponseCode):
 class UidValidity(ResponseCode):
     """Indicates the mailbox unique identifier validity value."""
 
+    __slots__ = ['validity']
+
     def __init__(self, validity):
         super().__init__()
         self.validity = Number(validity)
@@ -159,6 +190,8 @@ class Unseen(ResponseCode):
 
     """
 
+    __slots__ = ['next']
+
     def __init__(self, next):
         super().__init__()
         self.next = Number(next)
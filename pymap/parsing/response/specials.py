@@ -19,11 +19,14 @@
 # THE SOFTWARE.
 #
 
-from ..primitives import List
+from ..primitives import Nil, QuotedString, List
+from ..specials import Mailbox
 
 from . import Response
 
-__all__ = ['FlagsResponse', 'ExistsResponse', 'RecentResponse']
+__all__ = ['FlagsResponse', 'ExistsResponse', 'RecentResponse',
+           'ExpungeResponse', 'FetchResponse', 'SearchResponse',
+           'ListResponse', 'LSubResponse', 'StatusResponse']
 
 
 class FlagsResponse(Response):
@@ -35,6 +38,8 @@ class FlagsResponse(Response):
 
     """
 
+    __slots__ = ['flags']
+
     def __init__(self, flags):
         text = b'FLAGS ' + bytes(List(flags))
         super().__init__(b'*', text)
@@ -49,8 +54,10 @@ class ExistsResponse(Response):
 
     """
 
+    __slots__ = ['num']
+
     def __init__(self, num):
-        text = bytes(num) + b' EXISTS'
+        text = b'%d EXISTS' % num
         super().__init__(b'*', text)
         self.num = num
 
@@ -63,7 +70,153 @@ class RecentResponse(Response):
 
     """
 
+    __slots__ = ['num']
+
     def __init__(self, num):
-        text = bytes(num) + b' RECENT'
+        text = b'%d RECENT' % num
         super().__init__(b'*', text)
         self.num = num
+
+
+class ExpungeResponse(Response):
+    """Constructs the special EXPUNGE response used by the EXPUNGE command, or
+    sent unsolicited when another session removes a message.
+
+    :param int seq: The message sequence number of the removed message.
+
+    """
+
+    __slots__ = ['seq']
+
+    def __init__(self, seq):
+        text = b'%d EXPUNGE' % seq
+        super().__init__(b'*', text)
+        self.seq = seq
+
+
+class FetchResponse(Response):
+    """Constructs the special FETCH response used by the FETCH and STORE
+    commands, or sent unsolicited when another session changes the flags of
+    a message.
+
+    :param int seq: The message sequence number of the message.
+    :param list data: List of ``(name, value)`` tuples, where ``name`` is the
+                      data item bytestring (e.g. ``b'FLAGS'``) and ``value``
+                      may be converted to bytes.
+
+    """
+
+    __slots__ = ['seq', 'attributes']
+
+    def __init__(self, seq, data):
+        data_items = [b' '.join((name, bytes(value))) for name, value in data]
+        text = b'%d FETCH ' % seq + bytes(List(data_items))
+        super().__init__(b'*', text)
+        self.seq = seq
+        self.attributes = data
+
+
+class SearchResponse(Response):
+    """Constructs the special SEARCH response used by the SEARCH command.
+    The response line may be sent in pieces with :meth:`iter_chunks`, so
+    that a large result is never joined into a single bytestring.
+
+    :param list seqs: The message sequence numbers or UIDs that matched.
+
+    """
+
+    __slots__ = ['seqs']
+
+    def __init__(self, seqs):
+        super().__init__(b'*', b'SEARCH')
+        self.seqs = seqs
+
+    def _get_chunks(self, chunk_size):
+        yield b'* SEARCH'
+        for i in range(0, len(self.seqs), chunk_size):
+            seqs = self.seqs[i:i + chunk_size]
+            yield b''.join([b' %d' % seq for seq in seqs])
+        yield b'\r\n'
+
+    async def iter_chunks(self, chunk_size=1024):
+        """Asynchronously produces the response line in pieces, each with
+        up to ``chunk_size`` results, for a
+        :class:`~pymap.parsing.response.StreamingResponse`.
+
+        :param int chunk_size: The number of results in each piece.
+
+        """
+        for chunk in self._get_chunks(chunk_size):
+            yield chunk
+
+    def __bytes__(self):
+        if self._raw is None:
+            self._raw = b''.join(self._get_chunks(len(self.seqs) or 1))
+        return self._raw
+
+
+class ListResponse(Response):
+    """Constructs the special LIST response used by the LIST command.
+
+    :param str name: The name of the mailbox.
+    :param str delimiter: The hierarchy delimiter, or ``None`` if the
+                          mailboxes are flat.
+    :param list attributes: The name attributes of the mailbox, e.g.
+                            ``\\Noselect``.
+
+    """
+
+    __slots__ = ['name', 'delimiter', 'attributes']
+
+    #: The name of the untagged response.
+    kind = b'LIST'
+
+    def __init__(self, name, delimiter, attributes=None):
+        attributes = attributes or []
+        if delimiter is None:
+            delim = Nil()
+        else:
+            delim = QuotedString(bytes(delimiter, 'ascii'))
+        encoded = QuotedString(Mailbox.encode_name(name))
+        text = b' '.join((self.kind, bytes(List(attributes)), bytes(delim),
+                          bytes(encoded)))
+        super().__init__(b'*', text)
+        self.name = name
+        self.delimiter = delimiter
+        self.attributes = attributes
+
+
+class LSubResponse(ListResponse):
+    """Constructs the special LSUB response used by the LSUB command.
+
+    :param str name: The name of the mailbox.
+    :param str delimiter: The hierarchy delimiter, or ``None`` if the
+                          mailboxes are flat.
+    :param list attributes: The name attributes of the mailbox.
+
+    """
+
+    __slots__ = []
+
+    kind = b'LSUB'
+
+
+class StatusResponse(Response):
+    """Constructs the special STATUS response used by the STATUS command.
+
+    :param str name: The name of the mailbox.
+    :param list data: List of ``(name, value)`` tuples, where ``name`` is the
+                      status attribute bytestring (e.g. ``b'MESSAGES'``) and
+                      ``value`` is an integer.
+
+    """
+
+    __slots__ = ['name', 'attributes']
+
+    def __init__(self, name, data):
+        encoded = QuotedString(Mailbox.encode_name(name))
+        data_items = [b'%b %d' % (attr, value) for attr, value in data]
+        text = b'STATUS ' + bytes(encoded) + b' ' + bytes(List(data_items))
+        super().__init__(b'*', text)
+        self.name = name
+        self.attributes = data
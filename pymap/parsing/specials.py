@@ -20,13 +20,18 @@
 #
 
 import re
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 
-from . import Parseable, NotParseable, UnexpectedType, Space
+from pymap.interval import IntervalSet
+
+from . import Parseable, NotParseable, Space
+from .lexer import astring_chars, list_chars, tag_chars, byte_set, \
+    astring_scanner, list_mailbox_scanner, tag_scanner
 from .primitives import Atom, Number, String, QuotedString, List
 
 __all__ = ['Special', 'InvalidContent', 'AString', 'Tag', 'Mailbox',
-           'DateTime', 'Flag', 'StatusAttribute', 'SequenceSet',
+           'ListMailbox', 'DateTime', 'Flag', 'StatusAttribute', 'SequenceSet',
            'FetchAttribute', 'SearchKey']
 
 
@@ -42,7 +47,7 @@ class Special(Parseable):
     """Base class for special data objects in an IMAP stream.
 
     """
-    pass
+    __slots__ = []
 
 
 class AString(Special):
@@ -54,8 +59,10 @@ class AString(Special):
 
     """
 
-    _pattern = re.compile(br'[\x21\x23\x24\x26\x27\x2B-\x5B'
-                          br'\x5D\x5E-\x7A\x7C\x7E]+')
+    __slots__ = ['value', '_raw']
+
+    _pattern = re.compile(b'[' + astring_chars + b']+')
+    lookahead = byte_set(astring_chars) | String.lookahead
 
     def __init__(self, string, raw=None):
         super().__init__()
@@ -63,15 +70,12 @@ class AString(Special):
         self._raw = raw
 
     @classmethod
-    def parse(cls, buf, **kwargs):
-        buf = memoryview(buf)
-        start = cls._whitespace_length(buf)
-        match = cls._pattern.match(buf, start)
+    def parse_at(cls, buf, pos, **kwargs):
+        match = astring_scanner.match(buf, pos)
         if match:
-            buf = buf[match.end(0):]
-            return cls(match.group(0), match.group(0)), buf
-        string, buf = String.parse(buf, **kwargs)
-        return cls(string.value, bytes(string)), buf
+            return cls(match.group(1), match.group(1)), match.end(0)
+        string, pos = String.parse_at(buf, pos, **kwargs)
+        return cls(string.value, bytes(string)), pos
 
     def __bytes__(self):
         if self._raw is not None:
@@ -90,21 +94,20 @@ class Tag(Special):
 
     """
 
-    _pattern = re.compile(br'[\x21\x23\x24\x26\x27\x2C-\x5B'
-                          br'\x5D\x5E-\x7A\x7C\x7E]+')
+    __slots__ = ['value']
+
+    lookahead = byte_set(tag_chars)
 
     def __init__(self, tag):
         super().__init__()
         self.value = tag
 
     @classmethod
-    def parse(cls, buf, **kwargs):
-        buf = memoryview(buf)
-        start = cls._whitespace_length(buf)
-        match = cls._pattern.match(buf, start)
+    def parse_at(cls, buf, pos, **kwargs):
+        match = tag_scanner.match(buf, pos)
         if not match:
-            raise NotParseable(buf)
-        return cls(match.group(0)), buf[match.end(0):]
+            raise NotParseable(buf, pos)
+        return cls(match.group(1)), match.end(0)
 
     def __bytes__(self):
         return self.value
@@ -117,10 +120,17 @@ class Mailbox(Special):
 
     """
 
+    __slots__ = ['value']
+
+    lookahead = AString.lookahead
+
     def __init__(self, mailbox):
         super().__init__()
         self.value = mailbox
 
+    _encode_pattern = re.compile('&|[^\x20-\x7e]+')
+    _decode_pattern = re.compile(br'&([^-]*)-?')
+
     @classmethod
     def _modified_b64encode(cls, src):
         # Inspired by Twisted Python's implementation:
@@ -136,94 +146,95 @@ class Mailbox(Special):
         return src_utf7.decode('utf-7')
 
     @classmethod
+    def _encode_run(cls, match):
+        run = match.group(0)
+        if run == '&':
+            return '&-'
+        encoded = cls._modified_b64encode(run)
+        return ''.join(('&', str(encoded, 'ascii'), '-'))
+
+    @classmethod
+    @lru_cache(maxsize=1024)
     def encode_name(cls, mailbox):
         """Encode the mailbox name using the modified UTF-7 specification for
-        IMAP.
+        IMAP. Recent translations are cached, since clients repeat the same
+        names in ``LIST`` and ``STATUS`` responses.
 
         :param str mailbox: The name of the mailbox to encode.
         :rtype: bytes
 
         """
-        ret = bytearray()
-        is_usascii = True
-        for i, symbol in enumerate(mailbox):
-            charpoint = ord(symbol)
-            if is_usascii:
-                if charpoint == 0x26:
-                    ret.extend(b'&-')
-                elif charpoint >= 0x20 and charpoint <= 0x7e:
-                    ret.append(charpoint)
-                else:
-                    encode_start = i
-                    is_usascii = False
-            else:
-                if charpoint >= 0x20 and charpoint <= 0x7e:
-                    to_encode = mailbox[encode_start:i]
-                    encoded = cls._modified_b64encode(to_encode)
-                    ret.append(0x26)
-                    ret.extend(encoded)
-                    ret.extend((0x2d, charpoint))
-                    is_usascii = True
-        if not is_usascii:
-            to_encode = mailbox[encode_start:]
-            encoded = cls._modified_b64encode(to_encode)
-            ret.append(0x26)
-            ret.extend(encoded)
-            ret.append(0x2d)
-        return bytes(ret)
+        if cls._encode_pattern.search(mailbox) is None:
+            return bytes(mailbox, 'ascii')
+        encoded = cls._encode_pattern.sub(cls._encode_run, mailbox)
+        return bytes(encoded, 'ascii')
 
     @classmethod
+    @lru_cache(maxsize=1024)
     def decode_name(cls, encoded_mailbox):
         """Decode the mailbox name using the modified UTF-7 specification for
-        IMAP.
+        IMAP. Recent translations are cached, since clients repeat the same
+        names in ``SELECT`` and ``STATUS`` commands.
 
         :param bytes encoded_mailbox: The encoded name of the mailbox to
                                       decode.
         :rtype: str
 
         """
-        parts = []
-        is_usascii = True
-        buf = memoryview(encoded_mailbox)
-        while buf:
-            byte = buf[0]
-            if is_usascii:
-                if buf[0:2] == b'&-':
-                    parts.append('&')
-                    buf = buf[2:]
-                elif byte == 0x26:
-                    is_usascii = False
-                    buf = buf[1:]
-                else:
-                    parts.append(chr(byte))
-                    buf = buf[1:]
+        if b'&' not in encoded_mailbox:
+            return str(encoded_mailbox, 'latin-1')
+        parts = cls._decode_pattern.split(encoded_mailbox)
+        for i in range(1, len(parts), 2):
+            if parts[i]:
+                parts[i] = cls._modified_b64decode(parts[i])
             else:
-                for i, byte in enumerate(buf):
-                    if byte == 0x2d:
-                        to_decode = buf[:i].tobytes()
-                        decoded = cls._modified_b64decode(to_decode)
-                        parts.append(decoded)
-                        buf = buf[i+1:]
-                        is_usascii = True
-                        break
-        if not is_usascii:
-            to_decode = buf.tobytes()
-            decoded = cls._modified_b64decode(to_decode)
-            parts.append(decoded)
+                parts[i] = '&'
+        for i in range(0, len(parts), 2):
+            parts[i] = str(parts[i], 'latin-1')
         return ''.join(parts)
 
     @classmethod
-    def parse(cls, buf, **kwargs):
-        atom, buf = AString.parse(buf, **kwargs)
-        mailbox = atom.value
+    def _from_encoded(cls, buf, pos, mailbox):
         if mailbox.upper() == b'INBOX':
-            return cls('INBOX'), buf
-        return cls(cls.decode_name(mailbox)), buf
+            return cls('INBOX')
+        try:
+            return cls(cls.decode_name(mailbox))
+        except UnicodeDecodeError:
+            raise InvalidContent(buf, pos)
+
+    @classmethod
+    def parse_at(cls, buf, pos, **kwargs):
+        atom, after = AString.parse_at(buf, pos, **kwargs)
+        return cls._from_encoded(buf, pos, bytes(atom.value)), after
 
     def __bytes__(self):
         return self.encode_name(self.value)
 
 
+class ListMailbox(Mailbox):
+    """Represents the list-mailbox argument of the ``LIST`` and ``LSUB``
+    commands, a mailbox name that may contain the ``*`` and ``%`` wildcards
+    without being quoted.
+
+    :param str mailbox: The mailbox name, with possible wildcards.
+
+    """
+
+    __slots__ = []
+
+    lookahead = byte_set(list_chars) | String.lookahead
+
+    @classmethod
+    def parse_at(cls, buf, pos, **kwargs):
+        match = list_mailbox_scanner.match(buf, pos)
+        if match:
+            mailbox, after = match.group(1), match.end(0)
+        else:
+            string, after = String.parse_at(buf, pos, **kwargs)
+            mailbox = string.value
+        return cls._from_encoded(buf, pos, bytes(mailbox)), after
+
+
 class DateTime(Special):
     """Represents a date-time quoted string from an IMAP stream.
 
@@ -233,19 +244,95 @@ class DateTime(Special):
 
     """
 
+    __slots__ = ['when', '_raw']
+
+    lookahead = QuotedString.lookahead
+
+    _month_names = [b'Jan', b'Feb', b'Mar', b'Apr', b'May', b'Jun',
+                    b'Jul', b'Aug', b'Sep', b'Oct', b'Nov', b'Dec']
+    _months = {name.upper(): i for i, name in enumerate(_month_names, 1)}
+
+    _date_pattern = re.compile(br'( ?\d{1,2})-([a-zA-Z]{3})-(\d{4})\Z')
+    _datetime_pattern = re.compile(br'( ?\d{1,2})-([a-zA-Z]{3})-(\d{4})'
+                                   br' (\d\d):(\d\d):(\d\d)'
+                                   br' ([+-])(\d\d)(\d\d)\Z')
+
     def __init__(self, when, raw=None):
         super().__init__()
         self.when = when
-        self._raw = raw or bytes(when.strftime('%d-%b-%Y %X %z'), 'ascii')
+        self._raw = raw or self.format_datetime(when)
+
+    @classmethod
+    @lru_cache()
+    def _get_timezone(cls, minutes):
+        return timezone(timedelta(minutes=minutes))
+
+    @classmethod
+    def format_datetime(cls, when):
+        """Format the date-time as an IMAP ``date-time`` string, e.g.
+        ``01-Jan-2000 01:02:03 +0500``. A naive date-time is given an offset
+        of ``+0000``.
+
+        :param datetime when: The date-time to format.
+        :rtype: bytes
+
+        """
+        offset = when.utcoffset()
+        minutes = int(offset.total_seconds()) // 60 if offset else 0
+        sign = b'-' if minutes < 0 else b'+'
+        hours, minutes = divmod(abs(minutes), 60)
+        return b'%02d-%s-%04d %02d:%02d:%02d %s%02d%02d' % (
+            when.day, cls._month_names[when.month - 1], when.year,
+            when.hour, when.minute, when.second, sign, hours, minutes)
+
+    @classmethod
+    def parse_date(cls, value):
+        """Parse an IMAP ``date`` string, e.g. ``1-Jan-2000``.
+
+        :param bytes value: The date string.
+        :rtype: :py:class:`~datetime.datetime`
+        :raises ValueError: The value is not a valid date.
+
+        """
+        match = cls._date_pattern.match(value)
+        if not match:
+            raise ValueError(value)
+        month = cls._months.get(match.group(2).upper())
+        if month is None:
+            raise ValueError(value)
+        return datetime(int(match.group(3)), month, int(match.group(1)))
 
     @classmethod
-    def parse(cls, buf, **kwargs):
-        string, after = QuotedString.parse(buf)
+    def parse_datetime(cls, value):
+        """Parse an IMAP ``date-time`` string, e.g.
+        ``1-Jan-2000 01:02:03 +0500``.
+
+        :param bytes value: The date-time string.
+        :rtype: :py:class:`~datetime.datetime`
+        :raises ValueError: The value is not a valid date-time.
+
+        """
+        match = cls._datetime_pattern.match(value)
+        if not match:
+            raise ValueError(value)
+        day, month_name, year, hour, minute, second, sign, \
+            zone_hours, zone_minutes = match.groups()
+        month = cls._months.get(month_name.upper())
+        if month is None:
+            raise ValueError(value)
+        offset = int(zone_hours) * 60 + int(zone_minutes)
+        if sign == b'-':
+            offset = -offset
+        return datetime(int(year), month, int(day), int(hour), int(minute),
+                        int(second), 0, cls._get_timezone(offset))
+
+    @classmethod
+    def parse_at(cls, buf, pos, **kwargs):
+        string, after = QuotedString.parse_at(buf, pos)
         try:
-            when_str = str(string.value, 'ascii')
-            when = datetime.strptime(when_str, '%d-%b-%Y %X %z')
-        except (UnicodeDecodeError, ValueError):
-            raise InvalidContent(buf)
+            when = cls.parse_datetime(string.value)
+        except ValueError:
+            raise InvalidContent(buf, pos)
         return cls(when, string.value), after
 
     def __bytes__(self):
@@ -255,73 +342,111 @@ class DateTime(Special):
 class Flag(Special):
     """Represents a message flag from an IMAP stream.
 
+    The system flags and common keywords are interned, so that parsing them
+    always gives the same instance, see :meth:`intern`. A flag is equal to,
+    and hashes the same as, the bytestring of its capitalized value.
+
     :param str flag: The flag or keyword string. For system flags, this will
                      start with a backslash (``\``).
 
     """
 
+    __slots__ = ['value']
+
+    lookahead = Atom.lookahead | frozenset(b'\\')
+
+    #: The flag values that are interned by :meth:`intern`.
+    internable = frozenset([b'\\Seen', b'\\Answered', b'\\Flagged',
+                            b'\\Deleted', b'\\Draft', b'\\Recent',
+                            b'$Forwarded', b'$MDNSent', b'$Junk', b'$NotJunk',
+                            b'Junk', b'NonJunk'])
+
+    _interned = {}
+
     def __init__(self, flag):
         super().__init__()
         self.value = self._capitalize(flag)
 
+    @classmethod
+    def intern(cls, flag):
+        """Returns the shared instance for the flag if its value is one of
+        :attr:`internable`, otherwise a new instance.
+
+        :param bytes flag: The flag or keyword string.
+        :rtype: :class:`Flag`
+
+        """
+        ret = cls._interned.get(flag)
+        if ret is None:
+            ret = cls(flag)
+            if ret.value in cls.internable:
+                ret = cls._interned.setdefault(ret.value, ret)
+        return ret
+
     def _capitalize(self, value):
         if value.startswith(b'\\'):
             return b'\\' + value[1:].capitalize()
         return value
 
     def __eq__(self, other):
-        if isinstance(other, Flag):
+        if self is other:
+            return True
+        elif isinstance(other, Flag):
             return self.value == other.value
         elif isinstance(other, bytes):
-            return self.value == self._capitalize(other)
-        elif isinstance(other, str):
-            other = bytes(other, 'ascii')
-            return self.value == self._capitalize(other)
+            return self.value == other
         return NotImplemented
 
     def __ne__(self, other):
         return not (self == other)
 
+    def __hash__(self):
+        return hash(self.value)
+
     @classmethod
-    def parse(cls, buf, **kwargs):
-        try:
-            _, buf = Space.parse(buf)
-        except NotParseable:
-            pass
-        if buf and buf[0] == 0x5c:
-            atom, buf = Atom.parse(buf[1:])
-            return cls(b'\\' + atom.value), buf
+    def parse_at(cls, buf, pos, **kwargs):
+        pos += cls._whitespace_length(buf, pos)
+        if pos < len(buf) and buf[pos] == 0x5c:
+            atom, pos = Atom.parse_at(buf, pos + 1)
+            return cls.intern(b'\\' + atom.value), pos
         else:
-            atom, buf = Atom.parse(buf)
-            return cls(atom.value), buf
+            atom, pos = Atom.parse_at(buf, pos)
+            return cls.intern(atom.value), pos
 
     def __bytes__(self):
         return self.value
 
 
 class StatusAttribute(Special):
-    """Represents a status attribute from an IMAP stream.
+    """Represents a status attribute from an IMAP stream. Parsing an
+    attribute always gives the same instance for each attribute name.
 
     :param str status: The status attribute name.
 
     """
 
-    _statuses = set([b'MESSAGES', b'RECENT', b'UIDVALIDITY', b'UNSEEN'])
+    __slots__ = ['value']
+
+    _statuses = set([b'MESSAGES', b'RECENT', b'UIDNEXT', b'UIDVALIDITY',
+                     b'UNSEEN'])
+    _interned = {}
+    lookahead = Atom.lookahead
 
     def __init__(self, status):
         super().__init__()
         self.value = status.upper()
 
     @classmethod
-    def parse(cls, buf, **kwargs):
-        try:
-            _, buf = Space.parse(buf)
-        except NotParseable:
-            pass
-        atom, after = Atom.parse(buf)
-        if atom.value.upper() not in cls._statuses:
-            raise InvalidContent(buf)
-        return cls(atom.value), after
+    def parse_at(cls, buf, pos, **kwargs):
+        pos += cls._whitespace_length(buf, pos)
+        atom, after = Atom.parse_at(buf, pos)
+        status = atom.value.upper()
+        ret = cls._interned.get(status)
+        if ret is None:
+            if status not in cls._statuses:
+                raise InvalidContent(buf, pos)
+            ret = cls._interned.setdefault(status, cls(status))
+        return ret, after
 
     def __bytes__(self):
         return self.value
@@ -335,9 +460,16 @@ class SequenceSet(Special):
                            part is either a number or an asterisk. E.g.
                            ``[13, '*', ('*', 26), (50, '*')]``.
 
+    To check or iterate over the numbers in the set, it is first resolved
+    with :meth:`resolve` against the current number of messages or highest
+    UID, which replaces the asterisks.
+
     """
 
+    __slots__ = ['sequences', '_raw', '_resolved']
+
     _num_pattern = re.compile(br'\d+')
+    lookahead = frozenset(b'0123456789*')
 
     def __init__(self, sequences):
         super().__init__()
@@ -351,65 +483,90 @@ class SequenceSet(Special):
             else:
                 parts.append(bytes(str(group), 'ascii'))
         self._raw = b','.join(parts)
+        self._resolved = None
 
-    def contains(self, num, max_value):
+    def resolve(self, max_value):
+        """Resolves the sequence set into the numbers it matches, from ``1``
+        to ``max_value``. The result for the last ``max_value`` is kept, so
+        checking many numbers against the same set only resolves it once.
+
+        :param int max_value: The number of messages in the mailbox, or the
+                              highest UID, which an asterisk stands for.
+        :rtype: :class:`~pymap.interval.IntervalSet`
+
+        """
+        if self._resolved is not None and self._resolved[0] == max_value:
+            return self._resolved[1]
+        intervals = []
         for group in self.sequences:
-            if group == '*' and num == max_value:
-                return True
-            elif isinstance(group, tuple):
+            if isinstance(group, tuple):
                 one, two = group
-                if one == '*':
-                    group = max_value, two
-                if two == '*':
-                    group = one, max_value
-                high = max(*group)
-                low = min(*group)
-                if num >= low and num <= high:
-                    return True
-            elif num == group:
-                return True
-        return False
+            else:
+                one = two = group
+            one = max_value if one == '*' else one
+            two = max_value if two == '*' else two
+            low, high = min(one, two), max(one, two)
+            intervals.append((max(low, 1), min(high, max_value)))
+        resolved = IntervalSet(intervals)
+        self._resolved = (max_value, resolved)
+        return resolved
+
+    def contains(self, num, max_value):
+        """Checks if the number is in the sequence set.
+
+        :param int num: The message sequence number or UID.
+        :param int max_value: The number of messages in the mailbox, or the
+                              highest UID, which an asterisk stands for.
+        :rtype: bool
+
+        """
+        return num in self.resolve(max_value)
+
+    def iter(self, max_value):
+        """Iterates over the numbers in the sequence set, in ascending order.
+
+        :param int max_value: The number of messages in the mailbox, or the
+                              highest UID, which an asterisk stands for.
+
+        """
+        return iter(self.resolve(max_value))
 
     @classmethod
-    def _parse_part(cls, buf):
+    def _parse_part(cls, buf, pos):
+        end = len(buf)
         item1 = None
-        if buf and buf[0] == 0x2a:
+        if pos < end and buf[pos] == 0x2a:
             item1 = '*'
-            buf = buf[1:]
+            pos += 1
         else:
-            match = cls._num_pattern.match(buf)
+            match = cls._num_pattern.match(buf, pos)
             if match:
-                buf = buf[match.end(0):]
+                pos = match.end(0)
                 item1 = int(match.group(0))
         if item1 is None:
-            raise NotParseable(buf)
-        if buf and buf[0] == 0x3a:
-            buf = buf[1:]
-            if buf and buf[0] == 0x2a:
-                return (item1, '*'), buf[1:]
-            match = cls._num_pattern.match(buf)
+            raise NotParseable(buf, pos)
+        if pos < end and buf[pos] == 0x3a:
+            pos += 1
+            if pos < end and buf[pos] == 0x2a:
+                return (item1, '*'), pos + 1
+            match = cls._num_pattern.match(buf, pos)
             if match:
-                buf = buf[match.end(0):]
-                return (item1, int(match.group(0))), buf
-            raise NotParseable(buf)
-        return item1, buf
+                return (item1, int(match.group(0))), match.end(0)
+            raise NotParseable(buf, pos)
+        return item1, pos
 
     @classmethod
-    def parse(cls, buf, **kwargs):
-        try:
-            _, buf = Space.parse(buf)
-        except NotParseable:
-            pass
+    def parse_at(cls, buf, pos, **kwargs):
+        pos += cls._whitespace_length(buf, pos)
+        end = len(buf)
         sequences = []
-        while buf:
-            item, buf = cls._parse_part(buf)
+        while True:
+            # Each comma must be followed by another sequence.
+            item, pos = cls._parse_part(buf, pos)
             sequences.append(item)
-            if buf and buf[0] != 0x2c:
-                break
-            buf = buf[1:]
-        if not sequences:
-            raise NotParseable(buf)
-        return cls(sequences), buf
+            if pos >= end or buf[pos] != 0x2c:
+                return cls(sequences), pos
+            pos += 1
 
     def __bytes__(self):
         return self._raw
@@ -423,14 +580,21 @@ class FetchAttribute(Special):
 
     """
 
-    _attrname_pattern = re.compile(br' *([^ \[\<]+)')
+    __slots__ = ['attribute', 'section', 'partial', '_raw']
+
+    _attrname_pattern = re.compile(br' *([^ \[\<\)\r\n]+)')
     _section_start_pattern = re.compile(br' *\[ *')
-    _section_end_pattern = re.compile(br' *\] *')
+    _section_end_pattern = re.compile(br' *\]')
     _partial_pattern = re.compile(br'\< *(\d+) *\. *(\d+) *\>')
 
     _sec_part_pattern = re.compile(br'(\d+ *(?:\. *\d+)*) *(\.)? *(MIME)?', re.I)
     _sec_msgtext_pattern = re.compile(br'')
 
+    _simple_attrs = frozenset([b'ENVELOPE', b'FLAGS', b'INTERNALDATE', b'UID',
+                               b'RFC822', b'RFC822.HEADER', b'RFC822.SIZE',
+                               b'RFC822.TEXT', b'BODYSTRUCTURE', b'BODY'])
+    _interned = {}
+
     def __init__(self, attribute, section=None, partial=None, raw=None):
         super().__init__()
         self.attribute = attribute.upper()
@@ -438,73 +602,117 @@ class FetchAttribute(Special):
         self.partial = partial
         self._raw = raw
 
+    @classmethod
+    def intern(cls, attribute):
+        """Returns the shared instance for an attribute that takes no section
+        or partial, e.g. ``FLAGS`` or ``BODY``.
+
+        :param bytes attribute: The upper-case fetch attribute name.
+        :rtype: :class:`FetchAttribute`
+        :raises KeyError: The attribute requires a section.
+
+        """
+        ret = cls._interned.get(attribute)
+        if ret is None:
+            if attribute not in cls._simple_attrs:
+                raise KeyError(attribute)
+            ret = cls._interned.setdefault(attribute, cls(attribute))
+        return ret
+
+    def _format(self, attribute, partial):
+        parts = [attribute]
+        if self.section is not None:
+            path, text, fields = self.section
+            section = [b'%d' % num for num in path or []]
+            if text is not None:
+                section.append(text)
+            section = b'.'.join(section)
+            if fields is not None:
+                section += b' (' + b' '.join(fields) + b')'
+            parts.append(b'[' + section + b']')
+        if partial:
+            parts.append(partial)
+        return b''.join(parts)
+
     @property
     def raw(self):
-        if self._raw is not None:
-            return self._raw
-        raise NotImplementedError()
+        if self._raw is None:
+            partial = self.partial and b'<%d.%d>' % self.partial
+            self._raw = self._format(self.attribute, partial)
+        return self._raw
+
+    @property
+    def response_name(self):
+        """The name of the data item in a ``FETCH`` response, where
+        ``BODY.PEEK`` is reported as ``BODY`` and a partial only by its first
+        byte.
+
+        :rtype: bytes
+
+        """
+        attribute = b'BODY' if self.attribute == b'BODY.PEEK' \
+            else self.attribute
+        partial = self.partial and b'<%d>' % self.partial[0]
+        return self._format(attribute, partial)
 
     @classmethod
-    def _parse_section(cls, buf, **kwargs):
+    def _parse_section(cls, buf, pos, **kwargs):
         section_parts = None
-        match = cls._sec_part_pattern.match(buf)
+        match = cls._sec_part_pattern.match(buf, pos)
         if match:
             section_parts = [int(num) for num in match.group(1).split(b'.')]
-            buf = buf[match.end(0):]
+            pos = match.end(0)
             if not match.group(2):
-                return (section_parts, None, None), buf
+                return (section_parts, None, None), pos
             elif match.group(3):
-                return (section_parts, b'MIME', None), buf
-        try:
-            atom, after = Atom.parse(buf)
-        except NotParseable:
-            return (section_parts, None, None), buf
+                return (section_parts, b'MIME', None), pos
+        if cls.peek(buf, pos) not in Atom.lookahead:
+            return (section_parts, None, None), pos
+        atom, after = Atom.parse_at(buf, pos)
         sec_msgtext = atom.value.upper()
         if sec_msgtext in (b'HEADER', b'TEXT'):
             return (section_parts, sec_msgtext, None), after
         elif sec_msgtext in (b'HEADER.FIELDS', b'HEADER.FIELDS.NOT'):
             kwargs_copy = kwargs.copy()
             kwargs_copy['list_expected'] = [AString]
-            header_list, buf = List.parse(after, **kwargs_copy)
+            header_list, pos = List.parse_at(buf, after, **kwargs_copy)
             header_list = [hdr.value.upper() for hdr in header_list.value]
             if not header_list:
-                raise NotParseable(after)
-            return (section_parts, sec_msgtext, header_list), buf
-        raise NotParseable(buf)
+                raise NotParseable(buf, after)
+            return (section_parts, sec_msgtext, header_list), pos
+        raise NotParseable(buf, pos)
 
     @classmethod
-    def parse(cls, buf, **kwargs):
-        buf = memoryview(buf)
-        match = cls._attrname_pattern.match(buf)
+    def parse_at(cls, buf, pos, **kwargs):
+        match = cls._attrname_pattern.match(buf, pos)
         if not match:
-            raise NotParseable(buf)
+            raise NotParseable(buf, pos)
         attr = match.group(1).upper()
-        after = buf[match.end(0):]
-        if attr in (b'ENVELOPE', b'FLAGS', b'INTERNALDATE', b'UID', b'RFC822',
-                    b'RFC822.HEADER', b'RFC822.SIZE', b'RFC822.TEXT',
-                    b'BODYSTRUCTURE'):
-            return cls(attr), after
+        after = match.end(0)
+        if attr in cls._simple_attrs and attr != b'BODY':
+            return cls.intern(attr), after
         elif attr not in (b'BODY', b'BODY.PEEK'):
-            raise NotParseable(buf)
-        buf = after
-        match = cls._section_start_pattern.match(buf)
+            raise NotParseable(buf, pos)
+        pos = after
+        match = cls._section_start_pattern.match(buf, pos)
         if not match:
             if attr == b'BODY':
-                return cls(attr), buf
+                return cls.intern(attr), pos
             else:
-                raise NotParseable(buf)
-        section, buf = cls._parse_section(buf[match.end(0):], **kwargs)
-        match = cls._section_end_pattern.match(buf)
+                raise NotParseable(buf, pos)
+        section, pos = cls._parse_section(buf, match.end(0), **kwargs)
+        match = cls._section_end_pattern.match(buf, pos)
         if not match:
-            raise NotParseable(buf)
-        buf = buf[match.end(0):]
-        match = cls._partial_pattern.match(buf)
+            raise NotParseable(buf, pos)
+        pos = match.end(0)
+        match = cls._partial_pattern.match(buf, pos)
         if match:
-            from_, to = int(match.group(1)), int(match.group(2))
-            if from_ < 0 or to <= 0 or from_ > to:
-                raise NotParseable(buf)
-            return cls(attr, section, (from_, to)), buf[match.end(0):]
-        return cls(attr, section), buf
+            # The partial is the first byte and the number of bytes.
+            start, length = int(match.group(1)), int(match.group(2))
+            if length == 0:
+                raise NotParseable(buf, pos)
+            return cls(attr, section, (start, length)), match.end(0)
+        return cls(attr, section), pos
 
     def __bytes__(self):
         return self.raw
@@ -522,6 +730,8 @@ class SearchKey(Special):
 
     """
 
+    __slots__ = ['key', 'filter', 'inverse', '_raw']
+
     _not_pattern = re.compile(br'NOT +', re.I)
 
     def __init__(self, key, filter=None, inverse=False, raw=None):
@@ -538,43 +748,37 @@ class SearchKey(Special):
         raise NotImplementedError
 
     @classmethod
-    def _parse_astring_filter(cls, buf, charset, **kwargs):
-        ret, after = AString.parse(buf, **kwargs)
-        return ret.value.decode(charset or 'ascii'), after
+    def _parse_astring_filter(cls, buf, pos, charset, **kwargs):
+        ret, after = AString.parse_at(buf, pos, **kwargs)
+        return bytes(ret.value).decode(charset or 'ascii'), after
 
     @classmethod
-    def _parse_date_filter(cls, buf):
-        atom, after = Parseable.parse(buf, expected=[Atom, QuotedString])
+    def _parse_date_filter(cls, buf, pos):
+        atom, after = Parseable.parse_at(buf, pos,
+                                         expected=[Atom, QuotedString])
         try:
-            date = datetime.strptime(str(atom.value, 'ascii'), '%d-%b-%Y')
+            date = DateTime.parse_date(atom.value)
         except ValueError:
-            raise NotParseable(buf)
+            raise NotParseable(buf, pos)
         return date, after
 
     @classmethod
-    def parse(cls, buf, charset=None, **kwargs):
-        buf = memoryview(buf)
+    def parse_at(cls, buf, pos, charset=None, list_expected=None, **kwargs):
+        pos += cls._whitespace_length(buf, pos)
         inverse = False
-        match = cls._not_pattern.match(buf)
+        match = cls._not_pattern.match(buf, pos)
         if match:
             inverse = True
-            buf = buf[match.end(0):]
-        try:
-            seq_set, buf = SequenceSet.parse(buf)
-        except NotParseable:
-            pass
-        else:
-            return cls(None, seq_set, inverse), buf
-        try:
-            key_list, buf = List.parse(buf, list_expected=[SearchKey],
-                                       charset=charset, **kwargs)
-        except UnexpectedType:
-            raise
-        except NotParseable:
-            pass
-        else:
-            return cls(None, key_list.value, inverse), buf
-        atom, after = Atom.parse(buf)
+            pos = match.end(0)
+        first = cls.peek(buf, pos)
+        if first in SequenceSet.lookahead:
+            seq_set, pos = SequenceSet.parse_at(buf, pos)
+            return cls(None, seq_set, inverse), pos
+        elif first in List.lookahead:
+            key_list, pos = List.parse_at(buf, pos, list_expected=[SearchKey],
+                                          charset=charset, **kwargs)
+            return cls(None, key_list.value, inverse), pos
+        atom, after = Atom.parse_at(buf, pos)
         key = atom.value.upper()
         if key in (b'ALL', b'ANSWERED', b'DELETED', b'FLAGGED', b'NEW', b'OLD',
                    b'RECENT', b'SEEN', b'UNANSWERED', b'UNDELETED',
@@ -582,36 +786,39 @@ class SearchKey(Special):
             return cls(key, inverse=inverse), after
         elif key in (b'BCC', b'BODY', b'CC', b'FROM', b'SUBJECT',
                    b'TEXT', b'TO'):
-            _, buf = Space.parse(after)
-            filter, buf = cls._parse_astring_filter(buf, charset, **kwargs)
-            return cls(key, filter, inverse), buf
+            _, pos = Space.parse_at(buf, after)
+            filter, pos = cls._parse_astring_filter(buf, pos, charset,
+                                                    **kwargs)
+            return cls(key, filter, inverse), pos
         elif key in (b'BEFORE', b'ON', b'SINCE',
                      b'SENTBEFORE', b'SENTON', b'SENTSINCE'):
-            _, buf = Space.parse(after)
-            filter, buf = cls._parse_date_filter(buf)
-            return cls(key, filter, inverse), buf
+            _, pos = Space.parse_at(buf, after)
+            filter, pos = cls._parse_date_filter(buf, pos)
+            return cls(key, filter, inverse), pos
         elif key in (b'KEYWORD', b'UNKEYWORD'):
-            _, buf = Space.parse(after)
-            atom, buf = Atom.parse(buf)
-            return cls(key, Flag(atom.value), inverse), buf
+            _, pos = Space.parse_at(buf, after)
+            atom, pos = Atom.parse_at(buf, pos)
+            return cls(key, Flag.intern(atom.value), inverse), pos
         elif key in (b'LARGER', b'SMALLER'):
-            _, buf = Space.parse(after)
-            num, buf = Number.parse(buf)
-            return cls(key, num.value, inverse), buf
+            _, pos = Space.parse_at(buf, after)
+            num, pos = Number.parse_at(buf, pos)
+            return cls(key, num.value, inverse), pos
         elif key == b'UID':
-            _, buf = Space.parse(after)
-            seq_set, buf = SequenceSet.parse(buf)
-            return cls(key, seq_set, inverse), buf
+            _, pos = Space.parse_at(buf, after)
+            seq_set, pos = SequenceSet.parse_at(buf, pos)
+            return cls(key, seq_set, inverse), pos
         elif key == b'HEADER':
-            _, buf = Space.parse(after)
-            header_field, buf = cls._parse_astring_filter(buf, charset)
-            _, buf = Space.parse(buf)
-            header_value, buf = cls._parse_astring_filter(buf, charset)
-            return cls(key, {header_field: header_value}, inverse), buf
+            _, pos = Space.parse_at(buf, after)
+            header_field, pos = cls._parse_astring_filter(buf, pos, charset,
+                                                          **kwargs)
+            _, pos = Space.parse_at(buf, pos)
+            header_value, pos = cls._parse_astring_filter(buf, pos, charset,
+                                                          **kwargs)
+            return cls(key, {header_field: header_value}, inverse), pos
         elif key == b'OR':
-            _, buf = Space.parse(after)
-            or1, buf = SearchKey.parse(buf, charset=charset)
-            _, buf = Space.parse(buf)
-            or2, buf = SearchKey.parse(buf, charset=charset)
-            return cls(key, (or1, or2), inverse), buf
-        raise NotParseable(buf)
+            _, pos = Space.parse_at(buf, after)
+            or1, pos = SearchKey.parse_at(buf, pos, charset=charset, **kwargs)
+            _, pos = Space.parse_at(buf, pos)
+            or2, pos = SearchKey.parse_at(buf, pos, charset=charset, **kwargs)
+            return cls(key, (or1, or2), inverse), pos
+        raise NotParseable(buf, pos)
@@ -0,0 +1,513 @@
+# Copyright (c) 2014 Ian C. Good
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+
+"""Module containing :class:`SearchPlan`, which compiles the
+:class:`~pymap.parsing.specials.SearchKey` objects of a ``SEARCH`` command
+into a tree of operators and runs it against the messages of a mailbox.
+
+The messages given to a plan must provide the following:
+
+``uid``
+    The UID of the message.
+
+``flags``
+    The set of flags on the message, as bytestrings, including the
+    ``\\Recent`` flag if the message is recent.
+
+``get_size()``
+    Returns the size of the message in bytes.
+
+``get_internal_date()``
+    Returns the internal date of the message, as a
+    :class:`~datetime.datetime`.
+
+``get_header(name)``
+    Returns the list of values of the header with the given name, as
+    strings.
+
+``get_text(include_headers)``
+    Returns the text of the message body, with the headers before it if
+    ``include_headers`` is True, as a string.
+
+"""
+
+from email.utils import parsedate_to_datetime
+
+from pymap.interval import IntervalSet
+
+__all__ = ['SearchIndex', 'SearchContext', 'SearchPlan', 'SearchOperator']
+
+
+class SearchIndex(object):
+    """Base class for the indexes a mailbox backend may provide to answer
+    search keys without examining each message. Each method returns an
+    :class:`~pymap.interval.IntervalSet` of the message sequence numbers that
+    match, or ``None`` if the backend has no index for it, which is what the
+    base class returns.
+
+    """
+
+    def get_flag_index(self, flag):
+        """Returns the message sequence numbers of the messages with the flag.
+
+        :param bytes flag: The flag or keyword.
+
+        """
+        return None
+
+    def get_uid_index(self, uids):
+        """Returns the message sequence numbers of the messages with the UIDs.
+
+        :param uids: The UIDs.
+        :type uids: :class:`~pymap.interval.IntervalSet`
+
+        """
+        return None
+
+
+class SearchContext(object):
+    """The state of a mailbox that a search plan is run against.
+
+    :param list messages: The messages in the mailbox, where the message with
+                          sequence number ``n`` is at index ``n - 1``.
+    :param index: The indexes provided by the mailbox backend.
+    :type index: :class:`SearchIndex`
+
+    """
+
+    def __init__(self, messages, index=None):
+        super().__init__()
+        self.messages = messages
+        self.index = index or SearchIndex()
+        self.max_seq = len(messages)
+        self.max_uid = messages[-1].uid if messages else 0
+
+
+class SearchOperator(object):
+    """Base class for the operators of a compiled search plan.
+
+    Operators are ordered by :attr:`cost` and then by :attr:`selectivity`, so
+    that cheap tests that are likely to rule a message out run before
+    expensive ones.
+
+    """
+
+    #: The relative cost of checking one message, where sequence sets are
+    #: free, flags and sizes are cheap, and header and body scans are not.
+    cost = 0
+
+    #: The estimated fraction of messages that match.
+    selectivity = 1.0
+
+    @property
+    def order(self):
+        return self.cost, self.selectivity
+
+    def candidates(self, ctx):
+        """Returns exactly the message sequence numbers that match, if they
+        can be found without examining each message.
+
+        :param ctx: The search context.
+        :type ctx: :class:`SearchContext`
+        :returns: The matching sequence numbers, or ``None``.
+        :rtype: :class:`~pymap.interval.IntervalSet`
+
+        """
+        return None
+
+    def matches(self, ctx, seq, message):
+        """Checks if the message matches.
+
+        :param ctx: The search context.
+        :type ctx: :class:`SearchContext`
+        :param int seq: The message sequence number.
+        :param message: The message.
+        :rtype: bool
+
+        """
+        raise NotImplementedError()
+
+    def invert(self):
+        return NotOperator(self)
+
+
+class AllOperator(SearchOperator):
+
+    def candidates(self, ctx):
+        return IntervalSet([(1, ctx.max_seq)])
+
+    def matches(self, ctx, seq, message):
+        return True
+
+    def invert(self):
+        return NoneOperator()
+
+
+class NoneOperator(SearchOperator):
+
+    selectivity = 0.0
+
+    def candidates(self, ctx):
+        return IntervalSet()
+
+    def matches(self, ctx, seq, message):
+        return False
+
+    def invert(self):
+        return AllOperator()
+
+
+class SequenceOperator(SearchOperator):
+
+    selectivity = 0.1
+
+    def __init__(self, seq_set):
+        super().__init__()
+        self.seq_set = seq_set
+
+    def candidates(self, ctx):
+        return self.seq_set.resolve(ctx.max_seq)
+
+    def matches(self, ctx, seq, message):
+        return seq in self.seq_set.resolve(ctx.max_seq)
+
+
+class UidOperator(SearchOperator):
+
+    cost = 1
+    selectivity = 0.1
+
+    def __init__(self, seq_set):
+        super().__init__()
+        self.seq_set = seq_set
+
+    def candidates(self, ctx):
+        return ctx.index.get_uid_index(self.seq_set.resolve(ctx.max_uid))
+
+    def matches(self, ctx, seq, message):
+        return message.uid in self.seq_set.resolve(ctx.max_uid)
+
+
+class FlagOperator(SearchOperator):
+
+    cost = 1
+    selectivity = 0.5
+
+    def __init__(self, flag):
+        super().__init__()
+        self.flag = flag
+
+    def candidates(self, ctx):
+        return ctx.index.get_flag_index(self.flag)
+
+    def matches(self, ctx, seq, message):
+        return self.flag in message.flags
+
+
+class SizeOperator(SearchOperator):
+
+    cost = 2
+
+    def __init__(self, larger, size):
+        super().__init__()
+        self.larger = larger
+        self.size = size
+
+    def matches(self, ctx, seq, message):
+        if self.larger:
+            return message.get_size() > self.size
+        return message.get_size() < self.size
+
+
+class DateOperator(SearchOperator):
+
+    cost = 2
+    selectivity = 0.5
+
+    def __init__(self, when, before=False, since=False):
+        super().__init__()
+        self.when = when.date()
+        self.before = before
+        self.since = since
+
+    def _get_date(self, message):
+        return message.get_internal_date().date()
+
+    def matches(self, ctx, seq, message):
+        date = self._get_date(message)
+        if date is None:
+            return False
+        elif self.before:
+            return date < self.when
+        elif self.since:
+            return date >= self.when
+        return date == self.when
+
+
+class SentDateOperator(DateOperator):
+
+    cost = 3
+
+    def _get_date(self, message):
+        for value in message.get_header('Date'):
+            try:
+                return parsedate_to_datetime(value).date()
+            except (TypeError, ValueError):
+                pass
+        return None
+
+
+class HeaderOperator(SearchOperator):
+
+    cost = 3
+    selectivity = 0.2
+
+    def __init__(self, name, value):
+        super().__init__()
+        self.name = name
+        self.value = value.casefold()
+
+    def matches(self, ctx, seq, message):
+        for value in message.get_header(self.name):
+            if self.value in value.casefold():
+                return True
+        return False
+
+
+class TextOperator(SearchOperator):
+
+    cost = 4
+    selectivity = 0.2
+
+    def __init__(self, value, include_headers):
+        super().__init__()
+        self.value = value.casefold()
+        self.include_headers = include_headers
+
+    def matches(self, ctx, seq, message):
+        text = message.get_text(self.include_headers)
+        return self.value in text.casefold()
+
+
+class NotOperator(SearchOperator):
+
+    def __init__(self, operator):
+        super().__init__()
+        self.operator = operator
+        self.cost = operator.cost
+        self.selectivity = 1.0 - operator.selectivity
+
+    def matches(self, ctx, seq, message):
+        return not self.operator.matches(ctx, seq, message)
+
+    def invert(self):
+        return self.operator
+
+
+class AndOperator(SearchOperator):
+
+    def __init__(self, operators):
+        super().__init__()
+        self.operators = sorted(operators, key=lambda op: op.order)
+        self.cost = max([op.cost for op in operators], default=0)
+        self.selectivity = 1.0
+        for op in operators:
+            self.selectivity *= op.selectivity
+
+    def candidates(self, ctx):
+        ret = None
+        for op in self.operators:
+            op_candidates = op.candidates(ctx)
+            if op_candidates is None:
+                return None
+            ret = op_candidates if ret is None else ret & op_candidates
+        return ret
+
+    def matches(self, ctx, seq, message):
+        for op in self.operators:
+            if not op.matches(ctx, seq, message):
+                return False
+        return True
+
+
+class OrOperator(SearchOperator):
+
+    def __init__(self, operators):
+        super().__init__()
+        self.operators = sorted(operators, key=lambda op: op.order)
+        self.cost = max(op.cost for op in operators)
+        self.selectivity = min(1.0, sum(op.selectivity for op in operators))
+
+    def candidates(self, ctx):
+        ret = IntervalSet()
+        for op in self.operators:
+            op_candidates = op.candidates(ctx)
+            if op_candidates is None:
+                return None
+            ret = ret | op_candidates
+        return ret
+
+    def matches(self, ctx, seq, message):
+        for op in self.operators:
+            if op.matches(ctx, seq, message):
+                return True
+        return False
+
+
+class SearchPlan(object):
+    """Compiles a list of search keys, which must all match, into a plan.
+    Nested lists of keys are folded into the list that contains them, keys
+    that match everything are removed, and the remaining operators are
+    sorted so that the cheapest and most selective run first.
+
+    When the plan is run, the operators that can be answered from sequence
+    sets or the backend's :class:`SearchIndex` narrow down the candidate
+    messages first, and only the candidates are checked against the rest.
+
+    :param list keys: The :class:`~pymap.parsing.specials.SearchKey` objects.
+
+    """
+
+    _flags = {b'ANSWERED': br'\Answered',
+              b'DELETED': br'\Deleted',
+              b'DRAFT': br'\Draft',
+              b'FLAGGED': br'\Flagged',
+              b'RECENT': br'\Recent',
+              b'SEEN': br'\Seen'}
+
+    _un_flags = {b'UNANSWERED': br'\Answered',
+                 b'UNDELETED': br'\Deleted',
+                 b'UNDRAFT': br'\Draft',
+                 b'UNFLAGGED': br'\Flagged',
+                 b'UNSEEN': br'\Seen',
+                 b'OLD': br'\Recent'}
+
+    _headers = {b'BCC': 'Bcc', b'CC': 'Cc', b'FROM': 'From',
+                b'SUBJECT': 'Subject', b'TO': 'To'}
+
+    def __init__(self, keys):
+        super().__init__()
+        self.root = self._compile_all(keys)
+
+    @classmethod
+    def _compile_all(cls, keys):
+        operators = []
+        for key in keys:
+            op = cls._compile(key)
+            if isinstance(op, AndOperator):
+                operators.extend(op.operators)
+            elif isinstance(op, NoneOperator):
+                return op
+            elif not isinstance(op, AllOperator):
+                operators.append(op)
+        if not operators:
+            return AllOperator()
+        elif len(operators) == 1:
+            return operators[0]
+        return AndOperator(operators)
+
+    @classmethod
+    def _compile(cls, key):
+        op = cls._compile_key(key)
+        if key.inverse:
+            return op.invert()
+        return op
+
+    @classmethod
+    def _compile_key(cls, key):
+        name, filter = key.key, key.filter
+        if name is None:
+            if isinstance(filter, list):
+                return cls._compile_all(filter)
+            return SequenceOperator(filter)
+        elif name == b'ALL':
+            return AllOperator()
+        elif name in cls._flags:
+            return FlagOperator(cls._flags[name])
+        elif name in cls._un_flags:
+            return FlagOperator(cls._un_flags[name]).invert()
+        elif name == b'NEW':
+            return AndOperator([FlagOperator(br'\Recent'),
+                                FlagOperator(br'\Seen').invert()])
+        elif name == b'KEYWORD':
+            return FlagOperator(filter.value)
+        elif name == b'UNKEYWORD':
+            return FlagOperator(filter.value).invert()
+        elif name == b'UID':
+            return UidOperator(filter)
+        elif name in (b'LARGER', b'SMALLER'):
+            return SizeOperator(name == b'LARGER', filter)
+        elif name in (b'BEFORE', b'ON', b'SINCE'):
+            return DateOperator(filter, before=(name == b'BEFORE'),
+                                since=(name == b'SINCE'))
+        elif name in (b'SENTBEFORE', b'SENTON', b'SENTSINCE'):
+            return SentDateOperator(filter, before=(name == b'SENTBEFORE'),
+                                    since=(name == b'SENTSINCE'))
+        elif name in cls._headers:
+            return HeaderOperator(cls._headers[name], filter)
+        elif name == b'HEADER':
+            (header_name, value), = filter.items()
+            return HeaderOperator(header_name, value)
+        elif name in (b'BODY', b'TEXT'):
+            return TextOperator(filter, name == b'TEXT')
+        elif name == b'OR':
+            return OrOperator([cls._compile(filter[0]),
+                               cls._compile(filter[1])])
+        raise ValueError(name)
+
+    def run(self, messages, index=None):
+        """Runs the plan against the messages of a mailbox.
+
+        :param list messages: The messages in the mailbox, where the message
+                              with sequence number ``n`` is at index
+                              ``n - 1``.
+        :param index: The indexes provided by the mailbox backend.
+        :type index: :class:`SearchIndex`
+        :returns: The sequence numbers of the matching messages, in order.
+        :rtype: list
+
+        """
+        ctx = SearchContext(messages, index)
+        root = self.root
+        operators = root.operators if isinstance(root, AndOperator) \
+            else [root]
+        candidates = None
+        remaining = []
+        for op in operators:
+            op_candidates = op.candidates(ctx)
+            if op_candidates is None:
+                remaining.append(op)
+            elif candidates is None:
+                candidates = op_candidates
+            else:
+                candidates = candidates & op_candidates
+        if candidates is None:
+            candidates = IntervalSet([(1, ctx.max_seq)])
+        ret = []
+        for seq in candidates:
+            message = messages[seq - 1]
+            for op in remaining:
+                if not op.matches(ctx, seq, message):
+                    break
+            else:
+                ret.append(seq)
+        return ret
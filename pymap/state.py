@@ -22,10 +22,13 @@
 import asyncio
 from socket import getfqdn
 
-from .mailbox import UserState
-
 from pymap.core import PymapError
-from pymap.parsing.command import CommandAuth, CommandNonAuth, CommandSelect
+from pymap.fetch import FetchPart, FetchPlan
+from pymap.search import SearchPlan
+from pymap.parsing.command import (Command, CommandAuth, CommandNonAuth,
+                                   CommandSelect)
+from pymap.parsing.primitives import List, LiteralString
+from pymap.parsing.specials import DateTime, SequenceSet
 from pymap.parsing.response import *  # NOPEP8
 from pymap.parsing.response.code import *  # NOPEP8
 from pymap.parsing.response.specials import *  # NOPEP8
@@ -50,39 +53,90 @@ class CloseConnection(PymapError):
 
 
 class ConnectionState(object):
+    """The state of a single IMAP connection, which handles each command by
+    calling the storage backend through :mod:`pymap.interfaces`.
+
+    :param transport: The transport of the connection.
+    :param backend: The storage backend.
+    :type backend: :class:`~pymap.interfaces.BackendInterface`
+
+    """
 
-    def __init__(self, transport):
+    def __init__(self, transport, backend):
         super().__init__()
         self.transport = transport
+        self.backend = backend
         self.user = None
         self.selected = None
-        self.capability = Capability([])
+        self.readonly = False
+        self.capability = Capability([b'LITERAL+', b'IDLE'])
+        self._dispatch = self._get_dispatch()
+
+    @classmethod
+    def _get_dispatch(cls):
+        # Built once per class, mapping each command class to the method
+        # that checks the session state and the method that handles it.
+        dispatch = cls.__dict__.get('_dispatch_table')
+        if dispatch is None:
+            dispatch = {cmd_type: cls._get_dispatch_entry(cmd_type)
+                        for cmd_type in Command._commands.values()}
+            cls._dispatch_table = dispatch
+        return dispatch
+
+    @classmethod
+    def _get_dispatch_entry(cls, cmd_type):
+        if issubclass(cmd_type, CommandNonAuth):
+            check = cls._check_nonauth
+        elif issubclass(cmd_type, CommandSelect):
+            check = cls._check_select
+        elif issubclass(cmd_type, CommandAuth):
+            check = cls._check_auth
+        else:
+            check = None
+        func_name = 'do_' + str(cmd_type.command, 'ascii').lower()
+        return check, getattr(cls, func_name, None)
+
+    def _check_nonauth(self, cmd):
+        if self.user:
+            msg = cmd.command + b': Already authenticated.'
+            return ResponseBad(cmd.tag, msg)
+
+    def _check_auth(self, cmd):
+        if not self.user:
+            msg = cmd.command + b': Must authenticate first.'
+            return ResponseBad(cmd.tag, msg)
+
+    def _check_select(self, cmd):
+        if not self.user:
+            return self._check_auth(cmd)
+        elif not self.selected:
+            msg = cmd.command + b': Must select a mailbox first.'
+            return ResponseBad(cmd.tag, msg)
 
-    @asyncio.coroutine
-    def do_greeting(self):
+    async def do_greeting(self):
         return ResponseOk(b'*', b'Server ready ' + fqdn, self.capability)
 
-    @asyncio.coroutine
-    def do_authenticate(self, cmd, result):
-        if result.authcid != 'testuser' or not result.check_secret('testpass'):
+    async def do_authenticate(self, cmd, result):
+        user = await self.backend.login(result)
+        if user is None:
             return ResponseNo(cmd.tag, b'Invalid authentication credentials.')
-        self.user = UserState(result.authcid)
+        self.user = user
         return ResponseOk(cmd.tag, b'Authentication successful.')
 
-    @asyncio.coroutine
-    def do_capability(self, cmd):
+    async def do_capability(self, cmd):
         response = ResponseOk(cmd.tag, b'Capabilities listed.')
         response.add_data(self.capability.to_response())
         return response
 
-    def _get_mailbox_response_data(self, mbx, examine=False):
+    async def _get_mailbox_response_data(self, mbx, examine=False):
+        status = await mbx.get_status()
         data = [FlagsResponse(mbx.flags),
-                ExistsResponse(mbx.exists),
-                RecentResponse(mbx.recent),
+                ExistsResponse(status[b'MESSAGES']),
+                RecentResponse(status[b'RECENT']),
                 ResponseOk(b'*', b'Predicted next UID.',
-                           UidNext(mbx.next_uid)),
+                           UidNext(status[b'UIDNEXT'])),
                 ResponseOk(b'*', b'UIDs valid.',
-                           UidValidity(mbx.uid_validity))]
+                           UidValidity(status[b'UIDVALIDITY']))]
         if mbx.readonly or examine:
             code = ReadOnly()
             data.append(ResponseOk(b'*', b'Read-only mailbox.',
@@ -94,51 +148,219 @@ class ConnectionState(object):
                                    PermanentFlags(perm_flags)))
         return code, data
 
-    @asyncio.coroutine
-    def do_select(self, cmd):
-        mbx = yield from self.user.get_mailbox(cmd.mailbox)
-        if mbx:
-            self.selected = mbx.name
-            code, data = self._get_mailbox_response_data(mbx)
-            resp = ResponseOk(cmd.tag, b'Selected mailbox.', code)
-            for data_part in data:
-                resp.add_data(data_part)
-            return resp
-        else:
+    async def _select(self, cmd, examine):
+        self.selected = None
+        mbx = await self.user.get_mailbox(cmd.mailbox)
+        if not mbx:
             return ResponseNo(cmd.tag, b'Mailbox does not exist.')
+        code, data = await self._get_mailbox_response_data(mbx, examine)
+        self.selected = mbx
+        self.readonly = mbx.readonly or examine
+        text = b'Examined mailbox.' if examine else b'Selected mailbox.'
+        resp = ResponseOk(cmd.tag, text, code)
+        for data_part in data:
+            resp.add_data(data_part)
+        return resp
 
-    @asyncio.coroutine
-    def do_examine(self, cmd):
-        mbx = yield from self.user.get_mailbox(cmd.mailbox)
-        if mbx:
-            code, data = self._get_mailbox_response_data(mbx, True)
-            resp = ResponseOk(cmd.tag, b'Examined mailbox.', code)
-            for data_part in data:
-                resp.add_data(data_part)
-            return resp
+    async def do_select(self, cmd):
+        return await self._select(cmd, False)
+
+    async def do_examine(self, cmd):
+        return await self._select(cmd, True)
+
+    async def _list(self, cmd, subscribed, response_type, text):
+        delimiter, names = await self.user.list_mailboxes(
+            cmd.mailbox, cmd.list_mailbox, subscribed)
+        response = ResponseOk(cmd.tag, text)
+        if not cmd.list_mailbox:
+            # An empty name asks only for the hierarchy delimiter.
+            response.add_data(response_type('', delimiter, [br'\Noselect']))
         else:
+            for name in names:
+                response.add_data(response_type(name, delimiter))
+        return response
+
+    async def do_list(self, cmd):
+        return await self._list(cmd, False, ListResponse,
+                                b'List completed.')
+
+    async def do_lsub(self, cmd):
+        return await self._list(cmd, True, LSubResponse,
+                                b'Lsub completed.')
+
+    async def do_status(self, cmd):
+        mbx = await self.user.get_mailbox(cmd.mailbox)
+        if not mbx:
             return ResponseNo(cmd.tag, b'Mailbox does not exist.')
+        status = await mbx.get_status()
+        data = [(attr.value, status[attr.value]) for attr in cmd.status_list]
+        response = ResponseOk(cmd.tag, b'Status completed.')
+        response.add_data(StatusResponse(mbx.name, data))
+        return response
+
+    async def do_append(self, cmd):
+        mbx = await self.user.get_mailbox(cmd.mailbox)
+        if not mbx:
+            return ResponseNo(cmd.tag, b'Mailbox does not exist.',
+                              TryCreate())
+        await mbx.append_messages([(cmd.message, cmd.flag_list, cmd.when)])
+        return ResponseOk(cmd.tag, b'Append completed.')
+
+    async def do_idle(self, cmd, idle):
+        mbx = self.selected
+        updates = mbx.listen() if mbx else asyncio.Queue()
+        try:
+            line = await idle(updates)
+        finally:
+            if mbx:
+                mbx.unlisten(updates)
+        if line.rstrip(b'\r\n').upper() != b'DONE':
+            return ResponseBad(cmd.tag, b'Expected DONE.')
+        return ResponseOk(cmd.tag, b'Idle completed.')
+
+    async def do_search(self, cmd):
+        mbx = self.selected
+        messages = await mbx.get_messages(SequenceSet([(1, '*')]))
+        messages = [msg for _, msg in messages]
+        seqs = SearchPlan(cmd.keys).run(messages, mbx.get_search_index())
+        if cmd.uid:
+            seqs = [messages[seq - 1].uid for seq in seqs]
+        response = ResponseOk(cmd.tag, b'Search completed.')
+        return StreamingResponse(response, SearchResponse(seqs).iter_chunks())
+
+    async def _load_sections(self, mbx, uids, plan, attributes):
+        # The parts of the plan are loaded first. A partial fetch of one of
+        # them is cut from the loaded part, anything else is loaded alone.
+        sections = {}
+        for part in plan.parts:
+            sections[part] = await mbx.get_content(uids, part)
+        for attr in attributes:
+            part = plan.get_part(attr)
+            if part is None or part in sections:
+                continue
+            whole = FetchPart(part.path, part.text, part.fields)
+            if part.byte_range is not None and whole in sections:
+                start, end = part.byte_range
+                sections[part] = [data[start:end] for data in sections[whole]]
+            else:
+                sections[part] = await mbx.get_content(uids, part)
+        return sections
+
+    def _get_fetch_value(self, attr, msg, flags, data):
+        name = attr.attribute
+        if name == b'FLAGS':
+            return List(sorted(flags))
+        elif name == b'UID':
+            return b'%d' % msg.uid
+        elif name == b'INTERNALDATE':
+            return DateTime(msg.get_internal_date())
+        elif name == b'RFC822.SIZE':
+            return b'%d' % msg.get_size()
+        return LiteralString(data)
+
+    async def do_fetch(self, cmd):
+        plan = FetchPlan(cmd.attributes)
+        if plan.structure or any(attr.attribute == b'ENVELOPE'
+                                 for attr in cmd.attributes):
+            return ResponseNo(cmd.tag, b'FETCH: ENVELOPE, BODY and '
+                                       b'BODYSTRUCTURE are not supported.')
+        mbx = self.selected
+        seq_set = SequenceSet(cmd.sequence_set)
+        messages = await mbx.get_messages(seq_set, cmd.uid)
+        uids = [msg.uid for _, msg in messages]
+        flags = [msg.flags for _, msg in messages]
+        set_seen = plan.sets_seen and not self.readonly
+        if set_seen:
+            flags = await mbx.update_flags(uids, [br'\Seen'], 'add')
+        sections = {}
+        if not plan.metadata_only:
+            sections = await self._load_sections(mbx, uids, plan,
+                                                 cmd.attributes)
+        names = {attr.attribute for attr in cmd.attributes}
+        response = ResponseOk(cmd.tag, b'Fetch completed.')
+        for i, (seq, msg) in enumerate(messages):
+            data = []
+            if cmd.uid and b'UID' not in names:
+                data.append((b'UID', b'%d' % msg.uid))
+            for attr in cmd.attributes:
+                part = plan.get_part(attr)
+                content = sections[part][i] if part is not None else None
+                value = self._get_fetch_value(attr, msg, flags[i], content)
+                data.append((attr.response_name, value))
+            if set_seen and b'FLAGS' not in names:
+                data.append((b'FLAGS', List(sorted(flags[i]))))
+            response.add_data(FetchResponse(seq, data))
+        return response
+
+    async def do_store(self, cmd):
+        if self.readonly:
+            return ResponseNo(cmd.tag, b'Mailbox is read-only.')
+        mbx = self.selected
+        seq_set = SequenceSet(cmd.sequence_set)
+        messages = await mbx.get_messages(seq_set, cmd.uid)
+        uids = [msg.uid for _, msg in messages]
+        new_flags = await mbx.update_flags(uids, cmd.flag_list, cmd.mode)
+        response = ResponseOk(cmd.tag, b'Store completed.')
+        if not cmd.silent:
+            for (seq, msg), flags in zip(messages, new_flags):
+                data = [(b'FLAGS', List(sorted(flags)))]
+                if cmd.uid:
+                    data.append((b'UID', b'%d' % msg.uid))
+                response.add_data(FetchResponse(seq, data))
+        return response
+
+    async def do_copy(self, cmd):
+        dest = await self.user.get_mailbox(cmd.mailbox)
+        if not dest:
+            return ResponseNo(cmd.tag, b'Mailbox does not exist.',
+                              TryCreate())
+        mbx = self.selected
+        seq_set = SequenceSet(cmd.sequence_set)
+        messages = await mbx.get_messages(seq_set, cmd.uid)
+        await mbx.copy_messages([msg.uid for _, msg in messages], dest)
+        return ResponseOk(cmd.tag, b'Copy completed.')
 
-    @asyncio.coroutine
-    def do_logout(self, cmd):
+    async def do_expunge(self, cmd):
+        if self.readonly:
+            return ResponseNo(cmd.tag, b'Mailbox is read-only.')
+        response = ResponseOk(cmd.tag, b'Expunge completed.')
+        for seq in await self.selected.expunge():
+            response.add_data(ExpungeResponse(seq))
+        return response
+
+    async def do_logout(self, cmd):
         response = ResponseOk(cmd.tag, b'Logout successful.')
         response.add_data(ResponseBye(b'Logging out.'))
         raise CloseConnection(response)
 
-    @asyncio.coroutine
-    def do_command(self, cmd):
-        if self.user and isinstance(cmd, CommandNonAuth):
-            msg = cmd.command + b': Already authenticated.'
-            return ResponseBad(cmd.tag, msg)
-        elif not self.user and isinstance(cmd, CommandAuth):
-            msg = cmd.command + b': Must authenticate first.'
-            return ResponseBad(cmd.tag, msg)
-        elif not self.selected and isinstance(cmd, CommandSelect):
-            msg = cmd.command + b': Must select a mailbox first.'
-            return ResponseBad(cmd.tag, msg)
-        func_name = 'do_' + str(cmd.command, 'ascii').lower()
+    def _lookup(self, cmd):
+        cmd_type = type(cmd)
         try:
-            func = getattr(self, func_name)
-        except AttributeError:
+            return self._dispatch[cmd_type]
+        except KeyError:
+            entry = self._dispatch[cmd_type] = \
+                self._get_dispatch_entry(cmd_type)
+            return entry
+
+    def check_state(self, cmd):
+        """Checks that the command is allowed in the current session state,
+        for commands that are not handled with :meth:`do_command`.
+
+        :param cmd: The command to check.
+        :type cmd: :class:`~pymap.parsing.command.Command`
+        :returns: The response rejecting the command, or ``None``.
+
+        """
+        check, _ = self._lookup(cmd)
+        if check is not None:
+            return check(self, cmd)
+
+    async def do_command(self, cmd, **kwargs):
+        check, func = self._lookup(cmd)
+        if check is not None:
+            response = check(self, cmd)
+            if response is not None:
+                return response
+        if func is None:
             return ResponseNo(cmd.tag, cmd.command + b': Not Implemented')
-        return func(cmd)
+        return await func(self, cmd, **kwargs)
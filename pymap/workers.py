@@ -0,0 +1,126 @@
+# Copyright (c) 2014 Ian C. Good
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+
+"""Module containing :class:`WorkerSupervisor`, which runs the server in
+several pre-forked worker processes.
+
+"""
+
+import os
+import signal
+import sys
+import time
+import traceback
+
+__all__ = ['WorkerSupervisor']
+
+
+class WorkerSupervisor(object):
+    """Forks and supervises worker processes. Until the supervisor is
+    stopped, any worker that exits is restarted, whether it crashed or its
+    ``target`` returned, so that ``num_workers`` are always running. Signals
+    received by the supervisor are passed on to every worker.
+
+    The ``target`` is called in each worker process, which exits when it
+    returns. It is started with the default ``SIGTERM`` handler and should
+    install its own to shut down cleanly, as
+    :func:`~pymap.main.run_server` does by stopping its event loop. Any state
+    that the workers should share, such as a listening socket, must be
+    created before :meth:`run` is called.
+
+    :param target: Called with no arguments in each worker process.
+    :param int num_workers: The number of worker processes to keep running.
+    :param float restart_delay: Workers that exit sooner than this many
+                                seconds after starting are restarted only
+                                after this delay, to avoid a busy loop.
+
+    """
+
+    #: The signals passed on to the workers. ``SIGTERM`` and ``SIGINT`` also
+    #: stop the supervisor once all workers have exited, while workers killed
+    #: by ``SIGHUP`` are restarted.
+    forward_signals = (signal.SIGTERM, signal.SIGINT, signal.SIGHUP)
+
+    def __init__(self, target, num_workers, restart_delay=1.0):
+        super().__init__()
+        self.target = target
+        self.num_workers = num_workers
+        self.restart_delay = restart_delay
+        self.workers = {}
+        self.stopping = False
+
+    def _run_worker(self, sigmask):
+        for signum in self.forward_signals:
+            signal.signal(signum, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        signal.pthread_sigmask(signal.SIG_SETMASK, sigmask)
+        try:
+            self.target()
+        except KeyboardInterrupt:
+            os._exit(0)
+        except BaseException:
+            traceback.print_exc()
+            sys.stderr.flush()
+            os._exit(1)
+        os._exit(0)
+
+    def _spawn(self):
+        # The signals are blocked around the fork, so that the worker does not
+        # run the supervisor's handlers before resetting them, and so that
+        # the supervisor knows the worker before forwarding any signal.
+        sigmask = signal.pthread_sigmask(signal.SIG_BLOCK,
+                                         self.forward_signals)
+        try:
+            pid = os.fork()
+            if pid == 0:
+                self._run_worker(sigmask)
+            self.workers[pid] = time.monotonic()
+        finally:
+            signal.pthread_sigmask(signal.SIG_SETMASK, sigmask)
+
+    def _forward_signal(self, signum, frame):
+        if signum != signal.SIGHUP:
+            self.stopping = True
+        for pid in self.workers:
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    def run(self):
+        """Starts the worker processes and supervises them until they have
+        all exited after a ``SIGTERM`` or ``SIGINT``.
+
+        """
+        for signum in self.forward_signals:
+            signal.signal(signum, self._forward_signal)
+        for _ in range(self.num_workers):
+            self._spawn()
+        while self.workers:
+            pid, _ = os.wait()
+            started = self.workers.pop(pid, None)
+            if started is None or self.stopping:
+                continue
+            uptime = time.monotonic() - started
+            if uptime < self.restart_delay:
+                time.sleep(self.restart_delay - uptime)
+            if not self.stopping:
+                self._spawn()
@@ -31,7 +31,7 @@ setup(name='pymap',
       url='http://github.com/icgood/pymap/',
       packages=find_packages(),
       namespace_packages=['pymap'],
-      install_requires=['pysasl'],
+      install_requires=['pysasl >= 1.2'],
       entry_points={'console_scripts': [
           'pymap = pymap.main:main',
       ]},
@@ -43,4 +43,4 @@ setup(name='pymap',
                    'Intended Audience :: Information Technology',
                    'License :: OSI Approved :: MIT License',
                    'Programming Language :: Python',
-                   'Programming Language :: Python :: 3.4'])
+                   'Programming Language :: Python :: 3.5'])
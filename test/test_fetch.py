@@ -0,0 +1,56 @@
+
+import unittest
+
+from pymap.fetch import FetchPart, FetchPlan
+from pymap.parsing.command.select import FetchCommand
+from pymap.parsing.specials import SequenceSet
+
+
+class TestFetchPlan(unittest.TestCase):
+
+    def _plan(self, attrs):
+        cmd, _ = FetchCommand._parse(b'a0', b' 1:* ' + attrs + b'\r\n')
+        return FetchPlan(cmd.attributes)
+
+    def test_metadata(self):
+        plan = self._plan(b'(FLAGS UID RFC822.SIZE)')
+        self.assertEqual({b'FLAGS', b'UID', b'RFC822.SIZE'}, plan.metadata)
+        self.assertTrue(plan.metadata_only)
+        self.assertFalse(plan.sets_seen)
+
+    def test_headers(self):
+        plan = self._plan(b'(UID BODY.PEEK[HEADER.FIELDS (From Subject)])')
+        self.assertEqual({b'FROM', b'SUBJECT'}, plan.headers)
+        self.assertFalse(plan.metadata_only)
+        self.assertTrue(plan.headers_only)
+        plan = self._plan(b'(ENVELOPE BODY.PEEK[HEADER])')
+        self.assertIs(True, plan.headers)
+        self.assertTrue(plan.headers_only)
+
+    def test_structure(self):
+        plan = self._plan(b'BODYSTRUCTURE')
+        self.assertTrue(plan.structure)
+        self.assertEqual([], plan.parts)
+
+    def test_parts(self):
+        plan = self._plan(b'(BODY[1.2] BODY.PEEK[1.2.MIME] BODY[3]<0.100>)')
+        self.assertEqual([FetchPart((1, 2)),
+                          FetchPart((1, 2), b'MIME'),
+                          FetchPart((3, ), byte_range=(0, 100))], plan.parts)
+        self.assertTrue(plan.sets_seen)
+
+    def test_parts_mime(self):
+        plan = self._plan(b'(BODY[1] BODY[1.MIME] BODY[1.2.MIME])')
+        self.assertEqual([FetchPart((1, )), FetchPart((1, ), b'MIME')],
+                         plan.parts)
+
+    def test_parts_whole(self):
+        plan = self._plan(b'(RFC822 BODY.PEEK[1] BODY.PEEK[]<10.20>)')
+        self.assertEqual([FetchPart()], plan.parts)
+
+    def test_get_requests(self):
+        plan = self._plan(b'FLAGS')
+        seq_set = SequenceSet([(1, 3), 5, (7, '*')])
+        requests = plan.get_requests(seq_set, 8)
+        self.assertEqual([[1, 2, 3], [5], [7, 8]],
+                         [list(request) for request in requests])
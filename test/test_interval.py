@@ -0,0 +1,37 @@
+
+import unittest
+
+from pymap.interval import IntervalSet
+
+
+class TestIntervalSet(unittest.TestCase):
+
+    def test_normalize(self):
+        ret = IntervalSet([(10, 12), (1, 3), (2, 5), (6, 6), (9, 8)])
+        self.assertEqual([(1, 6), (10, 12)], ret.intervals)
+        self.assertEqual(9, len(ret))
+
+    def test_contains(self):
+        ret = IntervalSet([(1, 3), (7, 9)])
+        self.assertNotIn(0, ret)
+        self.assertIn(1, ret)
+        self.assertIn(3, ret)
+        self.assertNotIn(5, ret)
+        self.assertIn(8, ret)
+        self.assertNotIn(10, ret)
+
+    def test_iter(self):
+        ret = IntervalSet([(7, 8), (1, 2)])
+        self.assertEqual([1, 2, 7, 8], list(ret))
+
+    def test_intersection(self):
+        one = IntervalSet([(1, 5), (10, 20)])
+        two = IntervalSet([(3, 12), (15, 15), (19, 30)])
+        self.assertEqual([(3, 5), (10, 12), (15, 15), (19, 20)],
+                         (one & two).intervals)
+        self.assertEqual(IntervalSet(), one & IntervalSet([(6, 9)]))
+
+    def test_union(self):
+        one = IntervalSet([(1, 5), (10, 20)])
+        two = IntervalSet([(6, 7), (15, 25)])
+        self.assertEqual([(1, 7), (10, 25)], (one | two).intervals)
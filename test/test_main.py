@@ -0,0 +1,238 @@
+import asyncio
+import unittest
+
+from pymap.main import (IMAPServer, CommandRejected,
+                        get_event_loop_policy)
+from pymap.mailbox import DemoBackend, UserState
+
+
+class FakeTransport(object):
+
+    def __init__(self):
+        self.write_buffer_size = 0
+
+    def get_write_buffer_size(self):
+        return self.write_buffer_size
+
+    def is_closing(self):
+        return False
+
+
+class FakeWriter(object):
+
+    def __init__(self, reader):
+        self.reader = reader
+        self.transport = FakeTransport()
+        self.data = bytearray()
+        self.closed = False
+
+    def write(self, data):
+        self.data += data
+
+    def writelines(self, data):
+        for part in data:
+            self.write(part)
+
+    async def drain(self):
+        # Like a real stream writer, other tasks may run while draining.
+        await asyncio.sleep(0)
+
+    def close(self):
+        # Like a real transport, closing ends the data read from the client.
+        self.closed = True
+        if not self.reader.at_eof():
+            self.reader.feed_eof()
+
+
+class FailingUserState(UserState):
+
+    async def list_mailboxes(self, ref_name, filter, subscribed=False):
+        if filter == 'fail':
+            raise RuntimeError(filter)
+        return await super().list_mailboxes(ref_name, filter, subscribed)
+
+
+class FailingBackend(DemoBackend):
+
+    def __init__(self):
+        super().__init__()
+        self.user = FailingUserState('testuser')
+
+    async def login(self, result):
+        return self.user
+
+
+class TestEventLoopPolicy(unittest.TestCase):
+
+    def test_asyncio(self):
+        policy = get_event_loop_policy('asyncio')
+        self.assertIsInstance(policy, asyncio.DefaultEventLoopPolicy)
+
+    def test_auto(self):
+        policy = get_event_loop_policy('auto')
+        self.assertIsInstance(policy, asyncio.AbstractEventLoopPolicy)
+
+
+class TestIMAPServer(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        asyncio.set_event_loop(None)
+        self.loop.close()
+
+    def _run(self, data, backend=None, limit=65536, write_buffer_size=0,
+             **kwargs):
+        reader = asyncio.StreamReader(limit=limit, loop=self.loop)
+        reader.feed_data(data)
+        writer = FakeWriter(reader)
+        writer.transport.write_buffer_size = write_buffer_size
+        server = IMAPServer(reader, writer, backend or DemoBackend(),
+                            max_line_length=limit, **kwargs)
+        self.loop.run_until_complete(server.run())
+        self.assertTrue(writer.closed)
+        return bytes(writer.data).split(b'\r\n')[1:]
+
+    def test_login(self):
+        lines = self._run(b'a1 LOGIN testuser wrong\r\n'
+                          b'a2 LOGIN testuser testpass\r\n'
+                          b'a3 LOGOUT\r\n')
+        self.assertEqual([b'a1 NO Invalid authentication credentials.',
+                          b'a2 OK Authentication successful.',
+                          b'* BYE Logging out.',
+                          b'a3 OK Logout successful.',
+                          b''], lines)
+
+    def test_authenticate(self):
+        lines = self._run(b'a1 AUTHENTICATE PLAIN\r\n'
+                          b'AHRlc3R1c2VyAHRlc3RwYXNz\r\n'
+                          b'a2 AUTHENTICATE PLAIN\r\n'
+                          b'a3 LOGOUT\r\n')
+        self.assertEqual([b'+ ',
+                          b'a1 OK Authentication successful.',
+                          b'a2 BAD AUTHENTICATE: Already authenticated.',
+                          b'* BYE Logging out.',
+                          b'a3 OK Logout successful.',
+                          b''], lines)
+
+    def test_authenticate_invalid(self):
+        lines = self._run(b'a1 AUTHENTICATE PLAIN\r\n'
+                          b'dGVzdA==\r\n'
+                          b'a2 LOGOUT\r\n')
+        self.assertEqual([b'+ ',
+                          b'a1 NO Invalid authentication response.',
+                          b'* BYE Logging out.',
+                          b'a2 OK Logout successful.',
+                          b''], lines)
+
+    def test_pipeline_failure(self):
+        with self.assertLogs('pymap.main') as logs:
+            lines = self._run(b'a0 LOGIN testuser testpass\r\n'
+                              b'a1 LIST "" "fail"\r\n'
+                              b'a2 LIST "" "INBOX"\r\n'
+                              b'a3 LOGOUT\r\n',
+                              backend=FailingBackend(), pipeline=True)
+        self.assertEqual(1, len(logs.records))
+        self.assertEqual([b'a0 OK Authentication successful.',
+                          b'a1 BAD Server error.',
+                          b'* LIST () "." "INBOX"',
+                          b'a2 OK List completed.',
+                          b'* BYE Logging out.',
+                          b'a3 OK Logout successful.',
+                          b''], lines)
+
+    def test_pipeline_streaming(self):
+        lines = self._run(b'a0 LOGIN testuser testpass\r\n'
+                          b'a1 SELECT INBOX\r\n'
+                          b'a2 SEARCH ALL\r\n'
+                          b'a3 CAPABILITY\r\n'
+                          b'a4 LOGOUT\r\n',
+                          pipeline=True, write_buffer_size=65536)
+        search = [line for line in lines if line.startswith(b'* SEARCH')]
+        self.assertEqual(1, len(search))
+        self.assertNotIn(b'*', search[0][1:])
+        self.assertEqual(1, len([line for line in lines
+                                 if line.startswith(b'* CAPABILITY ')]))
+        self.assertIn(b'a2 OK Search completed.', lines)
+        self.assertIn(b'a3 OK Capabilities listed.', lines)
+
+    def test_invalid_mailbox_name(self):
+        lines = self._run(b'a0 LOGIN testuser testpass\r\n'
+                          b'a1 SELECT a&b\r\n'
+                          b'a2 LOGOUT\r\n')
+        self.assertEqual(b'a0 OK Authentication successful.', lines[0])
+        self.assertTrue(lines[1].startswith(b'a1 BAD '))
+        self.assertEqual([b'* BYE Logging out.',
+                          b'a2 OK Logout successful.',
+                          b''], lines[2:])
+
+    def test_unexpected_error(self):
+        reader = asyncio.StreamReader(loop=self.loop)
+        reader.set_exception(RuntimeError('test'))
+        writer = FakeWriter(reader)
+        server = IMAPServer(reader, writer, DemoBackend())
+        with self.assertRaises(RuntimeError):
+            self.loop.run_until_complete(server.run())
+        self.assertTrue(writer.closed)
+        self.assertTrue(writer.data.startswith(b'* OK '))
+
+    def test_spool_literal(self):
+        backend = FailingBackend()
+        lines = self._run(b'a0 LOGIN testuser testpass\r\n'
+                          b'a1 APPEND INBOX {20}\r\n'
+                          b'Subject: spooled\r\n\r\n\r\n'
+                          b'a2 LOGOUT\r\n',
+                          backend=backend, spool_threshold=10)
+        self.assertEqual([b'a0 OK Authentication successful.',
+                          b'+ Literal string',
+                          b'a1 OK Append completed.',
+                          b'* BYE Logging out.',
+                          b'a2 OK Logout successful.',
+                          b''], lines)
+        message = backend.user.mailboxes['INBOX'].messages[-1]
+        self.assertEqual(b'Subject: spooled\r\n\r\n', message.content)
+
+    def test_line_too_long(self):
+        lines = self._run(b'a1 NOOP' + b' ' * 100 + b'\r\n'
+                          b'a2 LOGOUT\r\n', limit=50)
+        self.assertEqual([b'* BYE [TOOBIG] Line too long.', b''], lines)
+
+    def test_literal_too_large(self):
+        lines = self._run(b'a1 APPEND INBOX {100}\r\n'
+                          b'a2 LOGOUT\r\n', max_literal_size=50)
+        self.assertEqual([b'a1 NO [TOOBIG] Literal string too large.',
+                          b'* BYE Logging out.',
+                          b'a2 OK Logout successful.',
+                          b''], lines)
+
+    def test_literal_too_large_non_sync(self):
+        lines = self._run(b'a1 APPEND INBOX {100+}\r\n' + b'x' * 100 +
+                          b'\r\na2 LOGOUT\r\n', max_literal_size=50)
+        self.assertEqual([b'* BYE [TOOBIG] Literal string too large.',
+                          b''], lines)
+
+    def test_literal_total_too_large(self):
+        lines = self._run(b'a1 LOGIN {8}\r\n'
+                          b'testuser {40}\r\n'
+                          b'a2 LOGOUT\r\n',
+                          max_literal_size=50, max_literal_total=40)
+        self.assertEqual([b'+ Literal string',
+                          b'a1 NO [TOOBIG] Literal strings in command too '
+                          b'large.',
+                          b'* BYE Logging out.',
+                          b'a2 OK Logout successful.',
+                          b''], lines)
+
+    def test_check_literal(self):
+        server = IMAPServer(None, None, DemoBackend(), max_literal_size=50)
+        with self.assertRaises(CommandRejected) as raised:
+            server._check_literal(b'a1 APPEND INBOX {100}\r\n', 100, 100,
+                                  False)
+        self.assertEqual(b'a1 NO [TOOBIG] Literal string too large.\r\n',
+                         bytes(raised.exception.response))
+        with self.assertRaises(CommandRejected) as raised:
+            server._check_literal(b'{100}\r\n', 100, 100, False)
+        self.assertEqual(b'* NO [TOOBIG] Literal string too large.\r\n',
+                         bytes(raised.exception.response))
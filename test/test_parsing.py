@@ -23,6 +23,14 @@ class TestNotParseable(unittest.TestCase):
         self.assertEqual(b'one [:ERROR:]two three', bytes(exc))
         self.assertEqual('one [:ERROR:]two three', str(exc))
 
+    def test_where(self):
+        mem = memoryview(b'one two three')[4:]
+        exc = NotParseable(mem, 4)
+        self.assertEqual(8, exc.offset)
+        self.assertEqual(b'one two ', exc.before)
+        self.assertEqual(b'three', exc.after)
+        self.assertEqual(b'one two [:ERROR:]three', bytes(exc))
+
 
 class TestParseable(unittest.TestCase):
 
@@ -38,6 +46,18 @@ class TestParseable(unittest.TestCase):
         list, _ = Parseable.parse(b'()', [List])
         self.assertIsInstance(list, List)
 
+    def test_parse_lookahead(self):
+        class NeverParsed(Parseable):
+            lookahead = frozenset(b'(')
+
+            @classmethod
+            def parse(cls, buf, **kwargs):
+                raise AssertionError(buf)
+        atom, _ = Parseable.parse(b'  ATOM', [NeverParsed, Atom])
+        self.assertIsInstance(atom, Atom)
+        self.assertEqual(0x41, Parseable.peek(b'  ATOM'))
+        self.assertIsNone(Parseable.peek(b'  '))
+
     def test_parse_expectation_failure(self):
         with self.assertRaises(NotParseable):
             Parseable.parse(b'ATOM', expected=[Number, Nil])
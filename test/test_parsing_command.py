@@ -2,8 +2,12 @@
 import unittest
 from unittest.mock import MagicMock
 
-from pymap.parsing import NotParseable
+from pymap.parsing import NotParseable, Space, EndLine
 from pymap.parsing.command import *
+from pymap.parsing.command.auth import (AppendCommand, IdleCommand,
+                                        ListCommand)
+from pymap.parsing.command.select import FetchCommand, UidCommand
+from pymap.parsing.specials import FetchAttribute, SequenceSet
 
 
 class TestBadCommand(unittest.TestCase):
@@ -34,8 +38,12 @@ class TestCommand(unittest.TestCase):
 
     def setUp(self):
         self.cmd = MagicMock(command=b'TEST')
+        self._commands = Command._commands
         Command._commands = {b'TEST': self.cmd}
 
+    def tearDown(self):
+        Command._commands = self._commands
+
     def test_parse(self):
         self.cmd._parse.return_value = 123
         ret = Command.parse(b'a0 TEST \r\n')
@@ -58,6 +66,13 @@ class TestCommand(unittest.TestCase):
         with self.assertRaises(CommandNotFound):
             Command.parse(b'a2 BADCMD \r\n')
 
+    def test_parse_at_implemented(self):
+        base = Command._parse_at.__func__
+        for cmd_type in self._commands.values():
+            self.assertIsNot(base, cmd_type._parse_at.__func__, cmd_type)
+        with self.assertRaises(NotImplementedError):
+            Command._parse(b'a0', b'\r\n')
+
 
 class TestCommandNoArgs(unittest.TestCase):
 
@@ -70,3 +85,127 @@ class TestCommandNoArgs(unittest.TestCase):
         ret, buf = CommandNoArgs._parse(b'a1', b'    \n test')
         self.assertIsInstance(ret, CommandNoArgs)
         self.assertEqual(b' test', buf)
+
+
+class TestAppendCommand(unittest.TestCase):
+
+    def test_parse(self):
+        message = b'Subject: test\r\n\r\nhello\r\n'
+        line = b' INBOX (\\Seen) {24}\r\n\r\n'
+        ret, buf = AppendCommand._parse(b'a0', line, literals=[message])
+        self.assertEqual('INBOX', ret.mailbox)
+        self.assertIs(message, ret.message)
+        self.assertEqual(b'', buf)
+
+
+class TestListCommand(unittest.TestCase):
+
+    def test_parse(self):
+        ret, buf = ListCommand._parse(b'a0', b' "" *\r\n')
+        self.assertEqual('', ret.mailbox)
+        self.assertEqual('*', ret.list_mailbox)
+        self.assertEqual(b'', buf)
+        ret, _ = ListCommand._parse(b'a0', b' .Testing %.%s*\r\n')
+        self.assertEqual('.Testing', ret.mailbox)
+        self.assertEqual('%.%s*', ret.list_mailbox)
+
+    def test_parse_failure(self):
+        with self.assertRaises(NotParseable):
+            ListCommand._parse(b'a0', b' * *\r\n')
+
+
+class TestIdleCommand(unittest.TestCase):
+
+    def test_parse(self):
+        ret, buf = IdleCommand._parse(b'a0', b'\r\n')
+        self.assertIsInstance(ret, IdleCommand)
+        self.assertEqual(b'a0', ret.tag)
+        self.assertEqual(b'', buf)
+
+    def test_parse_failure(self):
+        with self.assertRaises(NotParseable):
+            IdleCommand._parse(b'a0', b' INBOX\r\n')
+
+
+class TestFetchCommand(unittest.TestCase):
+
+    def test_parse_macro(self):
+        ret, buf = FetchCommand._parse(b'a0', b' 1:* fast\r\n')
+        self.assertEqual([b'FLAGS', b'INTERNALDATE', b'RFC822.SIZE'],
+                         [attr.attribute for attr in ret.attributes])
+        self.assertEqual(b'', buf)
+
+    def test_parse_macro_interned(self):
+        ret1, _ = FetchCommand._parse(b'a0', b' 1 FULL\r\n')
+        ret2, _ = FetchCommand._parse(b'a1', b' 2 (FLAGS BODY)\r\n')
+        self.assertIs(ret1.attributes[0], ret2.attributes[0])
+        self.assertIs(ret1.attributes[4], ret2.attributes[1])
+        self.assertIsNone(ret1.attributes[4].section)
+
+    def test_parse_list(self):
+        ret, buf = FetchCommand._parse(b'a0', b' 1 (UID BODY[TEXT])\r\n')
+        self.assertEqual([b'UID', b'BODY'],
+                         [attr.attribute for attr in ret.attributes])
+        self.assertFalse(ret.uid)
+
+    def test_parse_slots(self):
+        ret, _ = FetchCommand._parse(b'a0', b' 1 (UID BODY[TEXT])\r\n')
+        self.assertFalse(hasattr(ret, '__dict__'))
+        self.assertFalse(hasattr(ret.attributes[1], '__dict__'))
+
+    def test_parse_list_sections(self):
+        ret, buf = FetchCommand._parse(
+            b'a0', b' 1 (BODY[HEADER] BODY.PEEK[1]<0.10> FLAGS)\r\n')
+        self.assertEqual([b'BODY', b'BODY.PEEK', b'FLAGS'],
+                         [attr.attribute for attr in ret.attributes])
+
+    def test_concurrent(self):
+        peek = FetchAttribute(b'BODY.PEEK', (None, b'HEADER', None))
+        cmd1 = FetchCommand(b'a0', [1], [FetchAttribute(b'FLAGS'), peek])
+        self.assertTrue(cmd1.concurrent)
+        cmd2 = FetchCommand(b'a1', [1], [FetchAttribute(b'BODY')])
+        self.assertTrue(cmd2.concurrent)
+        body = FetchAttribute(b'BODY', (None, None, None))
+        cmd3 = FetchCommand(b'a2', [1], [FetchAttribute(b'UID'), body])
+        self.assertFalse(cmd3.concurrent)
+        cmd4 = FetchCommand(b'a3', [1], [FetchAttribute(b'RFC822')])
+        self.assertFalse(cmd4.concurrent)
+
+
+class TestUidCommand(unittest.TestCase):
+
+    def test_parse(self):
+        ret, buf = UidCommand._parse(b'a0', b' FETCH 1:* FLAGS\r\n')
+        self.assertIsInstance(ret, FetchCommand)
+        self.assertTrue(ret.uid)
+        self.assertEqual([(1, '*')], ret.sequence_set)
+
+    def test_parse_failure(self):
+        with self.assertRaises(NotParseable):
+            UidCommand._parse(b'a0', b' EXPUNGE\r\n')
+
+    def test_register_subcommand(self):
+
+        class UidExpungeCommand(CommandSelect):
+            command = b'EXPUNGE'
+
+            def __init__(self, tag, seq_set, uid=False):
+                super().__init__(tag)
+                self.sequence_set = seq_set
+                self.uid = uid
+
+            @classmethod
+            def _parse_at(cls, tag, buf, pos, uid=False, **kwargs):
+                _, pos = Space.parse_at(buf, pos)
+                seq_set, pos = SequenceSet.parse_at(buf, pos)
+                _, pos = EndLine.parse_at(buf, pos)
+                return cls(tag, seq_set.sequences, uid=uid), pos
+
+        UidCommand.register_subcommand(UidExpungeCommand)
+        try:
+            ret, buf = UidCommand._parse(b'a0', b' expunge 3:5\r\n')
+        finally:
+            del UidCommand._subcommands[b'EXPUNGE']
+        self.assertIsInstance(ret, UidExpungeCommand)
+        self.assertTrue(ret.uid)
+        self.assertEqual([(3, 5)], ret.sequence_set)
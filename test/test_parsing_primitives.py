@@ -1,5 +1,7 @@
 
 import unittest
+import mmap
+import tempfile
 
 from pymap.parsing import NotParseable, RequiresContinuation
 from pymap.parsing.primitives import *
@@ -18,6 +20,8 @@ class TestNil(unittest.TestCase):
             Nil.parse(b'')
         with self.assertRaises(NotParseable):
             Nil.parse(b'niltest')
+        with self.assertRaises(NotParseable):
+            Nil.parse(b'NIL.')
 
     def test_bytes(self):
         nil = Nil()
@@ -32,6 +36,11 @@ class TestNumber(unittest.TestCase):
         self.assertEqual(123, ret.value)
         self.assertEqual(b'  ', buf)
 
+    def test_parse_atom_end(self):
+        ret, buf = Number.parse(b'123]')
+        self.assertEqual(123, ret.value)
+        self.assertEqual(b']', buf)
+
     def test_parse_failure(self):
         with self.assertRaises(NotParseable):
             Number.parse(b'abc')
@@ -78,6 +87,13 @@ class TestString(unittest.TestCase):
         self.assertEqual(br'', ret.value)
         self.assertEqual(b'  ', buf)
 
+    def test_quoted_parse_unescaped(self):
+        ret, buf = String.parse(b'  "one two"  ')
+        self.assertIsInstance(ret, QuotedString)
+        self.assertEqual(b'one two', ret.value)
+        self.assertEqual(b'"one two"', bytes(ret))
+        self.assertEqual(b'  ', buf)
+
     def test_quoted_parse_failure(self):
         with self.assertRaises(NotParseable):
             String.parse(b'test')
@@ -116,6 +132,60 @@ class TestString(unittest.TestCase):
         with self.assertRaises(NotParseable):
             String.parse(b'{10}\r\n', continuations=[b'a'*9])
 
+    def test_literal_parse_nonsync(self):
+        ret, buf = String.parse(b'{5+}\r\n', continuations=[b'test\x01abc'])
+        self.assertIsInstance(ret, LiteralString)
+        self.assertEqual(b'test\x01', ret.value)
+        self.assertEqual(b'abc', buf)
+
+    def test_literal_parse_mmap(self):
+        with tempfile.TemporaryFile() as spool:
+            spool.write(b'test\x01abc')
+            spool.flush()
+            cont = mmap.mmap(spool.fileno(), 0, access=mmap.ACCESS_READ)
+        ret, buf = String.parse(b'{5}\r\n', continuations=[cont])
+        self.assertIsInstance(ret, LiteralString)
+        self.assertIsInstance(ret.value, memoryview)
+        self.assertIs(cont, ret.value.obj)
+        self.assertEqual(b'test\x01', ret.value)
+        self.assertEqual(b'abc', buf)
+
+    def test_literal_header(self):
+        self.assertEqual((5, False), LiteralString.get_literal_header(
+            b'a1 LOGIN {5}\r\n'))
+        self.assertEqual((0, False), LiteralString.get_literal_header(
+            b'a1 LOGIN {0}\n'))
+        self.assertEqual((12, True), LiteralString.get_literal_header(
+            b'a1 LOGIN {12+}\r\n'))
+        self.assertEqual((3, False), LiteralString.get_literal_header(
+            b'te{5}\r\n {3}\r\n', 7))
+        self.assertIsNone(LiteralString.get_literal_header(
+            b'a1 LOGIN "{5}"\r\n'))
+        self.assertIsNone(LiteralString.get_literal_header(
+            b'x{5}\r\n\r\n', 6))
+        self.assertIsNone(LiteralString.get_literal_header(
+            b'a1 LOGIN {}\r\n'))
+        self.assertIsNone(LiteralString.get_literal_header(
+            b'a1 LOGIN {5-}\r\n'))
+
+    def test_literal_split_continuations(self):
+        line, literals = LiteralString.split_continuations(
+            b'a1 LOGIN {3}\r\n', [b'one {3+}\r\n', b'two\r\n'])
+        self.assertEqual(b'a1 LOGIN {3}\r\n {3+}\r\n\r\n', line)
+        self.assertEqual([b'one', b'two'], literals)
+
+    def test_literal_split_continuations_tuples(self):
+        with tempfile.TemporaryFile() as spool:
+            spool.write(b'two')
+            spool.flush()
+            two = mmap.mmap(spool.fileno(), 0, access=mmap.ACCESS_READ)
+        one = b'one'
+        line, literals = LiteralString.split_continuations(
+            b'a1 LOGIN {3}\r\n', [(one, b' {3+}\r\n'), (two, b'\r\n')])
+        self.assertEqual(b'a1 LOGIN {3}\r\n {3+}\r\n\r\n', line)
+        self.assertIs(one, literals[0])
+        self.assertIs(two, literals[1].obj)
+
     def test_literal_bytes(self):
         qstring1 = LiteralString(b'one\r\ntwo')
         self.assertEqual(b'{8}\r\none\r\ntwo', bytes(qstring1))
@@ -140,6 +210,13 @@ class TestList(unittest.TestCase):
         self.assertIsInstance(ret.value[3], QuotedString)
         self.assertEqual(b'four', ret.value[3].value)
 
+    def test_parse_at(self):
+        ret, pos = List.parse_at(b'one (TWO 3) four', 3,
+                                 list_expected=[Atom, Number])
+        self.assertIsInstance(ret, List)
+        self.assertEqual(2, len(ret.value))
+        self.assertEqual(11, pos)
+
     def test_parse_empty(self):
         ret, buf = List.parse(br'  ()  ')
         self.assertIsInstance(ret, List)
@@ -154,6 +231,11 @@ class TestList(unittest.TestCase):
         with self.assertRaises(NotParseable):
             List.parse(b'(123 abc 456)', list_expected=[Number])
 
+    def test_iter(self):
+        ret = List([Number(1), Atom(b'two')])
+        self.assertEqual([1, b'two'], [item.value for item in ret])
+        self.assertFalse(hasattr(ret, '__dict__'))
+
     def test_bytes(self):
         ret = List([QuotedString(b'abc'), Number(123), List([Nil()])])
         self.assertEqual(b'("abc" 123 (NIL))', bytes(ret))
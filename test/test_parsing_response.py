@@ -0,0 +1,129 @@
+import asyncio
+import unittest
+
+from pymap.parsing.response import (ResponseWriter, StreamingResponse,
+                                    ResponseOk)
+from pymap.parsing.response.specials import SearchResponse
+
+
+class FakeTransport(object):
+
+    def __init__(self):
+        self.buffer_size = 0
+        self.closing = False
+
+    def get_write_buffer_size(self):
+        return self.buffer_size
+
+    def is_closing(self):
+        return self.closing
+
+
+class FakeWriter(object):
+
+    def __init__(self):
+        self.transport = FakeTransport()
+        self.writes = []
+        self.drains = 0
+
+    def writelines(self, data):
+        self.writes.append(b''.join(data))
+        self.transport.buffer_size += len(self.writes[-1])
+
+    async def drain(self):
+        self.drains += 1
+        if self.transport.closing:
+            raise ConnectionResetError('Connection lost')
+        self.transport.buffer_size = 0
+
+
+class TestResponseWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.writer = FakeWriter()
+        self.output = ResponseWriter(self.writer, high_water=10)
+
+    def tearDown(self):
+        asyncio.set_event_loop(None)
+        self.loop.close()
+
+    def _run(self, coro):
+        return self.loop.run_until_complete(coro)
+
+    def test_coalesce(self):
+        async def send():
+            self.output.high_water = 100
+            await ResponseOk(b'a1', b'one').send_stream(self.output)
+            await ResponseOk(b'a2', b'two').send_stream(self.output)
+            self.assertEqual([], self.writer.writes)
+            await asyncio.sleep(0)
+        self._run(send())
+        self.assertEqual([b'a1 OK one\r\na2 OK two\r\n'], self.writer.writes)
+        self.assertEqual(0, self.writer.drains)
+
+    def test_high_water(self):
+        async def send():
+            self.output.write(b'12345')
+            await self.output.drain()
+            self.assertEqual([], self.writer.writes)
+            self.assertEqual(0, self.writer.drains)
+            self.output.write(b'67890')
+            await self.output.drain()
+        self._run(send())
+        self.assertEqual([b'1234567890'], self.writer.writes)
+        self.assertEqual(1, self.writer.drains)
+        self.assertEqual(0, self.writer.transport.buffer_size)
+
+    def test_high_water_transport(self):
+        async def send():
+            self.writer.transport.buffer_size = 10
+            self.output.write(b'12345')
+            await self.output.drain()
+            self.assertEqual([], self.writer.writes)
+        self._run(send())
+        self.assertEqual(1, self.writer.drains)
+
+    def test_closing(self):
+        self.writer.transport.closing = True
+        self.output.write(b'12345')
+        with self.assertRaises(ConnectionResetError):
+            self._run(self.output.drain())
+        self.assertEqual([b'12345'], self.writer.writes)
+        self.assertEqual(1, self.writer.drains)
+
+    def test_close(self):
+        self.writer.close = lambda: self.writer.writes.append(None)
+        self.output.write(b'12345')
+        self.output.close()
+        self.assertEqual([b'12345', None], self.writer.writes)
+
+
+class TestStreamingResponse(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        asyncio.set_event_loop(None)
+        self.loop.close()
+
+    def test_search(self):
+        writer = FakeWriter()
+        output = ResponseWriter(writer, high_water=10)
+        search = SearchResponse([1, 2, 3, 4, 5])
+        response = StreamingResponse(ResponseOk(b'a1', b'Done.'),
+                                     search.iter_chunks(chunk_size=2))
+        self.loop.run_until_complete(response.send_stream(output))
+        output.flush()
+        self.assertEqual([b'* SEARCH 1 2', b' 3 4 5\r\na1 OK Done.\r\n'],
+                         writer.writes)
+        self.assertEqual(2, writer.drains)
+        self.assertEqual(b'* SEARCH 1 2 3 4 5\r\n', bytes(search))
+
+    def test_bytes(self):
+        response = StreamingResponse(ResponseOk(b'a1', b'Done.'), [])
+        with self.assertRaises(TypeError):
+            bytes(response)
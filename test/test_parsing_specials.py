@@ -75,10 +75,42 @@ class TestMailbox(unittest.TestCase):
         with self.assertRaises(NotParseable):
             Mailbox.parse(b'  ')
 
+    def test_parse_invalid_encoding(self):
+        with self.assertRaises(InvalidContent):
+            Mailbox.parse(b'a&b')
+
     def test_bytes(self):
         mbx = Mailbox('~peter/mail/&/台北/日本語')
         self.assertEqual(b'~peter/mail/&-/&U,BTFw-/&ZeVnLIqe-', bytes(mbx))
 
+    def test_encode_name(self):
+        self.assertEqual(b'Sent Items', Mailbox.encode_name('Sent Items'))
+        self.assertEqual(b'&ZeVnLIqe-&-', Mailbox.encode_name('日本語&'))
+        self.assertEqual(b'&AH8-', Mailbox.encode_name('\x7f'))
+
+    def test_decode_name(self):
+        self.assertEqual('Sent Items', Mailbox.decode_name(b'Sent Items'))
+        self.assertEqual('日本語&', Mailbox.decode_name(b'&ZeVnLIqe-&-'))
+        self.assertEqual('台北', Mailbox.decode_name(b'&U,BTFw'))
+
+
+class TestListMailbox(unittest.TestCase):
+
+    def test_parse(self):
+        ret, buf = ListMailbox.parse(b' &ZeVnLIqe-/%/*  ')
+        self.assertIsInstance(ret, ListMailbox)
+        self.assertEqual('日本語/%/*', ret.value)
+        self.assertEqual(b'  ', buf)
+
+    def test_parse_quoted(self):
+        ret, buf = ListMailbox.parse(b'"*"')
+        self.assertEqual('*', ret.value)
+        self.assertEqual(b'', buf)
+
+    def test_parse_inbox(self):
+        ret, _ = ListMailbox.parse(b'inbox')
+        self.assertEqual('INBOX', ret.value)
+
 
 class TestDateTime(unittest.TestCase):
 
@@ -93,9 +125,24 @@ class TestDateTime(unittest.TestCase):
         self.assertEqual(3, ret.when.second)
         self.assertEqual(18000.0, ret.when.utcoffset().total_seconds())
 
+    def test_parse_negative_offset(self):
+        ret, buf = DateTime.parse(b'" 7-jul-1996 02:44:25 -0730"')
+        self.assertEqual(7, ret.when.month)
+        self.assertEqual(-27000.0, ret.when.utcoffset().total_seconds())
+
     def test_parse_failure(self):
         with self.assertRaises(InvalidContent):
             DateTime.parse(b'"test"')
+        with self.assertRaises(InvalidContent):
+            DateTime.parse(b'"1-Foo-2000 01:02:03 +0500"')
+        with self.assertRaises(InvalidContent):
+            DateTime.parse(b'"31-Feb-2000 01:02:03 +0500"')
+
+    def test_parse_date(self):
+        self.assertEqual(datetime(2014, 1, 1),
+                         DateTime.parse_date(b'1-jan-2014'))
+        with self.assertRaises(ValueError):
+            DateTime.parse_date(b'1-Jan-2014 01:02:03 +0500')
 
     def test_bytes(self):
         dt1 = DateTime(datetime(2000, 1, 1, 1, 2, 3,
@@ -103,3 +150,105 @@ class TestDateTime(unittest.TestCase):
         self.assertEqual(b'"01-Jan-2000 01:02:03 +0500"', bytes(dt1))
         dt2 = DateTime(None, b'testing')
         self.assertEqual(b'"testing"', bytes(dt2))
+        dt3 = DateTime(datetime(2000, 12, 31, 23, 59, 59,
+                                tzinfo=timezone(-timedelta(minutes=90))))
+        self.assertEqual(b'"31-Dec-2000 23:59:59 -0130"', bytes(dt3))
+
+
+class TestFlag(unittest.TestCase):
+
+    def test_parse(self):
+        ret, buf = Flag.parse(b'  \\seen  ')
+        self.assertEqual(b'\\Seen', ret.value)
+        self.assertEqual(b'  ', buf)
+        ret, buf = Flag.parse(b'$Custom')
+        self.assertEqual(b'$Custom', ret.value)
+
+    def test_parse_interned(self):
+        seen1, _ = Flag.parse(b'\\Seen')
+        seen2, _ = Flag.parse(b'\\SEEN')
+        self.assertIs(seen1, seen2)
+        self.assertIs(seen1, Flag.intern(b'\\Seen'))
+        custom1, _ = Flag.parse(b'$Custom')
+        custom2, _ = Flag.parse(b'$Custom')
+        self.assertIsNot(custom1, custom2)
+        self.assertEqual(custom1, custom2)
+
+    def test_eq_hash(self):
+        self.assertEqual(Flag(b'\\DELETED'), b'\\Deleted')
+        self.assertNotEqual(Flag(b'\\Deleted'), '\\Deleted')
+        self.assertNotIn('\\Seen', {Flag(b'\\Seen')})
+        self.assertNotEqual(Flag(b'\\Deleted'), b'\\DELETED')
+        self.assertNotEqual(Flag(b'\\Deleted'), Flag(b'\\Draft'))
+        self.assertEqual({Flag(b'\\Draft')}, {Flag.intern(b'\\draft')})
+        self.assertIn(Flag(b'\\SEEN'), {b'\\Seen'})
+        self.assertIn(b'\\Seen', {Flag(b'\\seen')})
+        self.assertEqual(hash(b'\\Seen'), hash(Flag(b'\\SEEN')))
+
+
+class TestFetchAttribute(unittest.TestCase):
+
+    def test_parse_partial(self):
+        ret, buf = FetchAttribute.parse(b'body.peek[1.header.fields (from)]'
+                                        b'<500.100> ')
+        self.assertEqual((500, 100), ret.partial)
+        self.assertEqual(b' ', buf)
+        self.assertEqual(b'BODY.PEEK[1.HEADER.FIELDS (FROM)]<500.100>',
+                         ret.raw)
+        self.assertEqual(b'BODY[1.HEADER.FIELDS (FROM)]<500>',
+                         ret.response_name)
+
+    def test_parse_partial_failure(self):
+        with self.assertRaises(NotParseable):
+            FetchAttribute.parse(b'BODY[]<5.0>')
+
+
+class TestStatusAttribute(unittest.TestCase):
+
+    def test_parse(self):
+        ret, buf = StatusAttribute.parse(b' uidnext ')
+        self.assertEqual(b'UIDNEXT', ret.value)
+        self.assertEqual(b' ', buf)
+        self.assertIs(ret, StatusAttribute.parse(b'UIDNEXT')[0])
+
+    def test_parse_failure(self):
+        with self.assertRaises(InvalidContent):
+            StatusAttribute.parse(b'TEST')
+
+
+class TestSequenceSet(unittest.TestCase):
+
+    def test_parse(self):
+        ret, buf = SequenceSet.parse(b' 1,3:5,*:9,12:*  ')
+        self.assertEqual([1, (3, 5), ('*', 9), (12, '*')], ret.sequences)
+        self.assertEqual(b'  ', buf)
+
+    def test_parse_failure(self):
+        with self.assertRaises(NotParseable):
+            SequenceSet.parse(b'')
+        with self.assertRaises(NotParseable):
+            SequenceSet.parse(b'1,2,')
+        with self.assertRaises(NotParseable):
+            SequenceSet.parse(b'1,,2')
+        with self.assertRaises(NotParseable):
+            SequenceSet.parse(b'1,2, 3')
+
+    def test_resolve(self):
+        seq_set = SequenceSet([1, (3, 5), ('*', 9), (12, '*')])
+        self.assertEqual([(1, 1), (3, 5), (9, 20)],
+                         seq_set.resolve(20).intervals)
+        self.assertEqual([(1, 1), (3, 5), (7, 7)],
+                         seq_set.resolve(7).intervals)
+        self.assertEqual([], seq_set.resolve(0).intervals)
+
+    def test_contains(self):
+        seq_set = SequenceSet([2, (4, '*')])
+        self.assertFalse(seq_set.contains(1, 10))
+        self.assertTrue(seq_set.contains(2, 10))
+        self.assertFalse(seq_set.contains(3, 10))
+        self.assertTrue(seq_set.contains(10, 10))
+        self.assertFalse(seq_set.contains(11, 10))
+
+    def test_iter(self):
+        seq_set = SequenceSet([('*', 8), 2, (3, 4)])
+        self.assertEqual([2, 3, 4, 8, 9, 10], list(seq_set.iter(10)))
@@ -0,0 +1,97 @@
+
+import unittest
+from datetime import datetime
+
+from pymap.interval import IntervalSet
+from pymap.parsing.specials import SearchKey
+from pymap.search import SearchIndex, SearchPlan, AndOperator
+
+
+class Message(object):
+
+    def __init__(self, uid, flags=(), size=100, headers=None, text=''):
+        self.uid = uid
+        self.flags = set(flags)
+        self.size = size
+        self.headers = headers or {}
+        self.text = text
+        self.text_read = False
+
+    def get_size(self):
+        return self.size
+
+    def get_internal_date(self):
+        return datetime(2014, 1, self.uid)
+
+    def get_header(self, name):
+        return self.headers.get(name, [])
+
+    def get_text(self, include_headers):
+        self.text_read = True
+        return self.text
+
+
+class FlagIndex(SearchIndex):
+
+    def __init__(self, messages):
+        self.messages = messages
+        self.used = False
+
+    def get_flag_index(self, flag):
+        self.used = True
+        return IntervalSet([(seq, seq) for seq, msg
+                            in enumerate(self.messages, 1)
+                            if flag in msg.flags])
+
+
+class TestSearchPlan(unittest.TestCase):
+
+    def setUp(self):
+        self.messages = [
+            Message(1, [br'\Seen'], 50, {'Subject': ['Hello world']}),
+            Message(3, [br'\Recent'], 500, {'Subject': ['hello']}, 'text'),
+            Message(4, [br'\Seen', br'\Flagged'], 5000, text='more text'),
+            Message(8, [br'\Recent', br'\Deleted'], 50)]
+
+    def _search(self, line, index=None):
+        keys = []
+        buf = memoryview(line)
+        pos = 0
+        while pos < len(buf):
+            key, pos = SearchKey.parse_at(buf, pos)
+            keys.append(key)
+        return SearchPlan(keys).run(self.messages, index)
+
+    def test_compile(self):
+        key, _ = SearchKey.parse(b'(SUBJECT a (TEXT b DELETED) LARGER 5)')
+        plan = SearchPlan([key])
+        self.assertIsInstance(plan.root, AndOperator)
+        self.assertEqual([1, 2, 3, 4],
+                         [op.cost for op in plan.root.operators])
+
+    def test_run(self):
+        self.assertEqual([1, 2, 3, 4], self._search(b'ALL'))
+        self.assertEqual([2, 4], self._search(b'UNSEEN'))
+        self.assertEqual([2, 4], self._search(b'NEW'))
+        self.assertEqual([1, 3], self._search(b'NOT NEW'))
+        self.assertEqual([1], self._search(b'SEEN NOT FLAGGED'))
+        self.assertEqual([1], self._search(b'(SEEN NOT FLAGGED)'))
+        self.assertEqual([2], self._search(b'(NOT SEEN NOT DELETED)'))
+        self.assertEqual([1, 3], self._search(b'OR SEEN FLAGGED'))
+        self.assertEqual([2, 3], self._search(b'LARGER 100'))
+        self.assertEqual([2, 3, 4], self._search(b'UID 2:*'))
+        self.assertEqual([3], self._search(b'2:* SEEN'))
+        self.assertEqual([1, 2], self._search(b'SUBJECT HELLO'))
+        self.assertEqual([2, 3], self._search(b'BODY text'))
+        self.assertEqual([3, 4], self._search(b'SINCE 4-Jan-2014'))
+
+    def test_run_short_circuit(self):
+        self.assertEqual([3], self._search(b'TEXT text SEEN'))
+        self.assertFalse(self.messages[1].text_read)
+        self.assertTrue(self.messages[2].text_read)
+
+    def test_run_index(self):
+        index = FlagIndex(self.messages)
+        self.assertEqual([2], self._search(b'BODY text RECENT', index))
+        self.assertTrue(index.used)
+        self.assertFalse(self.messages[2].text_read)
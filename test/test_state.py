@@ -0,0 +1,288 @@
+
+import asyncio
+import unittest
+
+from pysasl.creds.plain import PlainCredentials
+
+from pymap.mailbox import DemoBackend, MessageState
+from pymap.parsing.command import CommandAny, CommandNoArgs
+from pymap.parsing.command.auth import (SelectCommand, ExamineCommand,
+                                        ListCommand, LSubCommand,
+                                        StatusCommand, AppendCommand,
+                                        IdleCommand)
+from pymap.parsing.command.nonauth import LoginCommand
+from pymap.parsing.command.select import (SearchCommand, StoreCommand,
+                                          CopyCommand, ExpungeCommand,
+                                          FetchCommand, UidCommand)
+from pymap.state import ConnectionState
+
+
+class UnknownCommand(CommandAny, CommandNoArgs):
+    __slots__ = []
+
+    command = b'XUNKNOWN'
+
+
+class Writer(object):
+
+    def __init__(self):
+        self.data = bytearray()
+
+    def write(self, data):
+        self.data += data
+
+    async def drain(self):
+        pass
+
+
+class TestConnectionState(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.backend = DemoBackend()
+        self.state = self._login()
+        for mbx in self.state.user.mailboxes.values():
+            mbx.messages = [
+                MessageState(1, b'Subject: one\r\n\r\nfirst\r\n'),
+                MessageState(2, b'Subject: two\r\n\r\nsecond\r\n',
+                             {br'\Seen'}),
+                MessageState(3, b'Subject: three\r\n\r\nthird\r\n')]
+            mbx.next_uid = 4
+
+    def tearDown(self):
+        self.loop.close()
+
+    def _run(self, coro):
+        return self.loop.run_until_complete(coro)
+
+    def _login(self):
+        state = ConnectionState(None, self.backend)
+        login = LoginCommand(b'a0', b'testuser', b'testpass')
+        self._run(state.do_authenticate(
+            login, PlainCredentials('testuser', 'testpass')))
+        return state
+
+    async def _send(self, state, cmd_type, line, **kwargs):
+        cmd, _ = cmd_type._parse(b'a0', line, **kwargs)
+        response = await state.do_command(cmd)
+        writer = Writer()
+        await response.send_stream(writer)
+        return bytes(writer.data)
+
+    def _do(self, cmd_type, line):
+        return self._run(self._send(self.state, cmd_type, line))
+
+    def test_authenticate_failure(self):
+        state = ConnectionState(None, DemoBackend())
+        login = LoginCommand(b'a1', b'testuser', b'wrong')
+        response = self._run(state.do_authenticate(
+            login, PlainCredentials('testuser', 'wrong')))
+        self.assertEqual(b'a1 NO Invalid authentication credentials.\r\n',
+                         bytes(response))
+        self.assertIsNone(state.user)
+
+    def test_already_authenticated(self):
+        response = self._do(LoginCommand, b' testuser testpass\r\n')
+        self.assertEqual(b'a0 BAD LOGIN: Already authenticated.\r\n',
+                         response)
+
+    def test_must_authenticate(self):
+        state = ConnectionState(None, self.backend)
+        response = self._run(self._send(state, SelectCommand,
+                                        b' INBOX\r\n'))
+        self.assertEqual(b'a0 BAD SELECT: Must authenticate first.\r\n',
+                         response)
+        response = self._run(self._send(state, SearchCommand, b' ALL\r\n'))
+        self.assertEqual(b'a0 BAD SEARCH: Must authenticate first.\r\n',
+                         response)
+
+    def test_must_select(self):
+        response = self._do(SearchCommand, b' ALL\r\n')
+        self.assertEqual(b'a0 BAD SEARCH: Must select a mailbox first.\r\n',
+                         response)
+
+    def test_not_implemented(self):
+        response = self._do(UnknownCommand, b'\r\n')
+        self.assertEqual(b'a0 NO XUNKNOWN: Not Implemented\r\n', response)
+        self.assertIn(UnknownCommand, self.state._dispatch)
+
+    def test_select(self):
+        response = self._do(SelectCommand, b' INBOX\r\n')
+        self.assertIn(b'* 3 EXISTS\r\n', response)
+        self.assertIn(b'[UIDNEXT 4]', response)
+        self.assertTrue(response.endswith(b'a0 OK [READ-WRITE] '
+                                          b'Selected mailbox.\r\n'))
+        self.assertEqual('INBOX', self.state.selected.name)
+
+    def test_select_missing(self):
+        self._do(SelectCommand, b' INBOX\r\n')
+        response = self._do(SelectCommand, b' Missing\r\n')
+        self.assertEqual(b'a0 NO Mailbox does not exist.\r\n', response)
+        self.assertIsNone(self.state.selected)
+
+    def test_examine(self):
+        response = self._do(ExamineCommand, b' INBOX\r\n')
+        self.assertIn(b'* OK [PERMANENTFLAGS ()] Read-only mailbox.\r\n',
+                      response)
+        self.assertTrue(response.endswith(b'a0 OK [READ-ONLY] '
+                                          b'Examined mailbox.\r\n'))
+        self.assertTrue(self.state.readonly)
+
+    def test_list(self):
+        response = self._do(ListCommand, b' "" "*"\r\n')
+        self.assertEqual(b'* LIST () "." "INBOX"\r\n'
+                         b'* LIST () "." ".Testing"\r\n'
+                         b'* LIST () "." ".Testing.Secrets"\r\n'
+                         b'* LIST () "." ".Stuff"\r\n'
+                         b'a0 OK List completed.\r\n', response)
+
+    def test_list_wildcards(self):
+        response = self._do(ListCommand, b' "" *\r\n')
+        self.assertEqual(b'* LIST () "." "INBOX"\r\n'
+                         b'* LIST () "." ".Testing"\r\n'
+                         b'* LIST () "." ".Testing.Secrets"\r\n'
+                         b'* LIST () "." ".Stuff"\r\n'
+                         b'a0 OK List completed.\r\n', response)
+        response = self._do(ListCommand, b' ".Testing" "%"\r\n')
+        self.assertEqual(b'* LIST () "." ".Testing"\r\n'
+                         b'a0 OK List completed.\r\n', response)
+        response = self._do(ListCommand, b' "" ".%"\r\n')
+        self.assertEqual(b'* LIST () "." ".Testing"\r\n'
+                         b'* LIST () "." ".Stuff"\r\n'
+                         b'a0 OK List completed.\r\n', response)
+
+    def test_list_delimiter(self):
+        response = self._do(ListCommand, b' "" ""\r\n')
+        self.assertEqual(b'* LIST (\\Noselect) "." ""\r\n'
+                         b'a0 OK List completed.\r\n', response)
+
+    def test_lsub(self):
+        self.state.user.mailboxes['.Stuff'].subscribed = False
+        response = self._do(LSubCommand, b' "" ".*"\r\n')
+        self.assertEqual(b'* LSUB () "." ".Testing"\r\n'
+                         b'* LSUB () "." ".Testing.Secrets"\r\n'
+                         b'a0 OK Lsub completed.\r\n', response)
+
+    def test_status(self):
+        mbx = self.state.user.mailboxes['.Stuff']
+        response = self._do(StatusCommand,
+                            b' .Stuff (MESSAGES UNSEEN UIDNEXT)\r\n')
+        self.assertEqual(b'* STATUS ".Stuff" (MESSAGES 3 UNSEEN 2 '
+                         b'UIDNEXT 4)\r\n'
+                         b'a0 OK Status completed.\r\n', response)
+        response = self._do(StatusCommand, b' .Stuff (UIDVALIDITY)\r\n')
+        self.assertEqual(b'* STATUS ".Stuff" (UIDVALIDITY %d)\r\n'
+                         b'a0 OK Status completed.\r\n' % mbx.uid_validity,
+                         response)
+
+    def test_status_missing(self):
+        response = self._do(StatusCommand, b' Missing (MESSAGES)\r\n')
+        self.assertEqual(b'a0 NO Mailbox does not exist.\r\n', response)
+
+    def test_search(self):
+        self._do(SelectCommand, b' INBOX\r\n')
+        response = self._do(SearchCommand, b' UNSEEN\r\n')
+        self.assertEqual(b'* SEARCH 1 3\r\na0 OK Search completed.\r\n',
+                         response)
+        response = self._do(UidCommand, b' SEARCH SUBJECT two\r\n')
+        self.assertEqual(b'* SEARCH 2\r\na0 OK Search completed.\r\n',
+                         response)
+
+    def test_fetch(self):
+        self._do(SelectCommand, b' INBOX\r\n')
+        response = self._do(FetchCommand,
+                            b' 1:2 (FLAGS RFC822.SIZE '
+                            b'BODY.PEEK[HEADER.FIELDS (SUBJECT)] '
+                            b'BODY.PEEK[TEXT]<1.3>)\r\n')
+        self.assertEqual(b'* 1 FETCH (FLAGS () RFC822.SIZE 23 '
+                         b'BODY[HEADER.FIELDS (SUBJECT)] {16}\r\n'
+                         b'Subject: one\r\n\r\n BODY[TEXT]<1> {3}\r\nirs)\r\n'
+                         b'* 2 FETCH (FLAGS (\\Seen) RFC822.SIZE 24 '
+                         b'BODY[HEADER.FIELDS (SUBJECT)] {16}\r\n'
+                         b'Subject: two\r\n\r\n BODY[TEXT]<1> {3}\r\neco)\r\n'
+                         b'a0 OK Fetch completed.\r\n', response)
+        self.assertEqual(set(), self.state.selected.messages[0].flags)
+
+    def test_fetch_sets_seen(self):
+        self._do(SelectCommand, b' INBOX\r\n')
+        response = self._do(UidCommand, b' FETCH 3 (BODY[] BODY[]<9.5>)\r\n')
+        self.assertEqual(b'* 3 FETCH (UID 3 BODY[] {25}\r\n'
+                         b'Subject: three\r\n\r\nthird\r\n '
+                         b'BODY[]<9> {5}\r\nthree FLAGS (\\Seen))\r\n'
+                         b'a0 OK Fetch completed.\r\n', response)
+        self.assertEqual({br'\Seen'}, self.state.selected.messages[2].flags)
+
+    def test_fetch_unsupported(self):
+        self._do(SelectCommand, b' INBOX\r\n')
+        response = self._do(FetchCommand, b' 1 ALL\r\n')
+        self.assertEqual(b'a0 NO FETCH: ENVELOPE, BODY and BODYSTRUCTURE '
+                         b'are not supported.\r\n', response)
+
+    def test_store_expunge(self):
+        self._do(SelectCommand, b' INBOX\r\n')
+        response = self._do(StoreCommand, b' 1,3 +FLAGS (\\Deleted)\r\n')
+        self.assertEqual(b'* 1 FETCH (FLAGS (\\Deleted))\r\n'
+                         b'* 3 FETCH (FLAGS (\\Deleted))\r\n'
+                         b'a0 OK Store completed.\r\n', response)
+        response = self._do(ExpungeCommand, b'\r\n')
+        self.assertEqual(b'* 3 EXPUNGE\r\n* 1 EXPUNGE\r\n'
+                         b'a0 OK Expunge completed.\r\n', response)
+        self.assertEqual([2], [msg.uid for msg in
+                               self.state.selected.messages])
+
+    def test_store_readonly(self):
+        self._do(ExamineCommand, b' INBOX\r\n')
+        response = self._do(StoreCommand, b' 1 +FLAGS (\\Deleted)\r\n')
+        self.assertEqual(b'a0 NO Mailbox is read-only.\r\n', response)
+
+    def test_copy_append(self):
+        self._do(SelectCommand, b' INBOX\r\n')
+        response = self._do(UidCommand, b' COPY 2:* .Stuff\r\n')
+        self.assertEqual(b'a0 OK Copy completed.\r\n', response)
+        cmd, _ = AppendCommand._parse(
+            b'a0', b' .Stuff (\\Flagged) {5}\r\n\r\n', literals=[b'test\n'])
+        response = self._run(self.state.do_command(cmd))
+        self.assertEqual(b'a0 OK Append completed.\r\n', bytes(response))
+        stuff = self.state.user.mailboxes['.Stuff']
+        self.assertEqual([1, 2, 3, 4, 5, 6],
+                         [msg.uid for msg in stuff.messages])
+        self.assertEqual({br'\Seen'}, stuff.messages[3].flags)
+        self.assertEqual(b'test\n', stuff.messages[5].content)
+        self.assertEqual({br'\Flagged'}, stuff.messages[5].flags)
+
+    def test_copy_missing(self):
+        self._do(SelectCommand, b' INBOX\r\n')
+        response = self._do(CopyCommand, b' 1 Missing\r\n')
+        self.assertEqual(b'a0 NO [TRYCREATE] Mailbox does not exist.\r\n',
+                         response)
+
+    def test_shared_sessions(self):
+        other = self._login()
+        self.assertIs(self.state.user, other.user)
+
+    def test_idle(self):
+        other = self._login()
+        self._do(SelectCommand, b' INBOX\r\n')
+        self._run(self._send(other, SelectCommand, b' INBOX\r\n'))
+        updates = []
+
+        async def change():
+            await self._send(other, AppendCommand, b' INBOX {5}\r\n\r\n',
+                             literals=[b'test\n'])
+            await self._send(other, StoreCommand,
+                             b' 1 +FLAGS.SILENT (\\Deleted)\r\n')
+            await self._send(other, ExpungeCommand, b'\r\n')
+
+        async def idle(queue):
+            changes = asyncio.ensure_future(change())
+            for _ in range(3):
+                updates.append(bytes(await queue.get()))
+            await changes
+            return b'DONE\r\n'
+        cmd, _ = IdleCommand._parse(b'a0', b'\r\n')
+        response = self._run(self.state.do_command(cmd, idle=idle))
+        self.assertEqual(b'a0 OK Idle completed.\r\n', bytes(response))
+        self.assertEqual([b'* 4 EXISTS\r\n',
+                          b'* 1 FETCH (FLAGS (\\Deleted))\r\n',
+                          b'* 1 EXPUNGE\r\n'], updates)
+        self.assertEqual(set(), self.state.selected.listeners)
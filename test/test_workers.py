@@ -0,0 +1,67 @@
+import os
+import os.path
+import shutil
+import signal
+import tempfile
+import time
+import unittest
+
+from pymap.workers import WorkerSupervisor
+
+
+# Records each start in a file. The first worker exits cleanly, the second
+# crashes, and the third asks the supervisor to stop and waits for the
+# forwarded SIGTERM.
+class FakeTarget(object):
+
+    def __init__(self, path):
+        self.path = path
+
+    def _record(self, line):
+        with open(self.path, 'a') as log:
+            log.write(line + '\n')
+        with open(self.path) as log:
+            return len(log.readlines())
+
+    def __call__(self):
+        started = self._record(str(os.getpid()))
+        if started == 1:
+            return
+        elif started == 2:
+            os._exit(3)
+        received = []
+        signal.signal(signal.SIGTERM, lambda *args: received.append(True))
+        deadline = time.monotonic() + 5.0
+        while not received and time.monotonic() < deadline:
+            # Repeated, in case the supervisor has not recorded this worker
+            # yet when the first signal arrives.
+            os.kill(os.getppid(), signal.SIGTERM)
+            time.sleep(0.05)
+        self._record('SIGTERM' if received else 'timeout')
+
+
+class TestWorkerSupervisor(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.handlers = {signum: signal.getsignal(signum)
+                         for signum in WorkerSupervisor.forward_signals}
+
+    def tearDown(self):
+        for signum, handler in self.handlers.items():
+            signal.signal(signum, handler)
+        shutil.rmtree(self.tmpdir)
+
+    def test_run(self):
+        path = os.path.join(self.tmpdir, 'workers')
+        supervisor = WorkerSupervisor(FakeTarget(path), 1, restart_delay=0.0)
+        supervisor.run()
+        with open(path) as log:
+            lines = log.read().splitlines()
+        self.assertEqual(4, len(lines))
+        self.assertEqual(3, len(set(lines[0:3])))
+        self.assertEqual('SIGTERM', lines[3])
+        self.assertEqual({}, supervisor.workers)
+        self.assertTrue(supervisor.stopping)
+        blocked = signal.pthread_sigmask(signal.SIG_BLOCK, [])
+        self.assertFalse(blocked & set(WorkerSupervisor.forward_signals))